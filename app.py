@@ -1,14 +1,24 @@
+import asyncio
 from datetime import datetime
 from fastapi.responses import HTMLResponse
 import pytz
 import src.runner
 import gradio as gr
+from src.analysis.analysis_jobs import shutdown_executor
+from src.database.admin_dashboard import run_dashboard_reconciliation
+from src.database.indexes import ensure_indexes
+from src.chatbot.llm_models import close_async_models
+from src.chatbot.prompt_context import cancel_summary_refreshes
+from src.runner import graph_db, question_cache
+from utils.app_logger import setup_logger
+from utils.config import settings
 from src.chatbot.index import demo
 
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 app = FastAPI()
+logger = setup_logger("app.py")
 
 # Add CORS middleware
 app.add_middleware(
@@ -33,6 +43,34 @@ app.include_router(common_router, prefix="/common", tags=["Common"])
 
 app = gr.mount_gradio_app(app, demo, path = "/gradio")
 
+_background_tasks = set()
+
+@app.on_event("startup")
+async def startup():
+    if settings.MONGO_ENSURE_INDEXES:
+        try:
+            await ensure_indexes()
+        except Exception as e:
+            logger.error(f"Error ensuring indexes: {str(e)}")
+    try:
+        await question_cache.refresh()
+    except Exception as e:
+        logger.error(f"Error loading question cache: {str(e)}")
+    # Periodic full rebuild of the admin dashboard behind the per-event updates
+    task = asyncio.create_task(
+        run_dashboard_reconciliation(settings.DASHBOARD_RECONCILE_INTERVAL_MINUTES)
+    )
+    _background_tasks.add(task)
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    cancel_summary_refreshes()
+    shutdown_executor()
+    await close_async_models()
+    await graph_db.close()
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     # Get the current UTC time
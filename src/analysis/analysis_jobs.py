@@ -0,0 +1,143 @@
+import asyncio
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from src.analysis.data_analyze_pipeline import ANALYSIS_STAGES, analyzed_profile
+from utils.app_logger import setup_logger
+from utils.config import settings
+
+logger = setup_logger("src/analysis/analysis_jobs.py")
+
+# Finished jobs kept around so their status can still be queried
+MAX_TRACKED_JOBS = 20
+
+_executor: Optional[ProcessPoolExecutor] = None
+_jobs: Dict[str, Dict] = {}
+_active_job_id: Optional[str] = None
+_running_tasks = set()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        # spawn avoids forking the event loop and the database client threads
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.ANALYSIS_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    return _jobs.get(job_id)
+
+
+def _prune_jobs():
+    finished = [job_id for job_id in _jobs if job_id != _active_job_id]
+    for job_id in finished[: max(0, len(_jobs) - MAX_TRACKED_JOBS)]:
+        _jobs.pop(job_id, None)
+
+
+def start_analysis_job(
+    incremental: bool = False, retrain: bool = False
+) -> Tuple[Dict, bool]:
+    """
+    Queue a profile analysis run in the background.
+    Returns the job and whether it was started; only one run may be active at a
+    time, so when one is already running that job is returned instead.
+    """
+    global _active_job_id
+    if _active_job_id is not None:
+        return _jobs[_active_job_id], False
+
+    job_id = str(uuid.uuid4())
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "incremental": incremental,
+        "retrain": retrain,
+        "current_stage": None,
+        "stages": {
+            stage: {"status": "pending", "started_at": None, "finished_at": None}
+            for stage in ANALYSIS_STAGES
+        },
+        "created_at": _now(),
+        "finished_at": None,
+        "result": None,
+        "error": None,
+    }
+    _jobs[job_id] = job
+    _active_job_id = job_id
+    _prune_jobs()
+
+    task = asyncio.create_task(_run_job(job))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    logger.info(
+        f"Started analysis job {job_id} (incremental={incremental}, retrain={retrain})"
+    )
+    return job, True
+
+
+async def _run_job(job: Dict):
+    global _active_job_id, _executor
+
+    def progress(stage, status):
+        stage_info = job["stages"][stage]
+        stage_info["status"] = status
+        if status == "running":
+            job["current_stage"] = stage
+            stage_info["started_at"] = _now()
+        else:
+            stage_info["finished_at"] = _now()
+
+    try:
+        job["status"] = "running"
+        result = await analyzed_profile(
+            incremental=job["incremental"],
+            executor=get_executor(),
+            progress=progress,
+            retrain=job["retrain"],
+        )
+        for stage_info in job["stages"].values():
+            if stage_info["status"] == "pending":
+                stage_info["status"] = "skipped"
+
+        # A failed save raises out of analyzed_profile; None only means no employee changed
+        job["result"] = {
+            "modified_count": result.modified_count if result is not None else 0,
+            "upserted_count": result.upserted_count if result is not None else 0,
+            "matched_count": result.matched_count if result is not None else 0,
+        }
+        job["status"] = "completed"
+        logger.info(f"Analysis job {job['job_id']} completed: {job['result']}")
+
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _executor = None
+        if job["current_stage"]:
+            job["stages"][job["current_stage"]]["status"] = "failed"
+        job["status"] = "failed"
+        job["error"] = str(e)
+        logger.error(f"Analysis job {job['job_id']} failed: {str(e)}", exc_info=True)
+
+    finally:
+        job["current_stage"] = None
+        job["finished_at"] = _now()
+        _active_job_id = None
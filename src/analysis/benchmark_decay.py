@@ -0,0 +1,123 @@
+"""
+Benchmark calculate_decay_score against the row-at-a-time version it replaced.
+
+Both run on generated wide <prefix>_N score/date frames; the output of the two
+is compared as well as their time:
+
+    python -m src.analysis.benchmark_decay --rows 500 5000 50000 --entries 6
+"""
+import argparse
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.data_analyze_pipeline import calculate_decay_score
+
+
+def rowwise_decay_score(
+    df,
+    score_prefix,
+    date_prefix,
+    date_format,
+    output_column,
+    baseline,
+    decay_rate=0.1,
+    staleness_rate=0.05,
+):
+    """The original per-row calculate_decay_score, kept as the reference for its output"""
+    result_df = df.copy()
+    reference_date = datetime.now()
+    score_pattern = re.compile(rf"{re.escape(score_prefix)}_(\d+)")
+    score_date_pairs = []
+    for col in df.columns:
+        match = score_pattern.match(col)
+        if match and f"{date_prefix}_{match.group(1)}" in df.columns:
+            score_date_pairs.append((col, f"{date_prefix}_{match.group(1)}"))
+
+    def process_row(row):
+        valid_pairs = []
+        for score_col, date_col in score_date_pairs:
+            if pd.notna(row[score_col]) and pd.notna(row[date_col]):
+                try:
+                    valid_pairs.append((
+                        float(row[score_col]),
+                        datetime.strptime(str(row[date_col]), date_format),
+                    ))
+                except (ValueError, TypeError):
+                    continue
+
+        if not valid_pairs:
+            return np.nan
+        most_recent_date = max(pair[1] for pair in valid_pairs)
+        if len(valid_pairs) == 1:
+            score, date = valid_pairs[0]
+            time_diff_days = max(0, (reference_date - date).days)
+            decay_factor = np.exp(-decay_rate * time_diff_days / 365)
+            return score * decay_factor + baseline * (1 - decay_factor)
+
+        internal_weights = [
+            (score, np.exp(-decay_rate * max(0, (most_recent_date - date).days) / 365))
+            for score, date in valid_pairs
+        ]
+        internal_score = sum(score * weight for score, weight in internal_weights) / sum(
+            weight for _, weight in internal_weights
+        )
+        staleness_days = max(0, (reference_date - most_recent_date).days)
+        freshness_factor = np.exp(-staleness_rate * staleness_days / 365)
+        return internal_score * freshness_factor + baseline * (1 - freshness_factor)
+
+    result_df[output_column] = result_df.apply(process_row, axis=1) if len(df) else np.nan
+    return result_df
+
+
+def wide_frame(rows, entries, date_format="%Y-%m-%d", fill=0.7, seed=0):
+    """
+    Score_N / Date_N columns with about `fill` of the entries present, some
+    dates missing under a present score and some rows with no entries at all
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2021-01-01", "2025-01-01").strftime(date_format).unique()
+    data = {"Employee_ID": [f"EMP{i:05d}" for i in range(rows)]}
+    empty = rng.random(rows) < 0.05
+    for j in range(1, entries + 1):
+        present = (rng.random(rows) < fill) & ~empty
+        data[f"Score_{j}"] = np.where(present, rng.random(rows) * 5, np.nan)
+        dated = present & (rng.random(rows) < 0.95)
+        data[f"Date_{j}"] = np.where(dated, rng.choice(dates, rows), None)
+    return pd.DataFrame(data)
+
+
+def best_time(function, frame, date_format, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(frame, "Score", "Date", date_format, "Decay", baseline=2.5)
+        times.append(time.perf_counter() - start)
+    return min(times), result["Decay"].to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--entries", type=int, default=6)
+    parser.add_argument("--date-format", default="%Y-%m-%d")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6}  {'vectorised (ms)':>15}  {'row-wise (ms)':>13}  {'speedup':>8}  {'max diff':>9}")
+    for rows in args.rows:
+        frame = wide_frame(rows, args.entries, args.date_format)
+        vectorised, expected = best_time(calculate_decay_score, frame, args.date_format, args.repeat)
+        rowwise, actual = best_time(rowwise_decay_score, frame, args.date_format, 1)
+        diff = np.nanmax(np.abs(expected - actual)) if np.isfinite(expected).any() else 0.0
+        print(
+            f"{rows:>6}  {vectorised * 1000:>15.1f}  {rowwise * 1000:>13.1f}  "
+            f"{rowwise / vectorised:>7.1f}x  {diff:>9.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark the analysis model stage on synthetic employees from generate_data.
+
+Fits the imputer and both emotion forests, then scores every employee, once per
+worker count so the scaling of ANALYSIS_MODEL_JOBS can be compared:
+
+    python -m src.analysis.benchmark_models --employees 1000 --jobs 1 2 4 8
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+from src.analysis.data_analyze_pipeline import (
+    ANALYSIS_SCHEMAS,
+    build_features,
+    fit_analysis_models,
+    frame_from_records,
+    impute_data,
+    predict_emotions,
+)
+from src.analysis.generate_data import generate_data
+
+
+def generated_frames(dataset):
+    """Lay generated employees out the way save_to_mongodb stores them"""
+    records = {name: [] for name in ANALYSIS_SCHEMAS}
+    for data in dataset:
+        emp_id = data["Employee_ID"]
+        for activity in data["Activity"]:
+            records["activity"].append({
+                "Employee_ID": emp_id,
+                "Date": datetime.strptime(activity["Date"], "%m/%d/%Y"),
+                "Teams_Messages_Sent": activity["Messages"],
+                "Emails_Sent": activity["Emails"],
+                "Meetings_Attended": activity["Meetings"],
+                "Work_Hours": activity["Work_Hours"],
+            })
+        for leave in data["Leaves"]:
+            records["leave"].append({
+                "Employee_ID": emp_id,
+                "Leave_Days": leave["Leave_Days"],
+                "Leave_Start_Date": datetime.strptime(leave["Leave_Start_Date"], "%m/%d/%Y"),
+            })
+        records["onboarding"].append({"Employee_ID": emp_id, **data["Onboarding"]})
+        if data["Performance"].get("Review_Period"):
+            records["performance"].append({"Employee_ID": emp_id, **data["Performance"]})
+        for reward in data.get("Rewards") or []:
+            records["rewards"].append({
+                "Employee_ID": emp_id,
+                "Award_Type": reward["Award_Type"],
+                "Award_Date": datetime.strptime(reward["Award_Date"], "%Y-%m-%d"),
+            })
+        for date, score in (data["Vibe_Scores"] or {}).items():
+            records["vibemeter"].append({
+                "Employee_ID": emp_id,
+                "Response_Date": datetime.strptime(date, "%Y-%m-%d"),
+                "Vibe_Score": score,
+            })
+
+    return {
+        name: frame_from_records(records[name], schema)
+        for name, schema in ANALYSIS_SCHEMAS.items()
+    }
+
+
+def time_models(features, n_jobs, repeat):
+    """Best-of-repeat seconds for fitting and for scoring with n_jobs workers"""
+    fit_times, predict_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bundle = fit_analysis_models(features.copy(), n_jobs=n_jobs)
+        fit_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        imputed = impute_data(features.copy(), bundle["imputer"])
+        predict_emotions(imputed, bundle["models"], n_jobs=n_jobs)
+        predict_times.append(time.perf_counter() - start)
+    return min(fit_times), min(predict_times)
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    default_jobs = sorted({1, *[2**i for i in range(1, 6) if 2**i <= cpu_count], cpu_count})
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--jobs", type=int, nargs="+", default=default_jobs)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Generating {args.employees} employees ({cpu_count} cores available)")
+    features = build_features(generated_frames(generate_data(args.employees)), {})
+    print(f"{len(features)} feature rows\n")
+
+    print(f"{'n_jobs':>6}  {'fit (s)':>8}  {'predict (s)':>11}  {'fit speedup':>11}")
+    baseline = None
+    for n_jobs in args.jobs:
+        fit_time, predict_time = time_models(features, n_jobs, args.repeat)
+        baseline = baseline or fit_time
+        print(
+            f"{n_jobs:>6}  {fit_time:>8.3f}  {predict_time:>11.3f}  {baseline / fit_time:>10.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import asyncio
 import re
+from concurrent.futures import ThreadPoolExecutor
 from math import nan
 from datetime import datetime, timezone
 import pandas as pd
@@ -11,22 +13,140 @@ from sklearn.linear_model import BayesianRidge
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor
+from src.analysis.model_registry import (
+    feature_profile,
+    load_models,
+    retrain_reason,
+    save_models,
+    schema_hash,
+)
+from src.database.profile_context import build_profile_context, profile_context
 from utils.app_logger import setup_logger
-from utils.config import get_async_database
+from utils.config import get_async_database, settings
 
 async_db = get_async_database()
 logger = setup_logger("src/analysis/data_analyze_pipeline.py")
 
+ANALYSIS_COLLECTIONS = [
+    "activity",
+    "leave",
+    "onboarding",
+    "performance",
+    "rewards",
+    "vibemeter",
+]
+ANALYSIS_STATE_ID = "analyzed_profile"
+ANALYSIS_STAGES = ["load", "features", "models", "impute", "predict", "save"]
+
+
+# Fields the feature builders read from each source collection and the dtype
+# they are held in; anything else stored on the documents is never fetched
+ANALYSIS_SCHEMAS = {
+    "activity": {
+        "Employee_ID": "category",
+        "Date": "datetime64[ns]",
+        "Teams_Messages_Sent": "float32",
+        "Emails_Sent": "float32",
+        "Meetings_Attended": "float32",
+        "Work_Hours": "float32",
+    },
+    "leave": {
+        "Employee_ID": "category",
+        "Leave_Start_Date": "datetime64[ns]",
+        "Leave_Days": "float32",
+    },
+    "onboarding": {
+        "Employee_ID": "category",
+        "Joining_Date": "datetime64[ns]",
+        "Onboarding_Feedback": "object",
+        "Mentor_Assigned": "bool",
+        "Initial_Training_Completed": "bool",
+    },
+    "performance": {
+        "Employee_ID": "category",
+        "Review_Period": "object",
+        "Performance_Rating": "float32",
+        "Manager_Feedback": "object",
+        "Promotion_Consideration": "bool",
+    },
+    "rewards": {
+        "Employee_ID": "category",
+        "Award_Type": "object",
+        "Award_Date": "datetime64[ns]",
+    },
+    "vibemeter": {
+        "Employee_ID": "category",
+        "Response_Date": "datetime64[ns]",
+        "Vibe_Score": "float32",
+    },
+}
+LOAD_BATCH_SIZE = 10000
+
+
+def _batch_to_column(values, dtype):
+    if dtype == "category":
+        return pd.Categorical(values)
+    if dtype.startswith("datetime64"):
+        return pd.to_datetime(
+            pd.Series(values, dtype=object), errors="coerce"
+        ).to_numpy(dtype)
+    return np.array(values, dtype=dtype)
+
+
+def _concat_column(chunks, dtype):
+    if dtype == "category":
+        if not chunks:
+            return pd.Categorical([])
+        return pd.api.types.union_categoricals(chunks)
+    if not chunks:
+        return np.array([], dtype=dtype)
+    return np.concatenate(chunks)
+
+
+def frame_from_records(records, schema):
+    """Build the same typed frame the streaming loader yields from in-memory records"""
+    return pd.DataFrame(
+        {
+            field: _batch_to_column([record.get(field) for record in records], dtype)
+            for field, dtype in schema.items()
+        }
+    )
 
-async def load_collection_to_dataframe(collection_name):
+
+async def load_collection_to_dataframe(
+    collection_name, query=None, schema=None, batch_size=LOAD_BATCH_SIZE
+):
+    """
+    Load a collection into a DataFrame.
+    With a schema only its fields are fetched, and the cursor is drained batch by
+    batch into typed column buffers so the raw documents never pile up in memory.
+    """
     collection = async_db[collection_name]
-    cursor = collection.find({})
-    df = pd.DataFrame(await cursor.to_list(length=None))
+    if schema is None:
+        cursor = collection.find(query or {})
+        df = pd.DataFrame(await cursor.to_list(length=None))
 
-    if "_id" in df.columns:
-        df = df.drop("_id", axis=1)
+        if "_id" in df.columns:
+            df = df.drop("_id", axis=1)
+
+        return df
+
+    projection = {field: 1 for field in schema}
+    projection["_id"] = 0
+    cursor = collection.find(query or {}, projection).batch_size(batch_size)
+    chunks = {field: [] for field in schema}
+    while True:
+        batch = await cursor.to_list(length=batch_size)
+        if not batch:
+            break
+        for field, dtype in schema.items():
+            chunks[field].append(
+                _batch_to_column([doc.get(field) for doc in batch], dtype)
+            )
 
-    return df
+    return pd.DataFrame(
+        {field: _concat_column(chunks[field], dtype) for field, dtype in schema.items()}
+    )
 
 
 def calculate_decay_score(
@@ -39,10 +159,16 @@ def calculate_decay_score(
     decay_rate=0.1,
     staleness_rate=0.05,
 ):
+    """Blend each row's dated scores into one time-decayed score
+
+    The wide <score_prefix>_N / <date_prefix>_N columns are flattened into one
+    long array of (row, score, date) entries so dates are parsed once and the
+    weights are computed as array operations per row.
+    """
     result_df = df.copy()
-    reference_date = datetime.now()
+    reference_date = np.datetime64(datetime.now(), "ns")
     score_prefix_escaped = re.escape(score_prefix)
-    score_pattern = re.compile(f"{score_prefix_escaped}_(\d+)")
+    score_pattern = re.compile(rf"{score_prefix_escaped}_(\d+)")
     score_date_pairs = []
     for col in df.columns:
         match = score_pattern.match(col)
@@ -52,58 +178,105 @@ def calculate_decay_score(
             if date_col in df.columns:
                 score_date_pairs.append((col, date_col))
 
-    def process_row(row):
-        valid_pairs = []
-        for score_col, date_col in score_date_pairs:
-            if pd.notna(row[score_col]) and pd.notna(row[date_col]):
-                try:
-                    score = float(row[score_col])
-                    date_str = str(row[date_col])
-                    date = datetime.strptime(date_str, date_format)
-                    valid_pairs.append((score, date))
-                except (ValueError, TypeError) as e:
-                    print(
-                        f"Warning: Could not process {score_col}={row[score_col]} or {date_col}={row[date_col]} - {e}"
-                    )
-                    continue
-
-        if not valid_pairs:
-            return np.nan
-        most_recent_date = max(pair[1] for pair in valid_pairs)
-        if len(valid_pairs) == 1:
-            score = valid_pairs[0][0]
-            date = valid_pairs[0][1]
-            time_diff_days = max(0, (reference_date - date).days)
-            decay_factor = np.exp(-decay_rate * time_diff_days / 365)
-            return score * decay_factor + baseline * (1 - decay_factor)
-
-        internal_weights = []
-        for score, date in valid_pairs:
-            internal_time_diff = max(0, (most_recent_date - date).days)
-            internal_weight = np.exp(-decay_rate * internal_time_diff / 365)
-            internal_weights.append((score, internal_weight))
-        internal_weighted_sum = sum(
-            score * weight for score, weight in internal_weights
-        )
-        total_internal_weight = sum(weight for _, weight in internal_weights)
-        internal_score = internal_weighted_sum / total_internal_weight
-        staleness_days = max(0, (reference_date - most_recent_date).days)
-        freshness_factor = np.exp(-staleness_rate * staleness_days / 365)
-        final_score = internal_score * freshness_factor + baseline * (
-            1 - freshness_factor
+    output = np.full(len(df), np.nan)
+    if not score_date_pairs or df.empty:
+        result_df[output_column] = output
+        return result_df
+
+    score_cols, date_cols = map(list, zip(*score_date_pairs))
+    raw_scores = df[score_cols].to_numpy().ravel()
+    raw_dates = df[date_cols].to_numpy().ravel()
+    rows = np.repeat(np.arange(len(df)), len(score_date_pairs))
+
+    scores = pd.to_numeric(pd.Series(raw_scores), errors="coerce").to_numpy(float)
+    # Each distinct date value is parsed once; missing ones get code -1, the trailing NaT
+    date_codes, date_values = pd.factorize(raw_dates)
+    parsed_dates = pd.to_datetime(
+        pd.Series(date_values).astype("string"), format=date_format, errors="coerce"
+    ).to_numpy("datetime64[ns]")
+    dates = np.append(parsed_dates, np.datetime64("NaT", "ns"))[date_codes]
+
+    present = pd.notna(raw_scores) & (date_codes >= 0)
+    valid = ~np.isnan(scores) & ~np.isnat(dates)
+    invalid_count = int((present & ~valid).sum())
+    if invalid_count:
+        logger.warning(
+            f"Skipped {invalid_count} unparseable {score_prefix}/{date_prefix} entries"
         )
-        return final_score
-
-    result_df[output_column] = result_df.apply(process_row, axis=1)
+    if not valid.any():
+        result_df[output_column] = output
+        return result_df
+
+    # Entries stay ordered by row, so each row's entries form one contiguous run
+    rows, scores, dates = rows[valid], scores[valid], dates[valid]
+    counts = np.bincount(rows, minlength=len(df))
+    has_entries = counts > 0
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    most_recent = np.maximum.reduceat(dates, starts)
+
+    day = np.timedelta64(1, "D")
+    internal_days = (np.repeat(most_recent, counts[has_entries]) - dates) // day
+    internal_weights = np.exp(-decay_rate * np.maximum(internal_days, 0) / 365)
+    weighted_sum = np.add.reduceat(scores * internal_weights, starts)
+    total_weight = np.add.reduceat(internal_weights, starts)
+    internal_score = weighted_sum / total_weight
+
+    # A single entry decays at decay_rate, a history goes stale at staleness_rate
+    staleness_days = np.maximum((reference_date - most_recent) // day, 0)
+    rate = np.where(counts[has_entries] == 1, decay_rate, staleness_rate)
+    freshness_factor = np.exp(-rate * staleness_days / 365)
+    output[has_entries] = internal_score * freshness_factor + baseline * (
+        1 - freshness_factor
+    )
+    result_df[output_column] = output
     return result_df
 
 
-def activity_data(activity_df):
-    activity_df["Date"] = pd.to_datetime(
-        activity_df["Date"], format="%m/%d/%Y"
-    ).dt.strftime("%Y-%m")
+def sequence_pivot(
+    df, date_column, value_columns, date_prefix, sort_columns=None, max_entries=None
+):
+    """Pivot per-employee rows into wide <prefix>_1..N columns in date order
+
+    value_columns maps each source column to its output prefix. When
+    max_entries is set only the most recent entries of each employee are kept.
+    """
+    sorted_df = df.sort_values(sort_columns or [date_column], kind="stable")
+    grouped = sorted_df.groupby("Employee_ID", sort=False, observed=True)
+    seq = grouped.cumcount()
+    if max_entries is not None:
+        offset = (grouped["Employee_ID"].transform("size") - max_entries).clip(lower=0)
+        keep = seq >= offset
+        sorted_df, seq = sorted_df[keep], (seq - offset)[keep]
+
+    # Unstack each column on its own so value columns keep their dtype
+    columns = [date_column, *value_columns]
+    prefixes = {date_column: date_prefix, **value_columns}
+    indexed = sorted_df.assign(seq=seq + 1).set_index(["Employee_ID", "seq"])
+    wide = pd.concat(
+        {prefixes[name]: indexed[name].unstack() for name in columns}, axis=1
+    )
+    wide.columns = [f"{prefix}_{i}" for prefix, i in wide.columns]
+
+    max_seq = int(seq.max()) + 1 if len(seq) else 0
+    ordered = []
+    for i in range(1, max_seq + 1):
+        ordered.extend(f"{prefixes[name]}_{i}" for name in columns)
+    return wide.reindex(columns=ordered).reset_index()
+
+
+def resolve_stat(stats, key, compute):
+    """Return a stored pipeline statistic, computing and recording it when absent"""
+    if stats is None:
+        return compute()
+    if key not in stats:
+        stats[key] = compute()
+    return stats[key]
+
+
+def activity_data(activity_df, stats=None, max_entries=None):
+    activity_df["Date"] = activity_df["Date"].dt.strftime("%Y-%m")
     monthly_activity = (
-        activity_df.groupby(["Employee_ID", "Date"])
+        activity_df.groupby(["Employee_ID", "Date"], observed=True)
         .agg(
             {
                 "Teams_Messages_Sent": "mean",
@@ -121,9 +294,19 @@ def activity_data(activity_df):
         "Meetings_Attended_norm": 0.30,
         "Emails_Sent_norm": 0.20,
     }
+    bounds = resolve_stat(
+        stats,
+        "activity_bounds",
+        lambda: {
+            feature: [
+                float(monthly_activity[feature].min()),
+                float(monthly_activity[feature].max()),
+            ]
+            for feature in communication_features
+        },
+    )
     for feature in communication_features:
-        feature_min = monthly_activity[feature].min()
-        feature_max = monthly_activity[feature].max()
+        feature_min, feature_max = bounds[feature]
         monthly_activity[f"{feature}_norm"] = (
             monthly_activity[feature] - feature_min
         ) / (feature_max - feature_min + 1e-9)
@@ -142,23 +325,14 @@ def activity_data(activity_df):
     )
 
     def process_activity(df):
-        df_sorted = df.sort_values(["Employee_ID", "Date"]).copy()
-        df_sorted["seq"] = df_sorted.groupby("Employee_ID").cumcount() + 1
-        max_seq = df_sorted["seq"].max()
-        result_data = []
-        for emp_id, group in df_sorted.groupby("Employee_ID"):
-            row = {"Employee_ID": emp_id}
-            for _, entry in group.iterrows():
-                seq = entry["seq"]
-                row[f"Activity_Date_{seq}"] = entry["Date"]
-                row[f"Activity_Interaction_{seq}"] = entry["Team_Interaction_Adj"]
-
-            result_data.append(row)
-        result = pd.DataFrame(result_data)
-        columns = ["Employee_ID"]
-        for i in range(1, max_seq + 1):
-            columns.extend([f"Activity_Date_{i}", f"Activity_Interaction_{i}"])
-        return result.reindex(columns=columns, fill_value=None)
+        return sequence_pivot(
+            df,
+            "Date",
+            {"Team_Interaction_Adj": "Activity_Interaction"},
+            "Activity_Date",
+            sort_columns=["Employee_ID", "Date"],
+            max_entries=max_entries,
+        )
 
     unique_ids = set(monthly_activity["Employee_ID"].unique())
     initial_filter = pd.DataFrame({"Employee_ID": list(unique_ids)})
@@ -175,46 +349,30 @@ def activity_data(activity_df):
     return activity
 
 
-def leave_data(leave_df):
+def leave_data(leave_df, stats=None, max_entries=None):
     leave = leave_df.rename(columns={"Leave_Start_Date": "Date"})
-    leave["Date"] = pd.to_datetime(leave["Date"]).dt.strftime("%Y")
-    leave.drop("Leave_End_Date", axis=1, inplace=True)
+    leave["Date"] = leave["Date"].dt.strftime("%Y")
+    leave = leave.drop(columns=["Leave_End_Date", "Leave_Type"], errors="ignore")
     aggregated = (
-        leave.groupby(["Employee_ID", "Date"])
+        leave.groupby(["Employee_ID", "Date"], observed=True)
         .agg(
             Total_Leave_Days=("Leave_Days", "sum"),
         )
         .reset_index()
         .round(2)
     )
-    median = aggregated["Total_Leave_Days"].median()
+    median = resolve_stat(
+        stats, "leave_baseline", lambda: float(aggregated["Total_Leave_Days"].median())
+    )
 
     def process_leave(df):
-        sorted_df = df.sort_values("Date").reset_index(drop=True)
-        grouped = sorted_df.groupby("Employee_ID")
-        max_entries = sorted_df.groupby("Employee_ID").size().max()
-        result = (
-            grouped.apply(
-                lambda x: pd.Series(
-                    {
-                        **{
-                            f"Leave_Days_{i + 1}": x.iloc[i]["Total_Leave_Days"]
-                            for i in range(len(x))
-                        },
-                        **{
-                            f"Leave_Date_{i + 1}": x.iloc[i]["Date"]
-                            for i in range(len(x))
-                        },
-                    }
-                )
-            )
-            .unstack()
-            .reset_index()
+        return sequence_pivot(
+            df,
+            "Date",
+            {"Total_Leave_Days": "Leave_Days"},
+            "Leave_Date",
+            max_entries=max_entries,
         )
-        columns = ["Employee_ID"]
-        for i in range(1, max_entries + 1):
-            columns.extend([f"Leave_Date_{i}", f"Leave_Days_{i}"])
-        return result.reindex(columns=columns, fill_value=None)
 
     unique_ids = set()
     unique_ids.update(aggregated["Employee_ID"].unique())
@@ -232,10 +390,9 @@ def leave_data(leave_df):
     return leave
 
 
-def onboard_data(onboard_df):
-    onboard_df.to_csv("1_onboard.csv", index=0)
+def onboard_data(onboard_df, max_entries=None):
     onboard = onboard_df.rename(columns={"Joining_Date": "Date"})
-    onboard["Date"] = pd.to_datetime(onboard["Date"]).dt.strftime("%Y-%m-%d")
+    onboard["Date"] = onboard["Date"].dt.strftime("%Y-%m-%d")
     onboard["company_efforts"] = (
         onboard["Mentor_Assigned"] & onboard["Initial_Training_Completed"]
     ).astype(int)
@@ -258,44 +415,13 @@ def onboard_data(onboard_df):
     onboard["onboard_category"] = np.select(conditions, categories, default=0)
 
     def process_onboard(df):
-        sorted_df = df.sort_values("Date").reset_index(drop=True)
-        grouped = sorted_df.groupby("Employee_ID")
-        max_entries = sorted_df.groupby("Employee_ID").size().max()
-        if max_entries == 1:
-            result = sorted_df[["Employee_ID", "onboard_category", "Date"]].copy()
-            result.rename(
-                columns={
-                    "onboard_category": "Onboard_Category_1",
-                    "Date": "Onboard_Date_1",
-                },
-                inplace=True,
-            )
-            return result
-        else:
-            result = (
-                grouped.apply(
-                    lambda x: pd.Series(
-                        {
-                            **{
-                                f"Onboard_Category_{i + 1}": x.iloc[i][
-                                    "onboard_category"
-                                ]
-                                for i in range(len(x))
-                            },
-                            **{
-                                f"Onboard_Date_{i + 1}": x.iloc[i]["Date"]
-                                for i in range(len(x))
-                            },
-                        }
-                    )
-                )
-                .unstack()
-                .reset_index()
-            )
-            columns = ["Employee_ID"]
-            for i in range(1, max_entries + 1):
-                columns.extend([f"Onboard_Date_{i}", f"Onboard_Category_{i}"])
-            return result.reindex(columns=columns, fill_value=None)
+        return sequence_pivot(
+            df,
+            "Date",
+            {"onboard_category": "Onboard_Category"},
+            "Onboard_Date",
+            max_entries=max_entries,
+        )
 
     unique_ids = set()
     unique_ids.update(onboard["Employee_ID"].unique())
@@ -305,18 +431,13 @@ def onboard_data(onboard_df):
     onboard_cat_columns = [
         col for col in onboard.columns if col.startswith("Onboard_Category_")
     ]
-
-    def get_last_cat_value(row):
-        for col in reversed(onboard_cat_columns):
-            if pd.notna(row[col]):
-                return row[col]
-        return np.nan
-
-    onboard["Onboard_Last_Category"] = onboard.apply(get_last_cat_value, axis=1)
+    onboard["Onboard_Last_Category"] = (
+        onboard[onboard_cat_columns].ffill(axis=1).iloc[:, -1].astype(float)
+    )
     return onboard
 
 
-def performance_data(performance_df):
+def performance_data(performance_df, stats=None, max_entries=None):
     weights = {
         "performance_rating": 0.60,
         "manager_feedback": 0.30,
@@ -354,41 +475,18 @@ def performance_data(performance_df):
         lambda x: convert_performance_date(x, fiscal_year_end_month=12)
     )
     performance = performance_df.rename(columns={"Review_Period": "Date"})
-    median = performance["Per_Score"].median()
+    median = resolve_stat(
+        stats, "performance_baseline", lambda: float(performance["Per_Score"].median())
+    )
 
     def process_performance(df):
-        sorted_df = df.sort_values("Date").reset_index(drop=True)
-        grouped = sorted_df.groupby("Employee_ID")
-        max_entries = sorted_df.groupby("Employee_ID").size().max()
-        if max_entries == 1:
-            result = sorted_df[["Employee_ID", "Per_Score", "Date"]].copy()
-            result.rename(
-                columns={"Per_Score": "Per_Score_1", "Date": "Per_Date_1"}, inplace=True
-            )
-            return result
-        else:
-            result = (
-                grouped.apply(
-                    lambda x: pd.Series(
-                        {
-                            **{
-                                f"Per_Score_{i + 1}": x.iloc[i]["Per_Score"]
-                                for i in range(len(x))
-                            },
-                            **{
-                                f"Per_Date_{i + 1}": x.iloc[i]["Date"]
-                                for i in range(len(x))
-                            },
-                        }
-                    )
-                )
-                .unstack()
-                .reset_index()
-            )
-            columns = ["Employee_ID"]
-            for i in range(1, max_entries + 1):
-                columns.extend([f"Per_Date_{i}", f"Per_Score_{i}"])
-            return result.reindex(columns=columns, fill_value=None)
+        return sequence_pivot(
+            df,
+            "Date",
+            {"Per_Score": "Per_Score"},
+            "Per_Date",
+            max_entries=max_entries,
+        )
 
     unique_ids = set()
     unique_ids.update(performance["Employee_ID"].unique())
@@ -408,50 +506,33 @@ def performance_data(performance_df):
     return performance
 
 
-def rewards_data(rewards_df):
+def rewards_data(rewards_df, max_entries=None):
     rewards = rewards_df.copy()
-    rewards["Award_Date"] = pd.to_datetime(
-        rewards["Award_Date"], format="%Y-%m-%d"
-    ).dt.strftime("%Y-%m-%d")
+    rewards["Award_Date"] = rewards["Award_Date"].dt.strftime("%Y-%m-%d")
     rewards = rewards.rename(columns={"Award_Date": "Date"})
-    rewards = rewards.drop("Reward_Points", axis=1)
+    rewards = rewards.drop(columns=["Reward_Points"], errors="ignore")
 
     def process_rewards(df):
-        sorted_df = df.sort_values("Date").reset_index(drop=True)
-        grouped = sorted_df.groupby("Employee_ID")
-        max_entries = sorted_df.groupby("Employee_ID").size().max()
-        result = (
-            grouped.apply(
-                lambda x: pd.Series(
-                    {
-                        **{
-                            f"Award_Type_{i + 1}": x.iloc[i]["Award_Type"]
-                            for i in range(len(x))
-                        },
-                        **{
-                            f"Award_Date_{i + 1}": x.iloc[i]["Date"]
-                            for i in range(len(x))
-                        },
-                    }
-                )
-            )
-            .unstack()
-            .reset_index()
+        return sequence_pivot(
+            df,
+            "Date",
+            {"Award_Type": "Award_Type"},
+            "Award_Date",
+            max_entries=max_entries,
         )
-        columns = ["Employee_ID"]
-        for i in range(1, max_entries + 1):
-            columns.extend([f"Award_Date_{i}", f"Award_Type_{i}"])
-        return result.reindex(columns=columns, fill_value=None)
 
     unique_ids = set()
     unique_ids.update(rewards["Employee_ID"].unique())
     initial_filter = pd.DataFrame({"Employee_ID": list(unique_ids)})
     rewards_processed = process_rewards(rewards)
     rewards = initial_filter.merge(rewards_processed, on="Employee_ID", how="left")
-    award_type_columns = [
-        col for col in rewards.columns if col.startswith("Award_Type_")
-    ]
-    rewards["Award_Count"] = rewards[award_type_columns].notna().sum(axis=1)
+    # Count from the raw rows so capping the pivot does not cap the award count
+    award_counts = rewards_df.groupby("Employee_ID", observed=True)[
+        "Award_Type"
+    ].count()
+    rewards["Award_Count"] = (
+        rewards["Employee_ID"].map(award_counts).fillna(0).astype(int)
+    )
     return rewards
 
 
@@ -469,33 +550,24 @@ def find_unique_ids(activity, leave, onboard, performance, rewards):
     return all_unique_ids
 
 
-def vibemeter_data(vibe_df, activity, leave, onboard, performance, rewards):
+def vibemeter_data(
+    vibe_df,
+    activity,
+    leave,
+    onboard,
+    performance,
+    rewards,
+    stats=None,
+    max_entries=None,
+):
     def process_vibemeter(df):
-        sorted_df = df.sort_values("Date").reset_index(drop=True)
-        grouped = sorted_df.groupby("Employee_ID")
-        max_entries = sorted_df.groupby("Employee_ID").size().max()
-        result = (
-            grouped.apply(
-                lambda x: pd.Series(
-                    {
-                        **{
-                            f"Vibe_Score_{i + 1}": x.iloc[i]["Vibe_Score"]
-                            for i in range(len(x))
-                        },
-                        **{
-                            f"Vibe_Date_{i + 1}": x.iloc[i]["Date"]
-                            for i in range(len(x))
-                        },
-                    }
-                )
-            )
-            .unstack()
-            .reset_index()
+        return sequence_pivot(
+            df,
+            "Date",
+            {"Vibe_Score": "Vibe_Score"},
+            "Vibe_Date",
+            max_entries=max_entries,
         )
-        columns = ["Employee_ID"]
-        for i in range(1, max_entries + 1):
-            columns.extend([f"Vibe_Score_{i}", f"Vibe_Date_{i}"])
-        return result.reindex(columns=columns, fill_value=None)
 
     def categorize_emotion_zone(score):
         if 0 <= score < 1.5:
@@ -509,11 +581,11 @@ def vibemeter_data(vibe_df, activity, leave, onboard, performance, rewards):
         elif 4.5 <= score < 5:
             return "Excited"
 
-    vibe_df["Response_Date"] = pd.to_datetime(
-        vibe_df["Response_Date"], format="%d-%m-%Y"
-    ).dt.strftime("%Y-%m-%d")
+    vibe_df["Response_Date"] = vibe_df["Response_Date"].dt.strftime("%Y-%m-%d")
     vibemeter = vibe_df.rename(columns={"Response_Date": "Date"})
-    median = vibemeter["Vibe_Score"].median()
+    median = resolve_stat(
+        stats, "vibe_baseline", lambda: float(vibemeter["Vibe_Score"].median())
+    )
     vibemeter_processed = process_vibemeter(vibemeter)
     all_unique_ids = find_unique_ids(activity, leave, onboard, performance, rewards)
     vibemeter = all_unique_ids.merge(vibemeter_processed, on="Employee_ID", how="left")
@@ -584,22 +656,75 @@ def divide_emotions(vibemeter, activity, leave, onboard, performance, rewards):
     return df_negative, df_positive, df_empty
 
 
-def impute_data(negative, positive, empty_emotions):
-    merged_df = pd.concat([empty_emotions, negative, positive], ignore_index=True)
-    merged_df = merged_df.sort_values(by=["Employee_ID"], ascending=True)
+def build_features(frames, stats=None, max_entries=None):
+    """Run every feature builder over the loaded collections and merge them per employee
 
-    target_columns = [
-        "Activity_Interaction_Decay",
-        "Leave_Day_Decay",
-        "Onboard_Last_Category",
-        "Per_Score_Decay",
-        "Award_Count",
-    ]
+    max_entries caps how many of the most recent entries per employee each
+    builder pivots into wide columns; None keeps the full history.
+    """
+
+    def empty_features(*columns):
+        return pd.DataFrame(columns=["Employee_ID", *columns])
+
+    activity = (
+        activity_data(frames["activity"], stats, max_entries)
+        if not frames["activity"].empty
+        else empty_features("Activity_Interaction_Decay")
+    )
+    leave = (
+        leave_data(frames["leave"], stats, max_entries)
+        if not frames["leave"].empty
+        else empty_features("Leave_Day_Decay")
+    )
+    onboard = (
+        onboard_data(frames["onboarding"], max_entries)
+        if not frames["onboarding"].empty
+        else empty_features("Onboard_Last_Category")
+    )
+    performance = (
+        performance_data(frames["performance"], stats, max_entries)
+        if not frames["performance"].empty
+        else empty_features("Per_Score_Decay")
+    )
+    rewards = (
+        rewards_data(frames["rewards"], max_entries)
+        if not frames["rewards"].empty
+        else empty_features("Award_Count")
+    )
+    if not frames["vibemeter"].empty:
+        vibemeter = vibemeter_data(
+            frames["vibemeter"],
+            activity,
+            leave,
+            onboard,
+            performance,
+            rewards,
+            stats,
+            max_entries,
+        )
+    else:
+        vibemeter = find_unique_ids(activity, leave, onboard, performance, rewards)
+        vibemeter["Vibe_Emotion_Trend"] = np.nan
+
+    negative, positive, empty_emotions = divide_emotions(
+        vibemeter, activity, leave, onboard, performance, rewards
+    )
+    return pd.concat([empty_emotions, negative, positive], ignore_index=True)
 
-    data = merged_df[target_columns]
-    model = BayesianRidge()
-    imputer = IterativeImputer(
-        estimator=model,
+
+ANALYSIS_FEATURE_COLUMNS = [
+    "Activity_Interaction_Decay",
+    "Leave_Day_Decay",
+    "Onboard_Last_Category",
+    "Per_Score_Decay",
+    "Award_Count",
+]
+EMOTION_MAP = {"Frustrated": 1, "Sad": 2, "Okay": 3, "Happy": 4, "Excited": 5}
+
+
+def build_imputer():
+    return IterativeImputer(
+        estimator=BayesianRidge(),
         max_iter=50,
         random_state=42,
         verbose=0,
@@ -607,75 +732,109 @@ def impute_data(negative, positive, empty_emotions):
         imputation_order="roman",
     )
 
+
+def impute_data(features, imputer=None):
+    """Fill missing feature values, fitting a fresh imputer unless one is given"""
+    merged_df = features.sort_values(by=["Employee_ID"], ascending=True)
+    data = merged_df[ANALYSIS_FEATURE_COLUMNS]
+
     if data.isna().any().any():
-        imputed_data = imputer.fit_transform(data)
+        if imputer is None:
+            imputed_data = build_imputer().fit_transform(data)
+        else:
+            imputed_data = imputer.transform(data)
         imputed_df = pd.DataFrame(
-            imputed_data, columns=target_columns, index=data.index
+            imputed_data, columns=ANALYSIS_FEATURE_COLUMNS, index=data.index
         )
-        for column in target_columns:
+        for column in ANALYSIS_FEATURE_COLUMNS:
             merged_df[column] = merged_df[column].fillna(imputed_df[column])
 
     return merged_df
 
 
-def predict_emotions(imputed_dataset):
-    emotion_map = {"Frustrated": 1, "Sad": 2, "Okay": 3, "Happy": 4, "Excited": 5}
-
+def encode_emotions(dataset):
     def convert_emotion(emotion):
         if pd.isna(emotion):
             return np.nan
-        return emotion_map.get(emotion, np.nan)
+        if isinstance(emotion, (int, float)):
+            return emotion
+        return EMOTION_MAP.get(emotion, np.nan)
 
-    imputed_dataset["Vibe_Emotion_Trend"] = imputed_dataset["Vibe_Emotion_Trend"].apply(
-        convert_emotion
-    )
+    dataset["Vibe_Emotion_Trend"] = dataset["Vibe_Emotion_Trend"].apply(convert_emotion)
+    return dataset
+
+
+def model_jobs(n_jobs=None):
+    return settings.ANALYSIS_MODEL_JOBS if n_jobs is None else n_jobs
 
-    imputed_clean = imputed_dataset.dropna(subset=["Vibe_Emotion_Trend"])
-    imputed_null_emo = imputed_dataset[imputed_dataset["Vibe_Emotion_Trend"].isna()]
-    sad_test = imputed_clean[imputed_clean["Vibe_Emotion_Trend"].isin([1.0, 2.0])]
-    sad_train, _ = train_test_split(sad_test, test_size=0.1, random_state=42)
-    train = pd.concat([sad_train])
-    test = pd.concat([sad_test])
-    x_train = train.drop(columns=["Employee_ID", "Vibe_Emotion_Trend"])
-    y_train = train["Vibe_Emotion_Trend"]
-    x_test = test.drop(columns=["Employee_ID", "Vibe_Emotion_Trend"])
-    scaler = StandardScaler()
-    x_train_scaled = scaler.fit_transform(x_train)
-    x_test_scaled = scaler.transform(x_test)
-    rf = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf.fit(x_train_scaled, y_train)
-    y_train_pred = rf.predict(x_train_scaled)
-    y_test_pred = rf.predict(x_test_scaled)
-    train_results = train
-    train_results["Predicted"] = y_train_pred
-    test_results = test
-    test_results["Predicted"] = y_test_pred
-    df_y = test_results
 
+def fit_emotion_model(train, n_jobs=None):
+    scaler = StandardScaler()
+    x_train_scaled = scaler.fit_transform(train[ANALYSIS_FEATURE_COLUMNS])
+    rf = RandomForestRegressor(
+        n_estimators=100, random_state=42, n_jobs=model_jobs(n_jobs)
+    )
+    rf.fit(x_train_scaled, train["Vibe_Emotion_Trend"])
+    return scaler, rf
+
+
+def train_emotion_models(imputed_dataset, n_jobs=None):
+    """
+    Fit the two emotion regressors.
+    The "sad" model only sees Frustrated/Sad employees; the "happy" model sees
+    them alongside the rest and scores everyone else. The two are independent,
+    so they are fitted side by side; tree building releases the GIL.
+    """
+    imputed_dataset = encode_emotions(imputed_dataset.copy())
+    imputed_clean = imputed_dataset.dropna(subset=["Vibe_Emotion_Trend"])
     sad_df = imputed_clean[imputed_clean["Vibe_Emotion_Trend"].isin([1.0, 2.0])]
     happy_df = imputed_clean[~imputed_clean["Vibe_Emotion_Trend"].isin([1.0, 2.0])]
-    sad_train, sad_test = train_test_split(sad_df, test_size=0.1, random_state=42)
-    happy_train, happy_test = train_test_split(happy_df, test_size=0.3, random_state=42)
-    happy_test = pd.concat([happy_df, imputed_null_emo])
-    train = pd.concat([sad_train, happy_train])
-    test = pd.concat([happy_test])
-    x_train = train.drop(columns=["Employee_ID", "Vibe_Emotion_Trend"])
-    y_train = train["Vibe_Emotion_Trend"]
-    x_test = test.drop(columns=["Employee_ID", "Vibe_Emotion_Trend"])
-    scaler = StandardScaler()
-    x_train_scaled = scaler.fit_transform(x_train)
-    x_test_scaled = scaler.transform(x_test)
-    rf = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf.fit(x_train_scaled, y_train)
-    y_train_pred = rf.predict(x_train_scaled)
-    y_test_pred = rf.predict(x_test_scaled)
-    train_results = train
-    train_results["Predicted"] = y_train_pred
-    test_results = test
-    test_results["Predicted"] = y_test_pred
-    df_x = test_results
-    df_net = pd.concat([df_x, df_y])
-    df = df_net
+    sad_train, _ = train_test_split(sad_df, test_size=0.1, random_state=42)
+    happy_train, _ = train_test_split(happy_df, test_size=0.3, random_state=42)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        sad = pool.submit(fit_emotion_model, sad_train, n_jobs)
+        happy = pool.submit(
+            fit_emotion_model, pd.concat([sad_train, happy_train]), n_jobs
+        )
+        return {"sad": sad.result(), "happy": happy.result()}
+
+
+def fit_analysis_models(features, n_jobs=None):
+    """Fit the imputer and emotion models on features and bundle them for the registry"""
+    imputer = build_imputer().fit(features[ANALYSIS_FEATURE_COLUMNS])
+    imputed_dataset = impute_data(features.copy(), imputer)
+    return {
+        "schema_hash": schema_hash(ANALYSIS_FEATURE_COLUMNS),
+        "feature_columns": ANALYSIS_FEATURE_COLUMNS,
+        "feature_profile": feature_profile(features, ANALYSIS_FEATURE_COLUMNS),
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "train_rows": len(features),
+        "imputer": imputer,
+        "models": train_emotion_models(imputed_dataset, n_jobs),
+    }
+
+
+def predict_emotions(imputed_dataset, models=None, n_jobs=None):
+    """Score every employee, training the emotion models first unless given"""
+    if models is None:
+        models = train_emotion_models(imputed_dataset, n_jobs)
+    imputed_dataset = encode_emotions(imputed_dataset)
+
+    is_sad = imputed_dataset["Vibe_Emotion_Trend"].isin([1.0, 2.0])
+    results = []
+    for name, group in (
+        ("happy", imputed_dataset[~is_sad]),
+        ("sad", imputed_dataset[is_sad]),
+    ):
+        group = group.copy()
+        if not group.empty:
+            scaler, rf = models[name]
+            rf.set_params(n_jobs=model_jobs(n_jobs))
+            group["Predicted"] = rf.predict(
+                scaler.transform(group[ANALYSIS_FEATURE_COLUMNS])
+            )
+        results.append(group)
+    df = pd.concat(results)
     emotion_bins = {
         "Frustrated": (0, 1.5),
         "Sad": (1.50001, 2.5),
@@ -730,6 +889,7 @@ async def save_to_mongodb(final_dataset):
         result = None
         if bulk_operations:
             result = await async_db.analyzed_profile.bulk_write(bulk_operations)
+            profile_context.invalidate()
             print(
                 f"Data saved to MongoDB at {current_ist.strftime('%Y-%m-%d %I:%M %p IST')}"
             )
@@ -739,8 +899,9 @@ async def save_to_mongodb(final_dataset):
 
         return result
     except Exception as e:
+        # Raised so the caller does not advance the analysis state past unsaved rows
         logger.error(f"Error saving to MongoDB: {str(e)}", exc_info=True)
-        return None
+        raise
 
 
 async def get_employee_profile_json(employee_id: str) -> dict:
@@ -748,103 +909,7 @@ async def get_employee_profile_json(employee_id: str) -> dict:
     logger.info(f"Creating JSON profile for employee: {employee_id}")
 
     try:
-        # Get all performance records and sort them manually
-        all_performance = await async_db.performance.find(
-            {"Employee_ID": employee_id}, {"_id": 0}
-        ).to_list(length=None)
-
-        # Custom sorting function for performance periods
-        def sort_performance(record):
-            period = record["Review_Period"]
-            year = int(period.split()[-1])
-            half = 1 if "H1" in period else 2
-            return (year, half)
-
-        # Sort and get last 3 entries
-        sorted_performance = sorted(
-            all_performance, key=sort_performance, reverse=True
-        )[:3]
-
-        collections_data = {
-            "employee_id": employee_id,
-            "onboarding": await async_db.onboarding.find_one(
-                {"Employee_ID": employee_id}, {"_id": 0}
-            ),
-            "vibemeter": await async_db.vibemeter.find(
-                {"Employee_ID": employee_id}, {"_id": 0}
-            )
-            .sort([("Response_Date", -1)])
-            .limit(3)
-            .to_list(length=None),
-            "performance": sorted_performance,  # Use manually sorted performance data
-            "rewards": await async_db.rewards.find(
-                {"Employee_ID": employee_id}, {"_id": 0}
-            )
-            .sort([("Award_Date", -1)])
-            .limit(3)
-            .to_list(length=None),
-            "leave": await async_db.leave.find({"Employee_ID": employee_id}, {"_id": 0})
-            .sort([("Leave_Start_Date", -1)])
-            .limit(3)
-            .to_list(length=None),
-            "activity": await async_db.activity.find(
-                {"Employee_ID": employee_id}, {"_id": 0}
-            )
-            .sort([("Date", -1)])
-            .limit(3)
-            .to_list(length=None),
-            "analyzed_profile": await async_db.analyzed_profile.find_one(
-                {"Employee_ID": employee_id}, {"_id": 0}, sort=[("timestamp", -1)]
-            ),
-        }
-
-        logger.debug(f"Calculating summary metrics for: {employee_id}")
-
-        # Calculate summary metrics
-        # summary = {}
-
-        # if collections_data["vibemeter"]:
-        #     summary["average_vibe_score"] = sum(v["Vibe_Score"] for v in collections_data["vibemeter"]) / len(collections_data["vibemeter"])
-        #     summary["latest_vibe_score"] = collections_data["vibemeter"][0]["Vibe_Score"]
-        #     summary["latest_vibe_date"] = collections_data["vibemeter"][0]["Response_Date"]
-
-        # if collections_data["rewards"]:
-        #     summary["recent_rewards"] = sum(r["Reward_Points"] for r in collections_data["rewards"])
-        #     summary["latest_reward"] = {
-        #         "type": collections_data["rewards"][0]["Award_Type"],
-        #         "date": collections_data["rewards"][0]["Award_Date"]
-        #     }
-
-        # if collections_data["performance"]:
-        #     summary["latest_performance"] = {
-        #         "rating": collections_data["performance"][0]["Performance_Rating"],
-        #         "feedback": collections_data["performance"][0]["Manager_Feedback"],
-        #         "period": collections_data["performance"][0]["Review_Period"]
-        #     }
-
-        # if collections_data["leave"]:
-        #     summary["recent_leave_days"] = sum(l["Leave_Days"] for l in collections_data["leave"])
-        #     summary["latest_leave"] = {
-        #         "days": collections_data["leave"][0]["Leave_Days"],
-        #         "start_date": collections_data["leave"][0]["Leave_Start_Date"]
-        #     }
-
-        # if collections_data["activity"]:
-        #     summary["recent_avg_work_hours"] = sum(a.get("Work_Hours", 0) for a in collections_data["activity"]) / len(collections_data["activity"])
-        #     summary["latest_activity"] = {
-        #         "work_hours": collections_data["activity"][0]["Work_Hours"],
-        #         "date": collections_data["activity"][0]["Date"]
-        #     }
-
-        # if collections_data["onboarding"]:
-        #     summary["onboarding_status"] = {
-        #         "mentor_assigned": collections_data["onboarding"]["Mentor_Assigned"],
-        #         "training_completed": collections_data["onboarding"]["Initial_Training_Completed"],
-        #         "feedback": collections_data["onboarding"]["Onboarding_Feedback"]
-        #     }
-
-        # collections_data["summary"] = summary
-
+        collections_data = await build_profile_context(employee_id)
         logger.info(f"Successfully created JSON profile for: {employee_id}")
         return collections_data
 
@@ -855,31 +920,200 @@ async def get_employee_profile_json(employee_id: str) -> dict:
         return {}
 
 
-async def analyzed_profile():
+async def get_high_water_marks():
+    """Return the newest _id of every analysis collection"""
+    marks = {}
+    for collection_name in ANALYSIS_COLLECTIONS:
+        latest = await async_db[collection_name].find_one(
+            {}, {"_id": 1}, sort=[("_id", -1)]
+        )
+        marks[collection_name] = latest["_id"] if latest else None
+    return marks
+
+
+async def find_changed_employees(previous_marks, current_marks):
+    """Collect employees with rows written between two sets of high-water marks"""
+    changed = set()
+    for collection_name in ANALYSIS_COLLECTIONS:
+        current = current_marks.get(collection_name)
+        if current is None:
+            continue
+        query = {"_id": {"$lte": current}}
+        previous = previous_marks.get(collection_name)
+        if previous is not None:
+            query["_id"]["$gt"] = previous
+        changed.update(await async_db[collection_name].distinct("Employee_ID", query))
+    return changed
+
+
+async def load_analysis_state():
+    return await async_db.analysis_state.find_one({"_id": ANALYSIS_STATE_ID})
+
+
+async def save_analysis_state(marks, stats):
+    await async_db.analysis_state.update_one(
+        {"_id": ANALYSIS_STATE_ID},
+        {
+            "$set": {
+                "high_water_marks": marks,
+                "stats": stats,
+                "updated_at": datetime.now(timezone.utc),
+            }
+        },
+        upsert=True,
+    )
+
+
+async def save_cached_features(features, employee_ids=None):
+    """Store per-employee feature rows so incremental runs can reuse them
+
+    When employee_ids is given only those employees are replaced, otherwise the
+    whole cache is rebuilt.
+    """
+    query = {"Employee_ID": {"$in": list(employee_ids)}} if employee_ids else {}
+    await async_db.analysis_features.delete_many(query)
+    records = features.to_dict("records")
+    if records:
+        await async_db.analysis_features.insert_many(records)
+
+
+def compute_features(
+    frames, stats, max_entries=None, cached_features=None, changed=None
+):
+    """Features stage: build features and merge them with the cached ones
+
+    Returns the full feature table, the freshly built rows and the statistics,
+    since mutations of stats are lost when this runs in a worker process.
+    """
+    changed_features = build_features(frames, stats, max_entries)
+    if changed is None:
+        return changed_features, changed_features, stats
+
+    if cached_features is not None and not cached_features.empty:
+        cached_features = cached_features[
+            ~cached_features["Employee_ID"].isin(changed)
+        ].drop(columns=["updated_at"], errors="ignore")
+    features = pd.concat([cached_features, changed_features], ignore_index=True)
+    return features, changed_features, stats
+
+
+async def analyzed_profile(
+    incremental: bool = False, executor=None, progress=None, retrain: bool = False
+):
+    """Analyze employee profiles and store the predicted emotions
+
+    With incremental=True only employees that received new activity, leave,
+    onboarding, performance, reward or vibe rows since the last run are
+    recomputed; cached features are reused for everyone else. Falls back to a
+    full rebuild when no previous run has been recorded.
+
+    The CPU-bound stages run in executor when one is given, and progress is
+    called with (stage, status) as each of ANALYSIS_STAGES starts and ends.
+
+    The fitted imputer and emotion models are reused from the model registry and
+    only refit when retrain is set or the registry says they are stale.
+    """
+    loop = asyncio.get_running_loop()
+
+    def report(stage, status):
+        if progress is not None:
+            progress(stage, status)
+
+    async def run_cpu(func, *args):
+        if executor is None:
+            return func(*args)
+        return await loop.run_in_executor(executor, func, *args)
+
+    async def run_cpu_stage(stage, func, *args):
+        report(stage, "running")
+        result = await run_cpu(func, *args)
+        report(stage, "completed")
+        return result
+
+    async def run_thread_stage(stage, func, *args):
+        # For stages using the model bundle, which would otherwise be pickled to a worker
+        report(stage, "running")
+        result = await asyncio.to_thread(func, *args)
+        report(stage, "completed")
+        return result
+
     try:
-        activity_df = await load_collection_to_dataframe("activity")
-        leave_df = await load_collection_to_dataframe("leave")
-        onboard_df = await load_collection_to_dataframe("onboarding")
-        performance_df = await load_collection_to_dataframe("performance")
-        rewards_df = await load_collection_to_dataframe("rewards")
-        vibemeter_df = await load_collection_to_dataframe("vibemeter")
-
-        activity = activity_data(activity_df)
-        leave = leave_data(leave_df)
-        onboard = onboard_data(onboard_df)
-        performance = performance_data(performance_df)
-        rewards = rewards_data(rewards_df)
-        vibemeter = vibemeter_data(
-            vibemeter_df, activity, leave, onboard, performance, rewards
+        report("load", "running")
+        state = await load_analysis_state() if incremental else None
+        current_marks = await get_high_water_marks()
+
+        if state:
+            stats = state.get("stats", {})
+            changed = await find_changed_employees(
+                state.get("high_water_marks", {}), current_marks
+            )
+            if not changed:
+                report("load", "completed")
+                logger.info("No new data since the last analysis run")
+                return None
+            logger.info(f"Incremental analysis for {len(changed)} employees")
+
+            query = {"Employee_ID": {"$in": list(changed)}}
+            frames = {
+                name: await load_collection_to_dataframe(
+                    name, query, ANALYSIS_SCHEMAS[name]
+                )
+                for name in ANALYSIS_COLLECTIONS
+            }
+            cached_features = await load_collection_to_dataframe("analysis_features")
+        else:
+            changed = None
+            stats = {}
+            frames = {
+                name: await load_collection_to_dataframe(
+                    name, schema=ANALYSIS_SCHEMAS[name]
+                )
+                for name in ANALYSIS_COLLECTIONS
+            }
+            cached_features = None
+        report("load", "completed")
+
+        features, changed_features, stats = await run_cpu_stage(
+            "features",
+            compute_features,
+            frames,
+            stats,
+            settings.ANALYSIS_MAX_SEQUENCE_ENTRIES,
+            cached_features,
+            changed,
         )
 
-        negative, positive, empty_emotions = divide_emotions(
-            vibemeter, activity, leave, onboard, performance, rewards
+        report("models", "running")
+        # The bundle is loaded and used in this process, so the forests are only
+        # pickled (back from the worker) when they are refitted
+        bundle = None if retrain else await asyncio.to_thread(load_models)
+        reason = "requested" if retrain else None
+        reason = reason or retrain_reason(bundle, features, ANALYSIS_FEATURE_COLUMNS)
+        if reason:
+            logger.info(f"Refitting analysis models: {reason}")
+            bundle = await run_cpu(fit_analysis_models, features)
+            await asyncio.to_thread(save_models, bundle)
+        else:
+            logger.info(f"Reusing analysis models version {bundle['version']}")
+        report("models", "completed")
+
+        # Imputing and predicting are per employee, so only the changed ones are scored
+        scoring = features if changed is None else features[features["Employee_ID"].isin(changed)]
+        imputed_dataset = await run_thread_stage(
+            "impute", impute_data, scoring.copy(), bundle["imputer"]
+        )
+        final_dataset = await run_thread_stage(
+            "predict", predict_emotions, imputed_dataset, bundle["models"]
         )
-        imputed_dataset = impute_data(negative, positive, empty_emotions)
-        final_dataset = predict_emotions(imputed_dataset)
 
+        report("save", "running")
         result = await save_to_mongodb(final_dataset)
+
+        cached = changed_features.copy()
+        cached["updated_at"] = datetime.now(timezone.utc)
+        await save_cached_features(cached, changed)
+        await save_analysis_state(current_marks, stats)
+        report("save", "completed")
         return result
 
     except Exception as e:
@@ -888,6 +1122,4 @@ async def analyzed_profile():
 
 
 if __name__ == "__main__":
-    import asyncio
-
     print(asyncio.run(analyzed_profile()))
@@ -0,0 +1,94 @@
+"""
+Stand-in for the OpenAI-compatible chat completions endpoint, for running the
+question bank pipelines end to end without an API key or quota:
+
+    python -m src.analysis.fake_llm_server --port 8808 --rate-limit-every 5
+    python -m src.analysis.question_bank_pipeline --relationships --base-url http://127.0.0.1:8808/v1/
+
+Relationship scores and tags are derived from a hash of the question text, so
+reruns give identical output. Every Nth request can be answered with a Gemini
+style 429 to exercise the retry path.
+"""
+import argparse
+import hashlib
+import json
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FAKE_TAGS = ["Career_Concerns", "Recognition_Gap", "Work_Overload_Stress", "Job_Satisfaction_Concerns"]
+
+app = FastAPI()
+app.state.requests = 0
+app.state.rate_limit_every = 0
+app.state.retry_delay = 1
+
+
+def _stable_int(text: str) -> int:
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+
+
+def _relationship_content(prompt: str) -> dict:
+    question_a = re.search(r'\*\*Question A:\*\*\s*"(.*?)"', prompt, re.S)
+    others = re.findall(r"^\s*\d+\.\s(.*)$", prompt.split("**Other Questions List:**", 1)[1], re.M)
+    primary = question_a.group(1) if question_a else ""
+    return {"relationships": [
+        {"question_number": i, "relationship_score": _stable_int(primary + other) % 101}
+        for i, other in enumerate(others, 1)
+    ]}
+
+
+def _tagging_content(prompt: str) -> dict:
+    questions = re.findall(r"^Question \d+: (.*)$", prompt, re.M)
+    return {"questions": [
+        {"question": question, "tags": [FAKE_TAGS[_stable_int(question) % len(FAKE_TAGS)]]}
+        for question in questions
+    ]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.requests += 1
+    if app.state.rate_limit_every and app.state.requests % app.state.rate_limit_every == 0:
+        return JSONResponse(status_code=429, content=[{"error": {
+            "code": 429,
+            "status": "RESOURCE_EXHAUSTED",
+            "details": [{
+                "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                "retryDelay": f"{app.state.retry_delay}s",
+            }],
+        }}])
+
+    prompt = body["messages"][-1]["content"]
+    if "**Other Questions List:**" in prompt:
+        content = _relationship_content(prompt)
+    else:
+        content = _tagging_content(prompt)
+
+    return {
+        "id": f"fake-{app.state.requests}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": json.dumps(content)},
+        }],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM endpoint")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--retry-delay", type=int, default=1, help="retryDelay seconds sent with each 429")
+    args = parser.parse_args()
+
+    app.state.rate_limit_every = args.rate_limit_every
+    app.state.retry_delay = args.retry_delay
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+
+from utils.app_logger import setup_logger
+from utils.config import settings
+
+logger = setup_logger("src/analysis/model_registry.py")
+
+MANIFEST_FILE = "manifest.json"
+# Older bundles kept on disk so a bad retrain can be rolled back by hand
+KEEP_VERSIONS = 3
+
+
+def schema_hash(columns: List[str]) -> str:
+    """Fingerprint of the feature columns the models were fitted on"""
+    return hashlib.sha256(json.dumps(sorted(columns)).encode()).hexdigest()[:16]
+
+
+def feature_profile(features, columns: List[str]) -> Dict[str, List[Optional[float]]]:
+    """Per-column mean and standard deviation, ignoring missing values"""
+    profile = {}
+    for column in columns:
+        values = features[column].to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            profile[column] = [float(values.mean()), float(values.std())]
+        else:
+            profile[column] = [None, None]
+    return profile
+
+
+def drift_score(reference: Dict[str, List[float]], current: Dict[str, List[float]]):
+    """Largest shift of a feature mean, in training standard deviations"""
+    score = 0.0
+    for column, (ref_mean, ref_std) in reference.items():
+        cur_mean = current.get(column, [None, None])[0]
+        if ref_mean is None or cur_mean is None:
+            continue
+        score = max(score, abs(cur_mean - ref_mean) / ((ref_std or 0.0) + 1e-9))
+    return score
+
+
+def _model_dir() -> str:
+    return settings.ANALYSIS_MODEL_DIR
+
+
+def _read_manifest() -> Optional[Dict]:
+    path = os.path.join(_model_dir(), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_models() -> Optional[Dict]:
+    """Load the current model bundle, or None when nothing usable is stored"""
+    try:
+        manifest = _read_manifest()
+        if manifest is None:
+            return None
+        bundle = joblib.load(os.path.join(_model_dir(), manifest["file"]))
+        if bundle.get("version") != manifest["version"]:
+            logger.warning("Model manifest and bundle versions disagree, ignoring")
+            return None
+        return bundle
+    except Exception as e:
+        logger.error(f"Error loading analysis models: {str(e)}")
+        return None
+
+
+def save_models(bundle: Dict) -> Dict:
+    """
+    Persist a freshly fitted bundle as the next version.
+    The manifest is swapped in last so readers never see a half-written model.
+    """
+    model_dir = _model_dir()
+    os.makedirs(model_dir, exist_ok=True)
+    manifest = _read_manifest()
+    version = (manifest["version"] + 1) if manifest else 1
+    file_name = f"emotion_models_v{version}.joblib"
+
+    bundle["version"] = version
+    joblib.dump(bundle, os.path.join(model_dir, file_name))
+
+    new_manifest = {
+        "version": version,
+        "file": file_name,
+        "schema_hash": bundle["schema_hash"],
+        "trained_at": bundle["trained_at"],
+        "train_rows": bundle["train_rows"],
+    }
+    tmp_path = os.path.join(model_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(new_manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(model_dir, MANIFEST_FILE))
+
+    for old_version in range(1, version - KEEP_VERSIONS + 1):
+        old_path = os.path.join(model_dir, f"emotion_models_v{old_version}.joblib")
+        if os.path.exists(old_path):
+            os.remove(old_path)
+
+    logger.info(f"Saved analysis models version {version}")
+    return new_manifest
+
+
+def retrain_reason(bundle: Optional[Dict], features, columns: List[str]) -> Optional[str]:
+    """Why the stored bundle cannot be reused for features, or None when it can"""
+    if bundle is None:
+        return "no stored models"
+    if bundle["schema_hash"] != schema_hash(columns):
+        return "feature schema changed"
+
+    trained_at = datetime.fromisoformat(bundle["trained_at"])
+    age_hours = (datetime.now(timezone.utc) - trained_at).total_seconds() / 3600
+    if age_hours >= settings.ANALYSIS_MODEL_MAX_AGE_HOURS:
+        return f"models are {age_hours:.0f} hours old"
+
+    score = drift_score(bundle["feature_profile"], feature_profile(features, columns))
+    if score > settings.ANALYSIS_DRIFT_THRESHOLD:
+        return f"feature drift {score:.2f}"
+    return None
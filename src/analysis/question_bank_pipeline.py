@@ -1,106 +1,197 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Tuple
+import argparse
+import asyncio
 import json
-from utils.api_key_rotate import APIKeyManager
+import os
+from utils.api_key_rotate import APIKeyManager, parse_retry_delay
 from src.analysis.data.question_bank import question_bank 
+from src.analysis.question_embeddings import candidate_partners
 from utils.config import settings
 from src.chatbot.system_prompts import QUESTION_BANK_TAGGING_PROMPT, RELATIONSHIP_SCORE_SYSTEM_PROMPT
-from pathlib import Path
 from langsmith.wrappers import wrap_openai
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError
 
-def get_model(google_api_manager):
-    google_client = OpenAI(
-        api_key=google_api_manager.use_and_get_key(),
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-    )
-    return wrap_openai(google_client)
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+RELATIONSHIP_MODEL = "gemini-2.5-pro-exp-03-25"
+TAGGING_MODEL = "gemini-2.5-pro-exp-03-25"
 
-def save_to_json(data: Dict, filename: str):
-    """Save data to JSON file, appending if file exists"""
-    file_path = Path(filename)
-    
-    try:
-        # Read existing data if file exists
-        if file_path.exists():
-            with open(file_path, 'r') as f:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = [existing_data]
-        else:
-            existing_data = []
-            
-        # Append new data
-        existing_data.append(data)
-        
-        # Write back to file
-        with open(file_path, 'w') as f:
-            json.dump(existing_data, f, indent=2)
-            
-    except Exception as e:
-        print(f"Error saving to JSON: {e}")
-    
-def tag_questions_batch(questions: List[str], api_manager) -> List[Dict]:
-    try:
-        # Initialize model client
-        model_client = get_model(api_manager)
-        
-        # Prepare the questions as a batch
-        batch_content = "Please analyze these questions and provide relevant tags for each:\n"
-        for i, q in enumerate(questions, 1):
-            batch_content += f"Question {i}: {q}\n"
-            
-        response = model_client.chat.completions.create(
-            model="gemini-2.5-pro-exp-03-25",
-            messages=[
-                {"role": "system", "content": QUESTION_BANK_TAGGING_PROMPT},
-                {"role": "user", "content": batch_content}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        print(response.choices[0].message.content)
+# Rough characters per token, for sizing tagging batches without a tokenizer
+CHARS_PER_TOKEN = 4
+
+class AsyncClientPool:
+    """One AsyncOpenAI client per API key for the length of a pipeline run"""
+    def __init__(self, base_url: str = GEMINI_BASE_URL):
+        self.base_url = base_url
+        self.clients = {}
+
+    def __call__(self, api_key: str):
+        if api_key not in self.clients:
+            self.clients[api_key] = wrap_openai(AsyncOpenAI(api_key=api_key, base_url=self.base_url))
+        return self.clients[api_key]
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.close()
+
+async def complete_json(api_manager: APIKeyManager, client_for_key, model: str, system_prompt: str, user_prompt: str):
+    """One JSON-mode completion on the next key with capacity, moving to another key on a 429"""
+    while True:
+        api_key = await api_manager.acquire()
+        try:
+            response = await client_for_key(api_key).chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+        except RateLimitError as e:
+            # Park the key for as long as the provider asked and try another one
+            api_manager.report_rate_limited(api_key, parse_retry_delay(e))
+            continue
         return json.loads(response.choices[0].message.content)
-        
-    except Exception as e:
-        print(f"Error processing question batch: {e}")
-        return None
 
-def process_question_bank(question_bank: List[str], api_keys: List[str], batch_size: int = 10):
-    # Initialize API key manager
-    api_manager = APIKeyManager(
+def _json_array(result, expected: int) -> List:
+    if isinstance(result, dict):
+        # json_object mode wraps the array in an object
+        result = next((value for value in result.values() if isinstance(value, list)), [])
+    if len(result) != expected:
+        raise ValueError(f"expected {expected} results, got {len(result)}")
+    return result
+
+async def run_batches(batches: List, handle, concurrency: int, max_attempts: int, describe) -> List:
+    """
+    Run handle(batch) for every batch with up to `concurrency` in flight, trying
+    each batch up to max_attempts times. Returns the batches that still failed.
+    """
+    queue = asyncio.Queue()
+    for batch in batches:
+        queue.put_nowait(batch)
+    failed = []
+
+    async def worker():
+        while not queue.empty():
+            batch = queue.get_nowait()
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    await handle(batch)
+                    break
+                except Exception as e:
+                    print(f"Error processing {describe(batch)} (attempt {attempt}): {e}")
+            else:
+                failed.append(batch)
+
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    return failed
+
+def pack_tagging_batches(questions: List[Dict], token_budget: int, max_batch_size: int) -> List[List[Dict]]:
+    """
+    Group questions into batches whose prompt fits token_budget. The answer
+    repeats every question, so the same budget also bounds the output.
+    """
+    batches, batch, used = [], [], 0
+    for question in questions:
+        # "Question N: ..." line plus the tag the answer adds for it
+        cost = len(question["question"]) // CHARS_PER_TOKEN + 16
+        if batch and (used + cost > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(question)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def tag_questions_batch(questions: List[str], api_manager, client_for_key) -> List[Dict]:
+    # Prepare the questions as a batch
+    batch_content = "Please analyze these questions and provide relevant tags for each:\n"
+    for i, q in enumerate(questions, 1):
+        batch_content += f"Question {i}: {q}\n"
+
+    result = await complete_json(api_manager, client_for_key, TAGGING_MODEL, QUESTION_BANK_TAGGING_PROMPT, batch_content)
+    return _json_array(result, len(questions))
+
+def _read_jsonl(path: str) -> List[Dict]:
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves at most one torn line at the end
+                continue
+    return entries
+
+async def process_question_bank(
+    question_bank: List[str],
+    api_keys: List[str],
+    output_path: str = "src/analysis/data/tagged_questions1.json",
+    stream_path: str = None,
+    base_url: str = GEMINI_BASE_URL,
+    concurrency: int = 4,
+    token_budget: int = 4000,
+    max_batch_size: int = 40,
+    max_attempts: int = 3,
+    api_manager: APIKeyManager = None,
+):
+    """
+    Tag the bank with several batches in flight across all keys. Each tagged
+    question is appended to a JSONL stream as soon as its batch returns, and a
+    rerun only tags ids not already in it, so adding questions to the bank
+    only costs their own calls. The JSON file process_question_relationships
+    reads is written from the stream at the end.
+    """
+    stream_path = stream_path or os.path.splitext(output_path)[0] + ".jsonl"
+    tagged = {entry["id"]: entry for entry in _read_jsonl(stream_path)}
+    questions = [
+        {"id": i, "question": question}
+        for i, question in enumerate(question_bank, 1)
+        if i not in tagged
+    ]
+    batches = pack_tagging_batches(questions, token_budget, max_batch_size)
+    print(f"{len(tagged)} questions already tagged, {len(questions)} to tag in {len(batches)} batches")
+
+    api_manager = api_manager or APIKeyManager(
         api_keys=api_keys,
-        model_name="gemini-2.5-pro-exp-03-25",
+        model_name=TAGGING_MODEL,
         rate_limit=2,
         cooldown_period=60
     )
-    
-    # Process questions in batches
-    for i in range(0, len(question_bank), batch_size):
-        try:
-            # Get the current batch of questions
-            batch = question_bank[i:i + batch_size]
-            
-            # Get tags for the batch of questions
-            result = tag_questions_batch(batch, api_manager)
-            
-            if result:
-                # Process each tagged question in the batch
-                for j, tagged_question in enumerate(result, 1):
-                    question_data = {
-                        "id": i + j,  # Calculate the overall question ID
-                        "question": tagged_question["question"],
-                        "tags": tagged_question["tags"]
-                    }
-                    
-                    # Save each question result
-                    save_to_json(question_data, "src/analysis/data/tagged_questions1.json")
-                    
-                print(f"Processed and saved batch of questions {i+1} to {i+len(batch)}")
-            
-        except Exception as e:
-            print(f"Error processing batch starting at question {i+1}: {e}")
-            continue
-        
+    client_for_key = AsyncClientPool(base_url)
+
+    async def handle(batch):
+        results = await tag_questions_batch([q["question"] for q in batch], api_manager, client_for_key)
+        entries = [
+            {"id": question["id"], "question": question["question"], "tags": result["tags"]}
+            for question, result in zip(batch, results)
+        ]
+        with open(stream_path, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        for entry in entries:
+            tagged[entry["id"]] = entry
+        print(f"Processed and saved batch of questions {batch[0]['id']} to {batch[-1]['id']}")
+
+    try:
+        failed = await run_batches(
+            batches, handle, concurrency, max_attempts,
+            lambda batch: f"questions {batch[0]['id']} to {batch[-1]['id']}"
+        )
+    finally:
+        await client_for_key.close()
+
+    if failed:
+        print(f"{len(failed)} batches failed; rerun to retry them")
+        return None
+
+    tagged_questions = [tagged[i] for i in sorted(tagged)]
+    with open(output_path, "w") as f:
+        json.dump(tagged_questions, f, indent=2)
+    print(f"Saved {len(tagged_questions)} tagged questions to {output_path}")
+    return tagged_questions
+
 def load_tagged_questions(filename: str) -> List[Dict]:
     """Load tagged questions from JSON file"""
     try:
@@ -110,16 +201,59 @@ def load_tagged_questions(filename: str) -> List[Dict]:
         print(f"Error loading tagged questions: {e}")
         return []
 
-def calculate_question_relationships_batch(question_a: str, other_questions: List[str], api_manager) -> List[Dict]:
-    """Calculate relationship scores between one question and multiple other questions"""
-    try:
-        model_client = get_model(api_manager)
-        
-        # Format the other questions list
-        formatted_other_questions = "\n".join([f"{i+1}. {q}" for i, q in enumerate(other_questions)])
-        
-        # Prepare the prompt
-        user_prompt = f"""Using the relationship analysis logic and JSON output format defined in your system prompt, calculate the relationship score between the primary "Question A" and *each* of the questions provided in the "Other Questions List".
+def question_tag_set(question: Dict) -> set:
+    tags = question.get("tags") or []
+    return {tags} if isinstance(tags, str) else set(tags)
+
+def plan_relationship_batches(tagged_questions: List[Dict], batch_size: int = 50, require_shared_tag: bool = True,
+                              candidates: Optional[Dict[int, Set[int]]] = None,
+                              scored: Optional[Dict[Tuple[int, int], float]] = None) -> List[Dict]:
+    """
+    Every (question, later question) pair to score, grouped into one batch of
+    up to batch_size partners per primary question. With require_shared_tag,
+    pairs without a common tag are skipped; they score far lower and are
+    never used for tag-driven follow-ups. candidates, from
+    question_embeddings.candidate_partners, replaces that rule with each
+    question's nearest neighbours. Pairs already in scored are left out.
+    """
+    batches = []
+    for i, primary_question in enumerate(tagged_questions):
+        primary_tags = question_tag_set(primary_question)
+        if candidates is not None:
+            allowed = candidates.get(primary_question["id"], set())
+            partners = [q for q in tagged_questions[i + 1:] if q["id"] in allowed]
+        else:
+            partners = [
+                q for q in tagged_questions[i + 1:]
+                if not require_shared_tag or primary_tags & question_tag_set(q)
+            ]
+        if scored:
+            partners = [q for q in partners if (primary_question["id"], q["id"]) not in scored]
+        for j in range(0, len(partners), batch_size):
+            batch = partners[j:j + batch_size]
+            batches.append({
+                "from_id": primary_question["id"],
+                "question": primary_question["question"],
+                "to_ids": [q["id"] for q in batch],
+                "others": [q["question"] for q in batch],
+            })
+    return batches
+
+def load_relationship_checkpoint(checkpoint_path: str) -> Dict[Tuple[int, int], float]:
+    """Scores from a previous run keyed by (from_id, to_id), whatever batching produced them"""
+    return {
+        (entry["from_id"], to_id): score
+        for entry in _read_jsonl(checkpoint_path)
+        for to_id, score in zip(entry["to_ids"], entry["scores"])
+    }
+
+async def calculate_question_relationships_batch(question_a: str, other_questions: List[str], api_manager, client_for_key) -> List[float]:
+    """Relationship scores between one question and each of other_questions, in order"""
+    # Format the other questions list
+    formatted_other_questions = "\n".join([f"{i+1}. {q}" for i, q in enumerate(other_questions)])
+
+    # Prepare the prompt
+    user_prompt = f"""Using the relationship analysis logic and JSON output format defined in your system prompt, calculate the relationship score between the primary "Question A" and *each* of the questions provided in the "Other Questions List".
 
         **Question A:**
         "{question_a}"
@@ -128,84 +262,87 @@ def calculate_question_relationships_batch(question_a: str, other_questions: Lis
         {formatted_other_questions}
 
         Provide the results strictly as a JSON array of objects as specified in the system prompt."""
-        
-        response = model_client.chat.completions.create(
-            model="gemini-2.5-pro-exp-03-25",
-            messages=[
-                {"role": "system", "content": RELATIONSHIP_SCORE_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        return json.loads(response.choices[0].message.content)
-        
-    except Exception as e:
-        print(f"Error calculating batch relationships: {e}")
-        return None
 
-def process_question_relationships(api_keys: List[str], batch_size: int = 50):
-    # Load tagged questions
-    tagged_questions = load_tagged_questions("src/analysis/data/tagged_questions1.json")
-    
+    result = await complete_json(api_manager, client_for_key, RELATIONSHIP_MODEL, RELATIONSHIP_SCORE_SYSTEM_PROMPT, user_prompt)
+    return [item["relationship_score"] for item in _json_array(result, len(other_questions))]
+
+async def process_question_relationships(
+    api_keys: List[str],
+    batch_size: int = 50,
+    questions_path: str = "src/analysis/data/tagged_questions1.json",
+    output_path: str = "src/analysis/data/question_relationships1.json",
+    checkpoint_path: str = None,
+    base_url: str = GEMINI_BASE_URL,
+    concurrency: int = 4,
+    require_shared_tag: bool = True,
+    top_k: Optional[int] = None,
+    max_attempts: int = 3,
+    api_manager: APIKeyManager = None,
+):
+    """
+    Score every planned pair with up to `concurrency` calls in flight, each
+    waiting on the key manager for per-minute and per-day capacity. Finished
+    batches are appended to the checkpoint as they land, so a rerun skips their pairs;
+    the relationships file is written from the checkpoint once all are done.
+    """
+    tagged_questions = load_tagged_questions(questions_path)
     if not tagged_questions:
         print("No tagged questions found")
-        return
+        return None
 
-    # Initialize API key manager
-    api_manager = APIKeyManager(
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint.jsonl"
+    candidates = candidate_partners(tagged_questions, top_k) if top_k else None
+    planned = [
+        (batch["from_id"], to_id)
+        for batch in plan_relationship_batches(tagged_questions, batch_size, require_shared_tag, candidates)
+        for to_id in batch["to_ids"]
+    ]
+    scored = load_relationship_checkpoint(checkpoint_path)
+    pending = plan_relationship_batches(tagged_questions, batch_size, require_shared_tag, candidates, scored)
+    print(f"Planned {len(planned)} pairs, {len(planned) - sum(len(b['to_ids']) for b in pending)} already scored; "
+          f"{len(pending)} batches to run")
+
+    api_manager = api_manager or APIKeyManager(
         api_keys=api_keys,
-        model_name="gemini-2.5-pro-exp-03-25",
+        model_name=RELATIONSHIP_MODEL,
         rate_limit=2,
         cooldown_period=60,
         day_limit=40
     )
+    client_for_key = AsyncClientPool(base_url)
 
-    # Process each question as the primary question
-    for i, primary_question in enumerate(tagged_questions):
-        
-        
-# i = 3 is left  and question 17 (118 - 168)   and 
-# 2025-03-31 03:05:56,614 - utils/api_key_rotate.py - INFO - Using key 0 (Daily count: 30/40)
-# Error calculating batch relationships: Error code: 429 - [{'error': {'code': 429, 'message': 'You exceeded your current quota, please check your plan and billing details. For more information on this error, head to: https://ai.google.dev/gemini-api/docs/rate-limits.', 'status': 'RESOURCE_EXHAUSTED', 'details': [{'@type': 'type.googleapis.com/google.rpc.QuotaFailure', 'violations': [{'quotaMetric': 'generativelanguage.googleapis.com/generate_content_free_tier_requests', 'quotaId': 'GenerateRequestsPerDayPerProjectPerModel-FreeTier', 'quotaDimensions': {'location': 'global', 'model': 'gemini-2.0-pro-exp'}, 'quotaValue': '50'}]}, {'@type': 'type.googleapis.com/google.rpc.Help', 'links': [{'description': 'Learn more about Gemini API quotas', 'url': 'https://ai.google.dev/gemini-api/docs/rate-limits'}]}, {'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': '59s'}]}}]
-# 2025-03-31 03:06:00,836 - utils/api_key_rotate.py - INFO - Using key 0 (Daily count: 31/40)
-# Error calculating batch relationships: Error code: 429 - [{'error': {'code': 429, 'message': 'You exceeded your current quota, please check your plan and billing details. For more information on this error, head to: https://ai.google.dev/gemini-api/docs/rate-limits.', 'status': 'RESOURCE_EXHAUSTED', 'details': [{'@type': 'type.googleapis.com/google.rpc.QuotaFailure', 'violations': [{'quotaMetric': 'generativelanguage.googleapis.com/generate_content_free_tier_requests', 'quotaId': 'GenerateRequestsPerDayPerProjectPerModel-FreeTier', 'quotaDimensions': {'location': 'global', 'model': 'gemini-2.0-pro-exp'}, 'quotaValue': '50'}]}, {'@type': 'type.googleapis.com/google.rpc.Help', 'links': [{'description': 'Learn more about Gemini API quotas', 'url': 'https://ai.google.dev/gemini-api/docs/rate-limits'}]}, {'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': '55s'}]}}]
-        if (i>60 or i<=40):
-            continue
-        print(f"Processing relationships for question {i}, {primary_question['id']}")
-        
-        remaining_questions = tagged_questions[i + 1:]
-        
-        # Process remaining questions in batches
-        for j in range(0, len(remaining_questions), batch_size):
-            try:
-                batch = remaining_questions[j:j + batch_size]
-                batch_questions = [q["question"] for q in batch]
-                
-                # Get relationship scores for the batch
-                results = calculate_question_relationships_batch(
-                    primary_question["question"],
-                    batch_questions,
-                    api_manager
-                )
-                
-                if results:
-                    # Process and save each relationship
-                    for k, result in enumerate(results):
-                        relationship = {
-                            "from_id": primary_question["id"],
-                            "to_id": batch[k]["id"],
-                            "score": result["relationship_score"]
-                        }
-                        
-                        # Save each relationship individually
-                        save_to_json(relationship, "src/analysis/data/question_relationships1.json")
-                        
-                    print(f"Processed relationships for question {primary_question['id']} with questions {batch[0]['id']} to {batch[-1]['id']}")
-                
-            except Exception as e:
-                print(f"Error processing batch for question {primary_question['id']}: {e}")
-                continue
+    async def handle(batch):
+        scores = await calculate_question_relationships_batch(
+            batch["question"], batch["others"], api_manager, client_for_key
+        )
+        entry = {"from_id": batch["from_id"], "to_ids": batch["to_ids"], "scores": scores}
+        # One write per line keeps an interrupted run's checkpoint readable
+        with open(checkpoint_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        scored.update(((batch["from_id"], to_id), score) for to_id, score in zip(batch["to_ids"], scores))
+        print(f"Processed relationships for question {batch['from_id']} with questions {batch['to_ids'][0]} to {batch['to_ids'][-1]}")
+
+    try:
+        failed = await run_batches(
+            pending, handle, concurrency, max_attempts,
+            lambda batch: f"relationships for question {batch['from_id']}"
+        )
+    finally:
+        await client_for_key.close()
+
+    if failed:
+        print(f"{len(failed)} batches failed; rerun to retry them")
+        return None
+
+    # Only this plan's pairs; the checkpoint may hold pairs from runs with other settings
+    relationships = [
+        {"from_id": from_id, "to_id": to_id, "score": scored[(from_id, to_id)]}
+        for from_id, to_id in planned
+    ]
+    with open(output_path, "w") as f:
+        json.dump(relationships, f, indent=2)
+    print(f"Saved {len(relationships)} relationships to {output_path}")
+    return relationships
 
 
 if __name__ == "__main__":
@@ -214,6 +351,35 @@ if __name__ == "__main__":
         settings.GOOGLE_API_KEY1, settings.GOOGLE_API_KEY2, settings.GOOGLE_API_KEY3
     ]
 
-    # process_question_bank(question_bank, api_keys)
-    
-    # process_question_relationships(api_keys)
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tag", action="store_true", help="tag the question bank")
+    parser.add_argument("--relationships", action="store_true", help="score question relationships")
+    parser.add_argument("--questions", default="src/analysis/data/tagged_questions1.json")
+    parser.add_argument("--output", default="src/analysis/data/question_relationships1.json")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--all-pairs", action="store_true", help="also score pairs without a shared tag")
+    parser.add_argument("--top-k", type=int, help="only score each question's k most similar questions")
+    parser.add_argument("--base-url", default=GEMINI_BASE_URL, help="e.g. a local src.analysis.fake_llm_server")
+    args = parser.parse_args()
+
+    if args.tag:
+        asyncio.run(process_question_bank(
+            question_bank,
+            api_keys,
+            output_path=args.questions,
+            base_url=args.base_url,
+            concurrency=args.concurrency,
+        ))
+
+    if args.relationships:
+        asyncio.run(process_question_relationships(
+            api_keys,
+            batch_size=args.batch_size,
+            questions_path=args.questions,
+            output_path=args.output,
+            base_url=args.base_url,
+            concurrency=args.concurrency,
+            require_shared_tag=not args.all_pairs,
+            top_k=args.top_k,
+        ))
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Local, CPU-only similarity between question bank entries.
+
+Used to pick the few partners worth sending to the LLM relationship scorer
+(n*k calls instead of n^2), and on its own as an approximate relationship
+graph in the question_relationships.json format:
+
+    python -m src.analysis.question_embeddings --top-k 10 --output approx.json --evaluate
+"""
+import argparse
+import json
+from typing import Dict, List, Set
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from src.database.graph_db import question_bank, question_relations
+
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+# Rows of the similarity matrix computed at a time, bounding memory to chunk x n
+SIMILARITY_CHUNK = 1024
+
+
+def question_text(question: Dict) -> str:
+    # Tags ride along as single tokens; they carry most of the signal TF-IDF can use
+    tags = question.get("tags") or []
+    tags = [tags] if isinstance(tags, str) else tags
+    return " ".join([question["question"], *tags])
+
+
+def embed_questions(texts: List[str], method: str = "tfidf"):
+    """L2-normalised question vectors: TF-IDF by default, or a sentence-transformer if installed"""
+    if method == "sentence-transformer":
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers is not installed; use method='tfidf'")
+        return SentenceTransformer(SENTENCE_MODEL, device="cpu").encode(texts, normalize_embeddings=True)
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, stop_words="english")
+    return normalize(vectorizer.fit_transform(texts))
+
+
+def cosine_top_k(vectors, k: int):
+    """Indices and cosine scores of each row's k nearest other rows, best first"""
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, SIMILARITY_CHUNK):
+        block = vectors[start:start + SIMILARITY_CHUNK] @ vectors.T
+        block = block.toarray() if hasattr(block, "toarray") else np.asarray(block)
+        rows = np.arange(block.shape[0])
+        block[rows, rows + start] = -np.inf  # a question is not its own neighbour
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbours[start:start + len(rows)] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(rows)] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbours, scores
+
+
+def candidate_partners(tagged_questions: List[Dict], k: int, method: str = "tfidf") -> Dict[int, Set[int]]:
+    """Question id -> ids of its k most similar questions, made symmetric"""
+    ids = [q["id"] for q in tagged_questions]
+    neighbours, _ = cosine_top_k(embed_questions([question_text(q) for q in tagged_questions], method), k)
+    candidates = {question_id: set() for question_id in ids}
+    for row, question_id in enumerate(ids):
+        for col in neighbours[row]:
+            candidates[question_id].add(ids[col])
+            candidates[ids[col]].add(question_id)
+    return candidates
+
+
+def approximate_relationships(tagged_questions: List[Dict], k: int, method: str = "tfidf") -> List[Dict]:
+    """k nearest neighbours per question, scored 0-100 like the LLM relationships"""
+    ids = [q["id"] for q in tagged_questions]
+    neighbours, scores = cosine_top_k(embed_questions([question_text(q) for q in tagged_questions], method), k)
+    return [
+        {"from_id": ids[row], "to_id": ids[col], "score": int(round(max(score, 0.0) * 100))}
+        for row in range(len(ids))
+        for col, score in zip(neighbours[row], scores[row])
+    ]
+
+
+def candidate_recall(candidates: Dict[int, Set[int]], relationships: List[Dict], min_score: int) -> float:
+    """Share of LLM-scored pairs at or above min_score that the candidates keep"""
+    strong = [r for r in relationships if r["score"] >= min_score]
+    kept = sum(1 for r in strong if r["to_id"] in candidates.get(r["from_id"], ()))
+    return kept / len(strong) if strong else 1.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=str(question_bank))
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--method", choices=["tfidf", "sentence-transformer"], default="tfidf")
+    parser.add_argument("--output", help="write the approximate relationship graph here")
+    parser.add_argument("--evaluate", action="store_true", help="recall against question_relationships.json")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    if args.output:
+        relationships = approximate_relationships(questions, args.top_k, args.method)
+        with open(args.output, "w") as f:
+            json.dump(relationships, f, indent=2)
+        print(f"Saved {len(relationships)} approximate relationships to {args.output}")
+
+    if args.evaluate:
+        with open(question_relations, "r", encoding="utf-8") as f:
+            scored = json.load(f)
+        candidates = candidate_partners(questions, args.top_k, args.method)
+        pairs = sum(len(partners) for partners in candidates.values()) // 2
+        print(f"{pairs} candidate pairs of {len(questions) * (len(questions) - 1) // 2}")
+        for min_score in (50, 70, 90):
+            print(f"recall of LLM score >= {min_score}: {candidate_recall(candidates, scored, min_score):.2%}")
@@ -1,11 +1,17 @@
+import asyncio
+import copy
 import json
 
 import pytz
-from src.analysis.data_analyze_pipeline import get_employee_profile_json
-from src.chatbot.mentors import mentor_chat_completion
-from src.runner import graph_db
-from utils.config import get_async_database
-from src.chatbot.llm_models import get_model
+from src.chatbot.mentors import stream_mentor_reply
+from src.chatbot.prompt_context import compact_json, history_context, record_prompt, schedule_summary_refresh
+from src.chatbot.session_state import session_states
+from src.database.admin_dashboard import refresh_dashboard_contribution
+from src.database.employee_snapshot import refresh_employee_snapshot
+from src.database.profile_context import profile_context
+from src.runner import question_cache
+from utils.config import get_async_database, settings
+from src.chatbot.llm_models import chat_completion, chat_completion_stream
 from typing import Dict, List
 from datetime import datetime, timezone
 from utils.app_logger import setup_logger
@@ -26,13 +32,9 @@ MODEL_NAME = "gemini-2.0-flash"
 
 async def extract_questions(tag: str):
     try:
-        questions = graph_db.get_questions_by_tag(tag)
+        questions = await question_cache.get_questions(tag)
         logger.info(f"Extracted {len(questions)} questions for tag: {tag}")
-        extracted_questions = []
-        for question in questions:
-            extracted_questions.append(question.get("q.question"))
-        
-        return extracted_questions
+        return list(questions)
     except Exception as e:
         logger.error(f"Error extracting questions for tag {tag}: {str(e)}")
         return []
@@ -70,6 +72,7 @@ async def save_to_chat_history(employee_id: str, session_id: str, role: str, mes
             "chat_name": chat_name
         }
         await async_db.chat_history.insert_one(document)
+        session_states.record_message(session_id, document)
         logger.info(f"[Session: {session_id}] Successfully saved message to chat history")
         return True
     except Exception as e:
@@ -93,7 +96,12 @@ async def save_intent_data(employee_id: str, session_id: str, intent_data: Dict)
             }},
             upsert=True
         )
+        session_states.record_intent(session_id, intent_data)
         logger.info(f"[Session: {session_id}] Successfully saved intent data")
+        # A completed chat changes the risk level shown in the summary and dashboard
+        if intent_data.get("chat_completed", False):
+            await refresh_employee_snapshot(employee_id)
+            await refresh_dashboard_contribution(employee_id)
         return True
     except Exception as e:
         logger.error(f"[Session: {session_id}] Error saving intent data: {str(e)}")
@@ -122,11 +130,11 @@ async def get_intent_data(session_id: str) -> Dict:
         logger.error(f"[Session: {session_id}] Error retrieving intent data: {str(e)}")
         return {}
 
-async def extract_intent_from_employee(employee_profile, session_id: str):
+async def extract_intent_from_employee(employee_profile: str, session_id: str):
     logger.info(f"[Session: {session_id}] Starting intent extraction from employee profile")
     try:        
-        chat_model = get_model(model_provider=MODEL_PROVIDER)
-        response = chat_model.chat.completions.create(
+        response = await chat_completion(
+            MODEL_PROVIDER,
             model=MODEL_NAME,
             messages=[
                 {"role": "system", "content": INTENT_ANALYSIS_SYSTEM_PROMPT},
@@ -169,64 +177,58 @@ async def get_questions_from_tags(tags, tag_number=0, max_questions=10, session_
         logger.error(f"[Session: {session_id}] Error in question extraction: {str(e)}")
         return []
 
-async def generate_next_question(intent_data: Dict, chat_history: List, move_to_next_tag: int = 0, session_id: str = None) -> str:
+async def stream_next_question(intent_data: Dict, chat_history: List, move_to_next_tag: int = 0, session_id: str = None, history_summary: Dict = None):
+    """Next question as text deltas, streamed as the model produces them; errors are raised"""
     logger.info(f"[Session: {session_id}] Generating next question for tag index: {move_to_next_tag}")
-    try:
-        reference_question = await get_questions_from_tags(
-            intent_data["tags"], 
-            move_to_next_tag,
-            session_id=session_id
-        )
+    reference_question = await get_questions_from_tags(
+        intent_data["tags"], 
+        move_to_next_tag,
+        session_id=session_id
+    )
+
+    messages = [{
+        "role": "system",
+        "content": QUESTION_GENERATION_SYSTEM_PROMPT
+    }]
     
-        messages = [{
-            "role": "system",
-            "content": QUESTION_GENERATION_SYSTEM_PROMPT
-        }]
-        
-        question_number = 1
-        
-        if chat_history and len(chat_history) > 0:
-            logger.info(f"[Session: {session_id}] Processing chat history with {len(chat_history)} messages")
-            chat_history.insert(0, {"role": "user", "message": "Hii"})
-            for chat in chat_history:
-                messages.append({
-                    "role": chat["role"],
-                    "content": chat["message"]
-                })
-                
-                if chat["role"] == "assistant":
-                    question_number += 1
-
-        prompt = QUESTION_GENERATION_PROMPT.format(
-            intent_data=json.dumps(intent_data, indent=2),
-            question_number=question_number,
-            reference_question=reference_question,
-            tag_name=intent_data["tags"][move_to_next_tag]["tag"]
-        )
-                
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
-        
-        logger.info(f"[Session: {session_id}] Calling LLM for question generation")
-        chat_model = get_model(model_provider=MODEL_PROVIDER)
-        response = chat_model.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            temperature=0.65,
-            response_format={ "type": "text" }
-        )
-        
-        generated_question = response.choices[0].message.content
-        logger.info(f"[Session: {session_id}] Generated question: {generated_question}")
-        return generated_question
-
-    except Exception as e:
-        logger.error(f"[Session: {session_id}] Error in question generation: {str(e)}")
-        return None
-
-async def analyze_response(intent_data: Dict, chat_history: List, current_tag: str, total_question: int, session_id: str) -> Dict:
+    question_number = 1 + sum(1 for chat in chat_history if chat["role"] == "assistant")
+    window, summary = history_context("question", chat_history, history_summary)
+    
+    if window and len(window) > 0:
+        logger.info(f"[Session: {session_id}] Processing chat history with {len(window)} of {len(chat_history)} messages")
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        opening = [] if summary else [{"role": "user", "message": "Hii"}]
+        for chat in [*opening, *window]:
+            messages.append({
+                "role": chat["role"],
+                "content": chat["message"]
+            })
+
+    prompt = QUESTION_GENERATION_PROMPT.format(
+        intent_data=compact_json(intent_data),
+        question_number=question_number,
+        reference_question=reference_question,
+        tag_name=intent_data["tags"][move_to_next_tag]["tag"]
+    )
+            
+    messages.append({
+        "role": "user",
+        "content": prompt
+    })
+    record_prompt("question", messages, chat_history, window, session_id)
+    
+    logger.info(f"[Session: {session_id}] Calling LLM for question generation")
+    async for delta in chat_completion_stream(
+        MODEL_PROVIDER,
+        model=MODEL_NAME,
+        messages=messages,
+        temperature=0.65,
+        response_format={ "type": "text" }
+    ):
+        yield delta
+
+async def analyze_response(intent_data: Dict, chat_history: List, current_tag: str, total_question: int, session_id: str, history_summary: Dict = None) -> Dict:
     logger.info(f"[Session: {session_id}] Starting response analysis for tag: {current_tag}")
     try:
         messages = [{
@@ -234,10 +236,14 @@ async def analyze_response(intent_data: Dict, chat_history: List, current_tag: s
             "content": RESPONSE_ANALYSIS_SYSTEM_PROMPT
         }]
         
-        if chat_history and len(chat_history) > 0:
+        window, summary = history_context("analysis", chat_history, history_summary)
+        if window and len(window) > 0:
             logger.info(f"[Session: {session_id}] Processing chat history for analysis")
-            chat_history.insert(0, {"role": "user", "message": "Hii"})
-            for chat in chat_history:
+            if summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+            # Prefixed on a copy; chat_history is shared with the speculative question
+            opening = [] if summary else [{"role": "user", "message": "Hii"}]
+            for chat in [*opening, *window]:
                 messages.append({
                     "role": chat["role"],
                     "content": chat["message"]
@@ -245,15 +251,16 @@ async def analyze_response(intent_data: Dict, chat_history: List, current_tag: s
         messages.append({
             "role": "user",
             "content": RESPONSE_ANALYSIS_PROMPT.format(
-                intent_data=json.dumps(intent_data, indent=2),
+                intent_data=compact_json(intent_data),
                 current_tag=current_tag,
                 total_question_number=total_question
             )
         })
+        record_prompt("analysis", messages, chat_history, window, session_id)
 
         logger.info(f"[Session: {session_id}] Calling LLM for response analysis")
-        chat_model = get_model(model_provider=MODEL_PROVIDER)
-        response = chat_model.chat.completions.create(
+        response = await chat_completion(
+            MODEL_PROVIDER,
             model=MODEL_NAME,
             messages=messages,
             temperature=0.65,
@@ -268,7 +275,7 @@ async def analyze_response(intent_data: Dict, chat_history: List, current_tag: s
         logger.error(f"[Session: {session_id}] Error in response analysis: {str(e)}")
         return None
     
-async def final_chat_analysis(session_id: str, chat_history, intent_data) -> Dict:
+async def final_chat_analysis(session_id: str, chat_history, intent_data, history_summary: Dict = None) -> Dict:
     """
     Analyze the complete chat history and provide final analysis with mentor recommendation
     """
@@ -280,14 +287,16 @@ async def final_chat_analysis(session_id: str, chat_history, intent_data) -> Dic
             return None
             
         # Format conversation for analysis
-        formatted_conversation = {
-            "conversation_flow": [
-                {
-                    "role": chat["role"],
-                    "message": chat["message"]
-                } for chat in chat_history
-            ]
-        }
+        window, summary = history_context("final_analysis", chat_history, history_summary)
+        formatted_conversation = {}
+        if summary:
+            formatted_conversation["earlier_conversation_summary"] = summary
+        formatted_conversation["conversation_flow"] = [
+            {
+                "role": chat["role"],
+                "message": chat["message"]
+            } for chat in window
+        ]
         
         # Prepare messages for LLM
         messages = [
@@ -297,13 +306,14 @@ async def final_chat_analysis(session_id: str, chat_history, intent_data) -> Dic
             },
             {
                 "role": "user",
-                "content": FINAL_CHAT_ANALYSIS_PROMPT.format(intent_data=json.dumps(intent_data, indent=2), conversation_history=json.dumps(formatted_conversation, indent=2))
+                "content": FINAL_CHAT_ANALYSIS_PROMPT.format(intent_data=compact_json(intent_data), conversation_history=compact_json(formatted_conversation))
             }
         ]
+        record_prompt("final_analysis", messages, chat_history, window, session_id)
         
         logger.info(f"[Session: {session_id}] Calling LLM for final analysis")
-        chat_model = get_model(model_provider=MODEL_PROVIDER)
-        response = chat_model.chat.completions.create(
+        response = await chat_completion(
+            MODEL_PROVIDER,
             model=MODEL_NAME,
             messages=messages,
             temperature=0.7,
@@ -342,68 +352,145 @@ async def final_chat_analysis(session_id: str, chat_history, intent_data) -> Dic
         logger.error(f"[Session: {session_id}] Error in final analysis: {str(e)}", exc_info=True)
         return None
 
-async def chat_complete(employee_id: str, session_id: str = None, message: str = None) -> Dict:
+async def _forward_tokens(deltas, collected: List[str]):
+    """Re-yield text deltas as token events, keeping them in collected"""
+    async for delta in deltas:
+        collected.append(delta)
+        yield {"type": "token", "content": delta}
+
+async def _buffer_deltas(deltas, queue: asyncio.Queue):
+    """Run a delta stream to completion into queue, ending with None (or the error)"""
+    try:
+        async for delta in deltas:
+            queue.put_nowait(delta)
+        queue.put_nowait(None)
+    except Exception as e:
+        queue.put_nowait(e)
+
+async def _replay_deltas(queue: asyncio.Queue):
+    """Deltas buffered by _buffer_deltas: those already produced, then the rest as they arrive"""
+    while True:
+        delta = await queue.get()
+        if delta is None:
+            return
+        if isinstance(delta, Exception):
+            raise delta
+        yield delta
+
+async def _save_question(employee_id: str, session_id: str, question: str, intent_data: Dict, with_intent: bool = True):
+    """Save a generated question, then the intent data the turn advanced"""
+    await save_to_chat_history(employee_id, session_id, "assistant", question, intent_data.get("chat_name", "New Chat"))
+    if with_intent:
+        await save_intent_data(employee_id, session_id, intent_data)
+
+def speculate_next_question(intent_data: Dict, chat_history: List, move_to_next_tag: int, session_id: str, history_summary: Dict = None):
+    """
+    Start generating the question for the current tag before the user's answer is
+    analysed. Most answers leave the tag open, so the question is usually
+    kept; returns the task and the queue its deltas are buffered in.
+    """
+    queue = asyncio.Queue()
+    task = asyncio.create_task(_buffer_deltas(
+        stream_next_question(copy.deepcopy(intent_data), chat_history, move_to_next_tag, session_id, history_summary),
+        queue
+    ))
+    return task, queue
+
+async def chat_complete_events(employee_id: str, session_id: str = None, message: str = None):
+    """
+    One chat turn as events: {"type": "token"} for each piece of the question or
+    mentor reply as it is generated, then a single {"type": "done"} carrying
+    the same payload chat_complete returns. Messages are saved once complete.
+    """
     logger.info(f"[Session: {session_id}] Starting chat completion for employee: {employee_id}")
+    speculation = None
     try:
-        chat_history = await get_chat_history(session_id)
+        # The turn works on copies; the cached session only changes as writes succeed
+        state = await session_states.get(session_id)
+        chat_history = list(state.history)
+        history_summary = state.history_summary
+        schedule_summary_refresh(state)
         
         # New conversation
         if not chat_history or len(chat_history) == 0:
             logger.info(f"[Session: {session_id}] Starting new conversation")
-            employee_profile = await get_employee_profile_json(employee_id)
+            employee_profile = await profile_context.get_json(employee_id)
             
             intent_data = await extract_intent_from_employee(employee_profile, session_id)
             if not intent_data:
                 logger.error(f"[Session: {session_id}] Failed to extract intent data")
-                return {"error": "Failed to analyze employee profile", "conversation_status": "error"}
+                yield {"type": "done", "error": "Failed to analyze employee profile", "conversation_status": "error"}
+                return
             
             await save_intent_data(employee_id, session_id, intent_data)
             
-            question = await generate_next_question(
-                intent_data,
-                chat_history, 
-                move_to_next_tag=0,
-                session_id=session_id
-            )
-            
+            collected = []
+            try:
+                try:
+                    async for event in _forward_tokens(
+                        stream_next_question(intent_data, chat_history, move_to_next_tag=0, session_id=session_id),
+                        collected
+                    ):
+                        yield event
+                except Exception as e:
+                    logger.error(f"[Session: {session_id}] Error in question generation: {str(e)}")
+                    collected = []
+            finally:
+                # Also reached when the client disconnects mid-question; shielded so the save is not cancelled with it
+                if collected:
+                    await asyncio.shield(asyncio.ensure_future(
+                        _save_question(employee_id, session_id, "".join(collected), intent_data, with_intent=False)
+                    ))
+            question = "".join(collected)
+            logger.info(f"[Session: {session_id}] Generated question: {question}")
+
             if not question:
                 logger.error(f"[Session: {session_id}] Failed to generate initial question")
-                return {"error": "Failed to generate question", "conversation_status": "error"}
-            
-            await save_to_chat_history(employee_id, session_id, "assistant", question, intent_data.get("chat_name", "New Chat"))
-            return {"response": question, "conversation_status": "ongoing", "intent_data": intent_data}
+                yield {"type": "done", "error": "Failed to generate question", "conversation_status": "error"}
+                return
+
+            yield {"type": "done", "response": question, "conversation_status": "ongoing", "intent_data": intent_data}
+            return
         
         # Existing conversation
-        intent_data = await get_intent_data(session_id)
+        intent_data = copy.deepcopy(state.intent_data)
         if not intent_data:
             logger.error(f"[Session: {session_id}] Failed to retrieve intent data")
-            return {"error": "Failed to retrieve conversation context", "conversation_status": "error", "intent_data": intent_data}
+            yield {"type": "done", "error": "Failed to retrieve conversation context", "conversation_status": "error", "intent_data": intent_data}
+            return
         
         if intent_data.get("chat_completed", False):
             logger.info(f"[Session: {session_id}] Mentor already assigned for this conversation")
-            return {
-                "response": await mentor_chat_completion(employee_id, intent_data, chat_history, session_id, message),
+            collected = []
+            try:
+                async for event in _forward_tokens(
+                    stream_mentor_reply(employee_id, intent_data, chat_history, session_id, message, history_summary),
+                    collected
+                ):
+                    yield event
+                response = "".join(collected)
+            except Exception as e:
+                logger.error(f"[Session: {session_id}] Error in mentor chat completion: {str(e)}", exc_info=True)
+                response = "I apologize, but I encountered an error. Please try again or start a new conversation."
+            yield {
+                "type": "done",
+                "response": response,
                 "intent_data": intent_data
             }
+            return
         
         # Check conversation limits before processing message
-        total_questions = sum(1 for chat in chat_history if chat["role"] == "assistant")
+        total_questions = state.question_count
         
         # Find current tag
-        current_tag = None
-        number = 0
-        for index, tag in enumerate(intent_data["tags"]):
-            if not tag.get("completed", False):
-                current_tag = tag["tag"]
-                number = index
-                break
+        number, current_tag = state.current_tag()
         
         # Check if conversation should end
         if (total_questions >= 10 or 
             not current_tag or 
             number >= len(intent_data["tags"])):
             logger.info(f"[Session: {session_id}] Conversation complete - Limits reached")
-            final_analysis = await final_chat_analysis(session_id, chat_history, intent_data)
+            final_analysis = await final_chat_analysis(session_id, chat_history, intent_data, history_summary)
             intent_data["chat_completed"] = True
             intent_data["chat_analysis"] = final_analysis
             intent_data["chat_analysis"]["updated_at"] = datetime.now(timezone.utc)
@@ -413,22 +500,26 @@ async def chat_complete(employee_id: str, session_id: str = None, message: str =
                 response = "Your issue has been forwarded to HR Management. Please wait for their response."
             else:
                 response = f"Thank you for sharing your concerns. Based on our conversation, I recommend you speak with {final_analysis['recommended_mentor']}. You can continue the conversation with them directly in this chat."
-            return {
+            yield {
+                "type": "done",
                 "response": response,
                 "intent_data": intent_data
             }
+            return
         
         # Save user message if conversation is ongoing
         if message is not None:
-            await save_to_chat_history(employee_id, session_id, "user", message, intent_data.get("chat_name", "New Chat"))
-            # Update chat_history after saving new message
-            chat_history = await get_chat_history(session_id)
+            if await save_to_chat_history(employee_id, session_id, "user", message, intent_data.get("chat_name", "New Chat")):
+                chat_history.append({"role": "user", "message": message})
         
-        # Analyze response
-        analysis = await analyze_response(intent_data, chat_history, current_tag, total_questions, session_id)
+        # Analyze response, speculatively generating the question for the current tag alongside
+        if settings.SPECULATIVE_QUESTION_GENERATION:
+            speculation = speculate_next_question(intent_data, chat_history, number, session_id, history_summary)
+        analysis = await analyze_response(intent_data, chat_history, current_tag, total_questions, session_id, history_summary)
         if not analysis:
             logger.error(f"[Session: {session_id}] Failed to analyze response")
-            return {"error": "Failed to analyze response", "conversation_status": "error", "intent_data": intent_data}
+            yield {"type": "done", "error": "Failed to analyze response", "conversation_status": "error", "intent_data": intent_data}
+            return
         
         logger.info(f"[Session: {session_id}] Updating tag summary for {current_tag} and number {number}")
         intent_data["tags"][number]["summary"] = analysis["tag_summary"]
@@ -440,9 +531,14 @@ async def chat_complete(employee_id: str, session_id: str = None, message: str =
             number += 1
         
         # Check if conversation should end after analysis
+        if speculation and (analysis["tag_covered"] or analysis["force_conversation_end"]):
+            logger.info(f"[Session: {session_id}] Discarding speculative question")
+            speculation[0].cancel()
+            speculation = None
+
         if number >= len(intent_data["tags"]) or analysis["force_conversation_end"]:
             logger.info(f"[Session: {session_id}] Conversation complete - Analysis based")
-            final_analysis = await final_chat_analysis(session_id, chat_history, intent_data)
+            final_analysis = await final_chat_analysis(session_id, chat_history, intent_data, history_summary)
             intent_data["chat_completed"] = True
             intent_data["chat_analysis"] = final_analysis
             
@@ -451,36 +547,62 @@ async def chat_complete(employee_id: str, session_id: str = None, message: str =
                 response = "Your issue has been forwarded to HR Management. Please wait for their response."
             else:
                 response = f"Thank you for sharing your concerns. Based on our conversation, I recommend you speak with {final_analysis['recommended_mentor']}. You can continue the conversation with them directly in this chat."
-            return {
+            yield {
+                "type": "done",
                 "response": response,
                 "intent_data": intent_data
             }
-
-        # Generate next question
-        next_question = await generate_next_question(
-            intent_data,
-            chat_history,
-            move_to_next_tag=number,
-            session_id=session_id
-        )
+            return
+
+        # Generate next question, or keep the speculative one if the tag is unchanged
+        if speculation:
+            logger.info(f"[Session: {session_id}] Using speculative question")
+            deltas = _replay_deltas(speculation[1])
+        else:
+            deltas = stream_next_question(intent_data, chat_history, move_to_next_tag=number, session_id=session_id, history_summary=history_summary)
+        collected = []
+        try:
+            try:
+                async for event in _forward_tokens(deltas, collected):
+                    yield event
+            except Exception as e:
+                logger.error(f"[Session: {session_id}] Error in question generation: {str(e)}")
+                collected = []
+        finally:
+            # Save question and updated intent data, even if the client went away mid-question
+            if collected:
+                await asyncio.shield(asyncio.ensure_future(
+                    _save_question(employee_id, session_id, "".join(collected), intent_data)
+                ))
+        next_question = "".join(collected)
+        logger.info(f"[Session: {session_id}] Generated question: {next_question}")
 
         if not next_question:
             logger.error(f"[Session: {session_id}] Failed to generate next question")
-            return {"error": "Failed to generate question", "conversation_status": "error", "intent_data": intent_data}
-
-        # Save question and updated intent data
-        await save_to_chat_history(employee_id, session_id, "assistant", next_question, intent_data.get("chat_name", "New Chat"))
-        await save_intent_data(employee_id, session_id, intent_data)
+            yield {"type": "done", "error": "Failed to generate question", "conversation_status": "error", "intent_data": intent_data}
+            return
 
         logger.info(f"[Session: {session_id}] Successfully completed chat iteration")
-        return {
+        yield {
+            "type": "done",
             "response": next_question, 
             "intent_data": intent_data
         }
 
     except Exception as e:
         logger.error(f"[Session: {session_id}] Error in chat completion: {str(e)}", exc_info=True)
-        return {"error": "An error occurred during the conversation", "conversation_status": "error"}
+        yield {"type": "done", "error": "An error occurred during the conversation", "conversation_status": "error"}
+    finally:
+        # A speculative question that was not used, or a client that went away mid-stream
+        if speculation:
+            speculation[0].cancel()
+    
+async def chat_complete(employee_id: str, session_id: str = None, message: str = None) -> Dict:
+    result = {}
+    async for event in chat_complete_events(employee_id, session_id, message):
+        if event["type"] == "done":
+            result = {key: value for key, value in event.items() if key != "type"}
+    return result
     
 async def is_chat_required(employee_id: str) -> bool:
     """
@@ -1,25 +1,95 @@
 from dotenv import load_dotenv
 from langsmith.wrappers import wrap_openai
 from src.runner import groq_api_manager, google_api_manager
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError
+from utils.api_key_rotate import parse_retry_delay
+from utils.config import settings
+import httpx
 import os
 
 load_dotenv()
 
-def get_model(model_provider: str  = "GROQ"):
-    if model_provider in ["GROQ"]:
-        groq_client=OpenAI(
-            api_key=groq_api_manager.use_and_get_key(),
-            base_url="https://api.groq.com/openai/v1",
-        )
-        return wrap_openai(groq_client)
-    
-    elif model_provider in ["GEMINI"]:  # Google models
-        google_client = OpenAI(
-            api_key=google_api_manager.use_and_get_key(),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+PROVIDERS = {
+    "GROQ": {
+        "base_url": "https://api.groq.com/openai/v1",
+        "api_manager": groq_api_manager,
+    },
+    "GEMINI": {  # Google models
+        "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+        "api_manager": google_api_manager,
+    },
+}
+
+# One async client per (provider, key); each owns a pooled HTTP connection so
+# TLS sessions are reused across requests instead of rebuilt per call
+_async_clients = {}
+
+def _async_client(model_provider: str, api_key: str):
+    client = _async_clients.get((model_provider, api_key))
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0),
         )
-        return wrap_openai(google_client)
-    
-    else:
-        raise ValueError(f"Unsupported model: {model_provider}")
\ No newline at end of file
+        client = wrap_openai(AsyncOpenAI(
+            api_key=api_key,
+            base_url=PROVIDERS[model_provider]["base_url"],
+            http_client=http_client,
+        ))
+        _async_clients[(model_provider, api_key)] = client
+    return client
+
+async def chat_completion(model_provider: str = "GROQ", **kwargs):
+    """
+    chat.completions.create on the next available key. A 429 parks that key
+    for the delay the provider asked for and retries on another one.
+    """
+    if model_provider not in PROVIDERS:
+        raise ValueError(f"Unsupported model: {model_provider}")
+
+    api_manager = PROVIDERS[model_provider]["api_manager"]
+    for attempt in range(settings.LLM_RATE_LIMIT_RETRIES + 1):
+        api_key = await api_manager.acquire()
+        try:
+            return await _async_client(model_provider, api_key).chat.completions.create(**kwargs)
+        except RateLimitError as e:
+            api_manager.report_rate_limited(api_key, parse_retry_delay(e))
+            if attempt == settings.LLM_RATE_LIMIT_RETRIES:
+                raise
+
+async def chat_completion_stream(model_provider: str = "GROQ", **kwargs):
+    """
+    Streaming chat_completion: yields the reply's text deltas as the provider
+    produces them. A 429 is retried on another key only before the first
+    delta; after that the caller has already shown part of the reply. The
+    response is closed however the iteration ends.
+    """
+    if model_provider not in PROVIDERS:
+        raise ValueError(f"Unsupported model: {model_provider}")
+
+    api_manager = PROVIDERS[model_provider]["api_manager"]
+    for attempt in range(settings.LLM_RATE_LIMIT_RETRIES + 1):
+        api_key = await api_manager.acquire()
+        try:
+            stream = await _async_client(model_provider, api_key).chat.completions.create(stream=True, **kwargs)
+            break
+        except RateLimitError as e:
+            api_manager.report_rate_limited(api_key, parse_retry_delay(e))
+            if attempt == settings.LLM_RATE_LIMIT_RETRIES:
+                raise
+
+    # Closing the stream returns its connection to the pool when the consumer stops early
+    async with stream:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+async def close_async_models():
+    """Close the pooled connections; called on application shutdown"""
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.close()
@@ -1,6 +1,9 @@
+import asyncio
 from utils.config import get_async_database
 from src.chatbot.mentors_system_prompt import productivity_and_balance_coach, career_navigator, collaboration_and_conflict_guide, performance_and_skills_enhancer, communication_catalyst, resilience_and_well_being_advocate, innovation_and_solutions_spark, workplace_engagement_ally, change_adaptation_advisor, leadership_foundations_guide
-from src.chatbot.llm_models import get_model
+from src.chatbot.llm_models import chat_completion_stream
+from src.chatbot.prompt_context import history_context, record_prompt
+from src.chatbot.session_state import session_states
 from datetime import datetime, timezone
 from utils.app_logger import setup_logger
 from typing import Dict, List
@@ -22,81 +25,95 @@ async def save_to_chat_history(employee_id: str, session_id: str, role: str, mes
             "timestamp": datetime.now(timezone.utc)
         }
         await collection.insert_one(document)
+        session_states.record_message(session_id, document)
         logger.info(f"[Session: {session_id}] Successfully saved message to chat history")
         return True
     except Exception as e:
         logger.error(f"[Session: {session_id}] Error saving to chat history: {str(e)}")
         return False
 
-async def mentor_chat_completion(employee_id: str, intent_data: Dict, chat_history: List, session_id: str, message: str = None) -> str:
+async def stream_mentor_reply(employee_id: str, intent_data: Dict, chat_history: List, session_id: str, message: str = None, history_summary: Dict = None):
     """
-    Handle chat completion for mentor conversations
+    Mentor reply as text deltas, streamed as the model produces them. The
+    employee's message is saved before the model is called and the reply
+    once streaming stops, including a partial one if the client disconnects.
+    Errors are raised so the caller decides how to surface them.
     """
     logger.info(f"[Session: {session_id}] Starting mentor chat completion")
-    try:
-        mentor_name = intent_data.get("chat_analysis", {}).get("recommended_mentor")
-        if not mentor_name:
-            logger.error(f"[Session: {session_id}] No mentor assigned")
-            return "I apologize, but I don't see a mentor assigned to this conversation. Please start a new conversation."
-        
-        if mentor_name in ["ForwardingRequestToHR"]:
-            return "Your issue has been forwarded to HR Management. Please wait for their response."
+    mentor_name = intent_data.get("chat_analysis", {}).get("recommended_mentor")
+    if not mentor_name:
+        logger.error(f"[Session: {session_id}] No mentor assigned")
+        yield "I apologize, but I don't see a mentor assigned to this conversation. Please start a new conversation."
+        return
 
-        # Get appropriate system prompt based on mentor name
-        system_prompts = {
-            "productivity_and_balance_coach": productivity_and_balance_coach,
-            "career_navigator": career_navigator,
-            "collaboration_and_conflict_guide": collaboration_and_conflict_guide,
-            "performance_and_skills_enhancer": performance_and_skills_enhancer,
-            "communication_catalyst": communication_catalyst,
-            "resilience_and_well_being_advocate": resilience_and_well_being_advocate,
-            "innovation_and_solutions_spark": innovation_and_solutions_spark,
-            "workplace_engagement_ally": workplace_engagement_ally,
-            "change_adaptation_advisor": change_adaptation_advisor,
-            "leadership_foundations_guide": leadership_foundations_guide
-        }
-        
-        system_prompt = system_prompts.get(mentor_name)
-        if not system_prompt:
-            logger.error(f"[Session: {session_id}] Invalid mentor name: {mentor_name}")
-            return "I apologize, but there seems to be an error with the mentor assignment. Please start a new conversation."
+    if mentor_name in ["ForwardingRequestToHR"]:
+        yield "Your issue has been forwarded to HR Management. Please wait for their response."
+        return
+
+    # Get appropriate system prompt based on mentor name
+    system_prompts = {
+        "productivity_and_balance_coach": productivity_and_balance_coach,
+        "career_navigator": career_navigator,
+        "collaboration_and_conflict_guide": collaboration_and_conflict_guide,
+        "performance_and_skills_enhancer": performance_and_skills_enhancer,
+        "communication_catalyst": communication_catalyst,
+        "resilience_and_well_being_advocate": resilience_and_well_being_advocate,
+        "innovation_and_solutions_spark": innovation_and_solutions_spark,
+        "workplace_engagement_ally": workplace_engagement_ally,
+        "change_adaptation_advisor": change_adaptation_advisor,
+        "leadership_foundations_guide": leadership_foundations_guide
+    }
 
-        # Prepare conversation context
-        messages = [{
-            "role": "system",
-            "content": system_prompt
-        }]
-        
-        for chat in chat_history:
-            messages.append({
-                "role": chat["role"],
-                "content": chat["message"]
-            })
+    system_prompt = system_prompts.get(mentor_name)
+    if not system_prompt:
+        logger.error(f"[Session: {session_id}] Invalid mentor name: {mentor_name}")
+        yield "I apologize, but there seems to be an error with the mentor assignment. Please start a new conversation."
+        return
 
-        # Add current message
+    # Prepare conversation context
+    messages = [{
+        "role": "system",
+        "content": system_prompt
+    }]
+
+    # Older turns are carried by the rolling summary once they exceed the mentor budget
+    window, summary = history_context("mentor", chat_history, history_summary)
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+
+    for chat in window:
         messages.append({
-            "role": "user",
-            "content": message
+            "role": chat["role"],
+            "content": chat["message"]
         })
 
-        # Get response from LLM
-        chat_model = get_model(model_provider=MODEL_PROVIDER)
-        response = chat_model.chat.completions.create(
+    # Add current message
+    messages.append({
+        "role": "user",
+        "content": message
+    })
+    record_prompt("mentor", messages, chat_history, window, session_id)
+
+    # The employee's message is kept even if the client goes away mid-reply
+    await save_to_chat_history(employee_id, session_id, "user", message)
+
+    # Stream response from LLM
+    mentor_response = ""
+    try:
+        async for delta in chat_completion_stream(
+            MODEL_PROVIDER,
             model=MODEL_NAME,
             messages=messages,
             temperature=0.7,
             response_format={ "type": "text" }
-        )
-
-        mentor_response = response.choices[0].message.content
+        ):
+            mentor_response += delta
+            yield delta
+    finally:
+        # Shielded so a disconnect cancelling the stream does not cancel the save too
+        if mentor_response:
+            await asyncio.shield(asyncio.ensure_future(
+                save_to_chat_history(employee_id, session_id, "assistant", mentor_response)
+            ))
 
-        # Save interaction to chat history
-        await save_to_chat_history(employee_id, session_id, "user", message)
-        await save_to_chat_history(employee_id, session_id, "assistant", mentor_response)
-
-        logger.info(f"[Session: {session_id}] Successfully completed mentor chat iteration")
-        return mentor_response
-
-    except Exception as e:
-        logger.error(f"[Session: {session_id}] Error in mentor chat completion: {str(e)}", exc_info=True)
-        return "I apologize, but I encountered an error. Please try again or start a new conversation."
\ No newline at end of file
+    logger.info(f"[Session: {session_id}] Successfully completed mentor chat iteration")
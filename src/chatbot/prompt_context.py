@@ -0,0 +1,154 @@
+"""
+How much of a chat session goes into each LLM prompt.
+
+Each prompt type sends the newest messages that fit its budget in
+CHAT_HISTORY_TOKEN_BUDGETS verbatim, and a rolling summary in place of the
+older ones. The summary is extended in the background, a few messages at a
+time, from its previous text plus the messages that have since left the
+smallest window; messages it does not cover yet are still sent verbatim, so
+nothing is dropped while a refresh is pending.
+"""
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+
+from src.chatbot.llm_models import chat_completion
+from src.chatbot.session_state import SessionState, session_states
+from src.chatbot.system_prompts import HISTORY_SUMMARY_PROMPT, HISTORY_SUMMARY_SYSTEM_PROMPT
+from utils.app_logger import setup_logger
+from utils.config import get_async_database, settings
+
+async_db = get_async_database()
+logger = setup_logger("src/chatbot/prompt_context.py")
+
+MODEL_PROVIDER = "GEMINI"
+MODEL_NAME = "gemini-2.0-flash"
+# Same rough estimate the question bank pipeline packs its batches with
+CHARS_PER_TOKEN = 4
+# Role and separators the provider wraps around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_MAX_WORDS = 250
+
+# session_id -> the summary refresh running for it
+_summary_tasks: Dict[str, asyncio.Task] = {}
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+def prompt_tokens(messages: List[Dict]) -> int:
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def _chat_tokens(chat: Dict) -> int:
+    return estimate_tokens(chat["message"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def compact_json(data) -> str:
+    """JSON for prompts without the indentation, which only costs tokens"""
+    return json.dumps(data, separators=(",", ":"), default=str)
+
+
+def window_start(chat_history: List[Dict], budget: int) -> int:
+    """Index where the newest messages fitting budget begin; the latest message is always kept"""
+    used = 0
+    for index in range(len(chat_history) - 1, -1, -1):
+        used += _chat_tokens(chat_history[index])
+        if used > budget:
+            return min(index + 1, len(chat_history) - 1)
+    return 0
+
+
+def history_context(kind: str, chat_history: List[Dict], history_summary: Optional[Dict]) -> Tuple[List[Dict], Optional[str]]:
+    """
+    The messages a prompt of this kind sends verbatim, and the summary text
+    to send in place of the ones before them (None when nothing is left out)
+    """
+    start = window_start(chat_history, settings.CHAT_HISTORY_TOKEN_BUDGETS[kind])
+    covered = history_summary["messages"] if history_summary else 0
+    start = min(start, covered)
+    if start == 0:
+        return chat_history, None
+    return chat_history[start:], history_summary["text"]
+
+
+class PromptMetrics:
+    """Running per-prompt-type totals of estimated prompt size and history tokens left out"""
+    def __init__(self):
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, prompt: int, history_sent: int, history_full: int) -> None:
+        totals = self.totals.setdefault(kind, {"calls": 0, "prompt_tokens": 0, "history_tokens_sent": 0, "history_tokens_full": 0})
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt
+        totals["history_tokens_sent"] += history_sent
+        totals["history_tokens_full"] += history_full
+
+
+prompt_metrics = PromptMetrics()
+
+
+def record_prompt(kind: str, messages: List[Dict], chat_history: List[Dict], window: List[Dict], session_id: str) -> None:
+    prompt = prompt_tokens(messages)
+    history_sent = sum(_chat_tokens(chat) for chat in window)
+    history_full = sum(_chat_tokens(chat) for chat in chat_history)
+    prompt_metrics.record(kind, prompt, history_sent, history_full)
+    logger.info(
+        f"[Session: {session_id}] {kind} prompt ~{prompt} tokens; "
+        f"history {history_sent} of {history_full} tokens sent verbatim ({len(window)}/{len(chat_history)} messages)"
+    )
+
+
+async def refresh_summary(session_id: str, chat_history: List[Dict], previous: Optional[Dict]) -> Optional[Dict]:
+    """Extend the previous summary with the messages of chat_history it does not cover yet and save it"""
+    covered = previous["messages"] if previous else 0
+    conversation = "\n".join(
+        f"{'Employee' if chat['role'] == 'user' else 'Assistant'}: {chat['message']}"
+        for chat in chat_history[covered:]
+    )
+    try:
+        response = await chat_completion(
+            MODEL_PROVIDER,
+            model=MODEL_NAME,
+            messages=[
+                {"role": "system", "content": HISTORY_SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": HISTORY_SUMMARY_PROMPT.format(
+                    previous_summary=previous["text"] if previous else "(none yet)",
+                    conversation=conversation,
+                    max_words=SUMMARY_MAX_WORDS
+                )}
+            ],
+            temperature=0.3,
+            response_format={ "type": "text" }
+        )
+        history_summary = {"text": response.choices[0].message.content.strip(), "messages": len(chat_history)}
+        await async_db.intent_data.update_one(
+            {"session_id": session_id},
+            {"$set": {"history_summary": history_summary}}
+        )
+        session_states.record_summary(session_id, history_summary)
+        logger.info(f"[Session: {session_id}] Summarised the first {len(chat_history)} messages")
+        return history_summary
+    except Exception as e:
+        # The uncovered messages keep being sent verbatim; the next turn retries
+        logger.error(f"[Session: {session_id}] Error refreshing history summary: {str(e)}")
+        return None
+
+
+def schedule_summary_refresh(state: SessionState) -> None:
+    """Start a background summary refresh once enough messages have left the smallest window"""
+    target = window_start(state.history, min(settings.CHAT_HISTORY_TOKEN_BUDGETS.values()))
+    covered = state.history_summary["messages"] if state.history_summary else 0
+    if target - covered < settings.CHAT_SUMMARY_REFRESH_MESSAGES or state.session_id in _summary_tasks:
+        return
+
+    task = asyncio.create_task(refresh_summary(state.session_id, state.history[:target], state.history_summary))
+    _summary_tasks[state.session_id] = task
+    task.add_done_callback(lambda _: _summary_tasks.pop(state.session_id, None))
+
+
+def cancel_summary_refreshes() -> None:
+    """Cancel the pending summary refreshes; their messages stay uncovered and are sent verbatim"""
+    for task in list(_summary_tasks.values()):
+        task.cancel()
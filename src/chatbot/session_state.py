@@ -0,0 +1,105 @@
+import asyncio
+import copy
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.app_logger import setup_logger
+from utils.config import get_async_database, settings
+
+async_db = get_async_database()
+logger = setup_logger("src/chatbot/session_state.py")
+
+
+class SessionState:
+    """
+    A chat session as stored in Mongo: its messages in order, its intent data
+    and the rolling summary of its older messages ({"text", "messages"}, the
+    number of leading messages the text covers)
+    """
+    def __init__(self, session_id: str, history: List[Dict], intent_data: Dict, history_summary: Optional[Dict] = None):
+        self.session_id = session_id
+        self.history = history
+        self.intent_data = intent_data
+        self.history_summary = history_summary
+        self.question_count = sum(1 for chat in history if chat["role"] == "assistant")
+
+    def record_message(self, document: Dict) -> None:
+        self.history.append({key: value for key, value in document.items() if key != "_id"})
+        if document["role"] == "assistant":
+            self.question_count += 1
+
+    def current_tag(self) -> Tuple[int, Optional[str]]:
+        """Index and name of the first tag not yet covered; (0, None) when there is none"""
+        for index, tag in enumerate(self.intent_data.get("tags", [])):
+            if not tag.get("completed", False):
+                return index, tag["tag"]
+        return 0, None
+
+
+class SessionStateCache:
+    """
+    In-process LRU of the most recently used chat sessions, so a turn reads
+    its history and intent data from memory instead of Mongo.
+
+    It is write-through: save_to_chat_history, save_intent_data and the
+    summary refresh call record_* once their Mongo write has succeeded, so
+    a cached session never holds anything that was not persisted. A session
+    that is not cached is loaded from Mongo on its next turn. The cache
+    assumes a session's turns are served by one process, as they are with
+    the single uvicorn worker the app runs under.
+    """
+    def __init__(self, max_sessions: Optional[int] = None):
+        self.max_sessions = max_sessions if max_sessions is not None else settings.SESSION_CACHE_MAX_SESSIONS
+        self.sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def _load(self, session_id: str) -> SessionState:
+        history, intent_data = await asyncio.gather(
+            async_db.chat_history.find(
+                {"session_id": session_id},
+                {"_id": 0}
+            ).sort("timestamp", 1).to_list(length=None),
+            async_db.intent_data.find_one(
+                {"session_id": session_id},
+                {"intent_data": 1, "history_summary": 1, "_id": 0}
+            ),
+        )
+        intent_data = intent_data or {}
+        return SessionState(session_id, history, intent_data.get("intent_data", {}), intent_data.get("history_summary"))
+
+    async def get(self, session_id: str) -> SessionState:
+        state = self.sessions.get(session_id)
+        if state is not None:
+            self.sessions.move_to_end(session_id)
+            self.hits += 1
+            return state
+
+        self.misses += 1
+        state = await self._load(session_id)
+        if self.max_sessions > 0:
+            self.sessions[session_id] = state
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        return state
+
+    def record_message(self, session_id: str, document: Dict) -> None:
+        state = self.sessions.get(session_id)
+        if state is not None:
+            state.record_message(document)
+
+    def record_intent(self, session_id: str, intent_data: Dict) -> None:
+        state = self.sessions.get(session_id)
+        if state is not None:
+            state.intent_data = copy.deepcopy(intent_data)
+
+    def record_summary(self, session_id: str, history_summary: Dict) -> None:
+        state = self.sessions.get(session_id)
+        if state is not None:
+            state.history_summary = history_summary
+
+    def evict(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+
+
+session_states = SessionStateCache()
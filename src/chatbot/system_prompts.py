@@ -473,4 +473,15 @@ Your output MUST be a **strict JSON array** containing objects. Each object repr
   },
   // ... one object for each question in the input list
 ]
-```"""
\ No newline at end of file
+```"""
+HISTORY_SUMMARY_SYSTEM_PROMPT = """You are an HR assistant from Deloitte keeping running notes on a supportive conversation with an employee. The notes stand in for the earlier part of the conversation when it no longer fits in the context of later requests, so they must preserve everything a later reader needs: the concerns the employee raised, the facts, examples and feelings they shared, anything they asked for, any suggestions already given, and any sign of distress or risk. Write in the third person, in plain prose, without inventing anything that was not said."""
+
+HISTORY_SUMMARY_PROMPT = """Update the running notes with the next part of the conversation.
+
+**Notes so far:**
+{previous_summary}
+
+**Next part of the conversation:**
+{conversation}
+
+Return only the updated notes, in no more than {max_words} words."""
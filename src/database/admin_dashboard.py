@@ -0,0 +1,403 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.analysis import convert_to_ist, get_vibe
+from utils.app_logger import setup_logger
+from utils.config import get_async_database
+
+async_db = get_async_database()
+logger = setup_logger("src/database/admin_dashboard.py")
+
+DASHBOARD_ID = "current"
+MOOD_BUCKETS = ["excited", "happy", "okay", "sad", "frustrated"]
+# Rebuilds reconcile_dashboard tries before leaving the totals to the next run
+RECONCILE_ATTEMPTS = 3
+
+# The admin_dashboard "current" document holds running totals rather than the
+# finished metrics, so every event can be folded in with a single $inc:
+#   total_employees, risk_total, mood_total, mood_count, mood_distribution.<bucket>,
+#   critical_cases.<employee_id> (the employee row) and daily_mood.<date>.{sum,count}
+# Each employee's share of those totals is kept in dashboard_contributions so the
+# next event for them knows exactly what to subtract. Every event also bumps
+# "version", so a rebuild only replaces totals no event has touched meanwhile.
+
+
+def employee_row(user: Dict, vibe_info: Dict, intent_info: Dict, performance_info: Dict) -> Dict:
+    """The employee list entry, including the risk level the dashboard aggregates"""
+    vibe_date_ist = convert_to_ist(vibe_info.get("response_date"))
+    intent_date_ist = convert_to_ist(intent_info.get("updated_at"))
+
+    vibe_score = vibe_info.get("vibe_score", 0)
+    risk_level = intent_info.get("risk_level", 1)
+
+    # A good check-in after the last chat supersedes the risk it flagged
+    if (vibe_score > 3 and
+            vibe_date_ist is not None and
+            intent_date_ist is not None and
+            vibe_date_ist.date() > intent_date_ist.date()):
+        risk_level = 1
+
+    return {
+        "employee_id": user["employee_id"],
+        "email": user.get("email", ""),
+        "name": user.get("name", ""),
+        "role": user.get("role", "employee"),
+        "current_vibe": {
+            "score": vibe_score,
+            "last_check_in": vibe_date_ist.isoformat() if vibe_date_ist else None
+        },
+        "performance": {
+            "rating": performance_info.get("rating"),
+            "feedback": performance_info.get("feedback"),
+            "period": performance_info.get("review_period")
+        },
+        "risk_assessment": risk_level
+    }
+
+
+def make_contribution(row: Dict) -> Dict:
+    vibe_score = row["current_vibe"]["score"]
+    mood_bucket = get_vibe(vibe_score).lower() if vibe_score > 0 else None
+    return {
+        "_id": row["employee_id"],
+        "row": row,
+        "risk_level": row["risk_assessment"],
+        "vibe_score": vibe_score,
+        "mood_bucket": mood_bucket if mood_bucket in MOOD_BUCKETS else None,
+        "critical": row["risk_assessment"] > 3,
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+def contribution_delta(employee_id: str, old: Optional[Dict], new: Optional[Dict]) -> Dict:
+    """Mongo update that swaps an employee's old share of the totals for the new one"""
+    inc = defaultdict(int)
+    for sign, contribution in ((-1, old), (1, new)):
+        if not contribution:
+            continue
+        inc["total_employees"] += sign
+        inc["risk_total"] += sign * contribution["risk_level"]
+        if contribution["mood_bucket"]:
+            inc[f"mood_distribution.{contribution['mood_bucket']}"] += sign
+            inc["mood_total"] += sign * contribution["vibe_score"]
+            inc["mood_count"] += sign
+
+    update = {"$set": {"timestamp": datetime.now(timezone.utc)}}
+    inc = {field: value for field, value in inc.items() if value}
+    if inc:
+        update["$inc"] = inc
+    if new and new["critical"]:
+        update["$set"][f"critical_cases.{employee_id}"] = new["row"]
+    elif old and old["critical"]:
+        update["$unset"] = {f"critical_cases.{employee_id}": ""}
+    return update
+
+
+async def apply_dashboard_delta(update: Dict):
+    """Fold one event's update into the totals, bumping the version reconcile_dashboard checks"""
+    update.setdefault("$inc", {})["version"] = 1
+    await async_db["admin_dashboard"].update_one({"_id": DASHBOARD_ID}, update, upsert=True)
+
+
+def _present(values: Dict) -> Dict:
+    return {key: value for key, value in values.items() if value is not None}
+
+
+async def build_contribution(employee_id: str) -> Optional[Dict]:
+    """Recompute one employee's contribution from their latest vibe, chat and review"""
+    user, vibe, intent, performance = await asyncio.gather(
+        async_db["users"].find_one({"employee_id": employee_id, "role_type": "employee"}),
+        async_db["vibemeter"].find_one(
+            {"Employee_ID": employee_id, "Response_Date": {"$exists": True, "$ne": None}},
+            sort=[("Response_Date", -1)]
+        ),
+        async_db["intent_data"].find_one(
+            {
+                "employee_id": employee_id,
+                "intent_data.chat_completed": True,
+                "updated_at": {"$exists": True, "$ne": None}
+            },
+            sort=[("updated_at", -1)]
+        ),
+        async_db["performance"].find_one(
+            {"Employee_ID": employee_id},
+            sort=[("Review_Period", -1)]
+        ),
+    )
+    if not user:
+        return None
+
+    # Same shapes the reconcile aggregations produce, where absent fields are left out
+    vibe_info = _present({
+        "vibe_score": vibe.get("Vibe_Score"),
+        "response_date": vibe.get("Response_Date")
+    }) if vibe else {}
+    intent_info = _present({
+        "risk_level": intent.get("intent_data", {}).get("chat_analysis", {}).get("risk_assessment", {}).get("risk_level"),
+        "updated_at": intent.get("updated_at")
+    }) if intent else {}
+    performance_info = _present({
+        "rating": performance.get("Performance_Rating"),
+        "feedback": performance.get("Manager_Feedback"),
+        "review_period": performance.get("Review_Period")
+    }) if performance else {}
+
+    return make_contribution(employee_row(user, vibe_info, intent_info, performance_info))
+
+
+async def refresh_dashboard_contribution(employee_id: str):
+    """Fold one employee's latest state into the dashboard totals"""
+    try:
+        new = await build_contribution(employee_id)
+        contributions = async_db["dashboard_contributions"]
+        if new is None:
+            old = await contributions.find_one_and_delete({"_id": employee_id})
+        else:
+            old = await contributions.find_one_and_replace(
+                {"_id": employee_id}, new, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+        if old is None and new is None:
+            return
+        await apply_dashboard_delta(contribution_delta(employee_id, old, new))
+    except Exception as e:
+        logger.error(f"Error updating dashboard for employee {employee_id}: {str(e)}")
+
+
+async def record_vibe_submission(employee_id: str, vibe_score: float, response_date: datetime):
+    """
+    Count a new check-in towards the mood trend and the employee's current state.
+    Like reconcile_dashboard, the trend holds one check-in per employee per
+    (UTC) day, so an earlier one from the same day is replaced, not added to.
+    """
+    try:
+        response_date = response_date.astimezone(timezone.utc)
+        date = response_date.strftime("%Y-%m-%d")
+        day_start = response_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        earlier = await async_db.vibemeter.find_one(
+            {"Employee_ID": employee_id, "Response_Date": {"$gte": day_start, "$lt": response_date}},
+            {"Vibe_Score": 1},
+            sort=[("Response_Date", -1)]
+        )
+        if earlier is None:
+            inc = {f"daily_mood.{date}.sum": vibe_score, f"daily_mood.{date}.count": 1}
+        else:
+            inc = {f"daily_mood.{date}.sum": vibe_score - earlier["Vibe_Score"]}
+        await apply_dashboard_delta({"$inc": inc})
+    except Exception as e:
+        logger.error(f"Error recording vibe for employee {employee_id}: {str(e)}")
+    await refresh_dashboard_contribution(employee_id)
+
+
+async def reconcile_dashboard():
+    """
+    Rebuild every contribution and the dashboard totals from scratch.
+    Backstop for the per-event deltas; runs periodically in the background.
+    If an event changes the totals while they are being rebuilt, the rebuild
+    is discarded and started over, so the event's delta is never overwritten.
+    """
+    for attempt in range(1, RECONCILE_ATTEMPTS + 1):
+        current = await async_db["admin_dashboard"].find_one({"_id": DASHBOARD_ID}, {"version": 1})
+        version = current.get("version") if current else None
+
+        contributions, dashboard = await _rebuild_dashboard()
+        await async_db["dashboard_contributions"].delete_many({})
+        if contributions:
+            await async_db["dashboard_contributions"].insert_many(list(contributions.values()))
+        if await _swap_dashboard(dashboard, current is not None, version):
+            logger.info(f"Reconciled admin dashboard for {len(contributions)} employees")
+            return
+        logger.info(f"Dashboard changed during reconcile attempt {attempt}, rebuilding")
+
+    logger.warning(f"Dashboard kept changing over {RECONCILE_ATTEMPTS} reconcile attempts; left for the next run")
+
+
+async def _swap_dashboard(dashboard: Dict, exists: bool, version: Optional[int]) -> bool:
+    """Store the rebuilt totals unless an event bumped the version read before the rebuild"""
+    dashboard["version"] = (version or 0) + 1
+    if not exists:
+        try:
+            await async_db["admin_dashboard"].insert_one(dashboard)
+            return True
+        except DuplicateKeyError:
+            return False
+    # A version of None also matches a document written before versions existed
+    result = await async_db["admin_dashboard"].replace_one({"_id": DASHBOARD_ID, "version": version}, dashboard)
+    return result.matched_count == 1
+
+
+async def _rebuild_dashboard():
+    """Every employee's contribution and the totals document, computed from the source collections"""
+    current_time = datetime.now(timezone.utc)
+    seven_days_ago = current_time - timedelta(days=7)
+
+    vibe_pipeline = [
+        {'$match': {'Response_Date': {'$exists': True, '$ne': None}}},
+        {'$sort': {'Employee_ID': 1, 'Response_Date': -1}},
+        {
+            '$group': {
+                '_id': '$Employee_ID',
+                'latest_vibe': {
+                    '$first': {
+                        'vibe_score': '$Vibe_Score',
+                        'response_date': '$Response_Date'
+                    }
+                }
+            }
+        }
+    ]
+
+    # Latest check-in per employee per day over the last week
+    seven_day_vibe_pipeline = [
+        {'$match': {'Response_Date': {'$gte': seven_days_ago, '$lte': current_time}}},
+        {'$sort': {'Employee_ID': 1, 'Response_Date': -1}},
+        {
+            '$group': {
+                '_id': {
+                    'employee_id': '$Employee_ID',
+                    'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$Response_Date'}}
+                },
+                'vibe_score': {'$first': '$Vibe_Score'}
+            }
+        }
+    ]
+
+    performance_pipeline = [
+        {'$sort': {'Employee_ID': 1, 'Review_Period': -1}},
+        {
+            '$group': {
+                '_id': '$Employee_ID',
+                'latest_performance': {
+                    '$first': {
+                        'rating': '$Performance_Rating',
+                        'feedback': '$Manager_Feedback',
+                        'review_period': '$Review_Period'
+                    }
+                }
+            }
+        }
+    ]
+
+    intent_pipeline = [
+        {
+            '$match': {
+                'intent_data.chat_completed': True,
+                'updated_at': {'$exists': True, '$ne': None}
+            }
+        },
+        {'$sort': {'employee_id': 1, 'updated_at': -1}},
+        {
+            '$group': {
+                '_id': '$employee_id',
+                'latest_intent': {
+                    '$first': {
+                        'risk_level': '$intent_data.chat_analysis.risk_assessment.risk_level',
+                        'updated_at': '$updated_at'
+                    }
+                }
+            }
+        }
+    ]
+
+    users_data, vibe_data, seven_day_vibe_data, intent_data, performance_data = await asyncio.gather(
+        async_db["users"].find({"role_type": "employee"}).to_list(length=None),
+        async_db["vibemeter"].aggregate(vibe_pipeline).to_list(length=None),
+        async_db["vibemeter"].aggregate(seven_day_vibe_pipeline).to_list(length=None),
+        async_db["intent_data"].aggregate(intent_pipeline).to_list(length=None),
+        async_db["performance"].aggregate(performance_pipeline).to_list(length=None)
+    )
+
+    vibe_map = {doc['_id']: doc['latest_vibe'] for doc in vibe_data if doc.get('_id') and doc.get('latest_vibe')}
+    intent_map = {doc['_id']: doc['latest_intent'] for doc in intent_data if doc.get('_id') and doc.get('latest_intent')}
+    performance_map = {doc['_id']: doc['latest_performance'] for doc in performance_data if doc.get('_id')}
+
+    contributions = {}
+    for user in users_data:
+        employee_id = user.get("employee_id")
+        if not employee_id:
+            continue
+        try:
+            row = employee_row(
+                user,
+                vibe_map.get(employee_id, {}),
+                intent_map.get(employee_id, {}),
+                performance_map.get(employee_id, {})
+            )
+            contributions[employee_id] = make_contribution(row)
+        except Exception as e:
+            logger.error(f"Error processing user {employee_id}: {str(e)}")
+
+    dashboard = {
+        "_id": DASHBOARD_ID,
+        "timestamp": current_time,
+        "total_employees": 0,
+        "risk_total": 0,
+        "mood_total": 0,
+        "mood_count": 0,
+        "mood_distribution": {bucket: 0 for bucket in MOOD_BUCKETS},
+        "critical_cases": {},
+        "daily_mood": {},
+    }
+    for employee_id, contribution in contributions.items():
+        update = contribution_delta(employee_id, None, contribution)
+        for field, value in update.get("$inc", {}).items():
+            if field.startswith("mood_distribution."):
+                dashboard["mood_distribution"][field.split(".", 1)[1]] += value
+            else:
+                dashboard[field] += value
+        if contribution["critical"]:
+            dashboard["critical_cases"][employee_id] = contribution["row"]
+
+    for vibe in seven_day_vibe_data:
+        daily = dashboard["daily_mood"].setdefault(vibe['_id']['date'], {"sum": 0, "count": 0})
+        daily["sum"] += vibe['vibe_score']
+        daily["count"] += 1
+
+    return contributions, dashboard
+
+
+async def run_dashboard_reconciliation(interval_minutes: int):
+    """Reconcile now and then every interval_minutes until cancelled"""
+    while True:
+        try:
+            await reconcile_dashboard()
+        except Exception as e:
+            logger.error(f"Error reconciling admin dashboard: {str(e)}", exc_info=True)
+        await asyncio.sleep(interval_minutes * 60)
+
+
+def dashboard_view(dashboard: Dict) -> Dict:
+    """Turn the stored running totals into the metrics the admin dashboard shows"""
+    total_employees = int(dashboard.get("total_employees", 0))
+    mood_count = dashboard.get("mood_count", 0)
+    critical_cases = dashboard.get("critical_cases", {})
+    # Documents written before the running totals stored a finished list
+    if isinstance(critical_cases, dict):
+        critical_cases = sorted(critical_cases.values(), key=lambda row: row["employee_id"])
+    timestamp = dashboard.get("timestamp") or datetime.now(timezone.utc)
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d")
+    weekly_mood_trend = {
+        date: round(daily["sum"] / daily["count"], 2)
+        for date, daily in sorted(dashboard.get("daily_mood", {}).items())
+        if date >= cutoff and daily.get("count")
+    }
+
+    mood_distribution = {bucket: 0 for bucket in MOOD_BUCKETS}
+    for bucket, count in dashboard.get("mood_distribution", {}).items():
+        mood_distribution[bucket] = int(count)
+
+    return {
+        "timestamp": timestamp.isoformat(),
+        "overall_risk_score": round(dashboard.get("risk_total", 0) / total_employees, 2) if total_employees > 0 else 0,
+        "critical_cases_count": len(critical_cases),
+        "critical_cases": critical_cases,
+        "total_employees": total_employees,
+        "overall_mood": round(dashboard.get("mood_total", 0) / mood_count, 2) if mood_count else 0,
+        "mood_distribution": mood_distribution,
+        "weekly_mood_trend": weekly_mood_trend
+    }
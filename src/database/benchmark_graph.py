@@ -0,0 +1,137 @@
+"""
+Compare tag lookups on the two question-bank graph models.
+
+Loads tagged_questions.json and question_relationships.json under scratch
+labels (BenchQuestion, BenchTag) so the live bank is untouched, then times,
+for every tag:
+
+  * property  - MATCH on the q.tags list property, as Neo4j.get_questions_by_tag does
+  * tag_node  - seek the (:BenchTag) node and follow HAS_TAG, as AsyncNeo4j does
+
+both on their own and followed by the RELATED_TO hop the chat flow makes:
+
+    python -m src.database.benchmark_graph --repeat 20
+"""
+import argparse
+import json
+import statistics
+import time
+
+from src.database.graph_db import Neo4j, question_bank, question_relations, question_tags
+from utils.config import settings
+
+BATCH_SIZE = 1000
+
+QUERIES = {
+    "property": """
+        MATCH (q:BenchQuestion)
+        WHERE $tag IN q.tags
+        RETURN q.id, q.question
+    """,
+    "tag_node": """
+        MATCH (:BenchTag {name: $tag})<-[:HAS_TAG]-(q:BenchQuestion)
+        RETURN q.id, q.question
+    """,
+    "property_related": """
+        MATCH (q:BenchQuestion)
+        WHERE $tag IN q.tags
+        MATCH (q)-[r:RELATED_TO]->(q2:BenchQuestion)
+        WHERE r.score > $threshold
+        RETURN q.id, q2.id, r.score
+    """,
+    "tag_node_related": """
+        MATCH (:BenchTag {name: $tag})<-[:HAS_TAG]-(q:BenchQuestion)
+        MATCH (q)-[r:RELATED_TO]->(q2:BenchQuestion)
+        WHERE r.score > $threshold
+        RETURN q.id, q2.id, r.score
+    """,
+}
+
+
+def _batches(rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+
+def load_bench_graph(session, questions, relationships):
+    session.run("MATCH (n) WHERE n:BenchQuestion OR n:BenchTag DETACH DELETE n").consume()
+    session.run(
+        "CREATE CONSTRAINT bench_question_id IF NOT EXISTS FOR (q:BenchQuestion) REQUIRE q.id IS UNIQUE"
+    ).consume()
+    session.run(
+        "CREATE CONSTRAINT bench_tag_name IF NOT EXISTS FOR (t:BenchTag) REQUIRE t.name IS UNIQUE"
+    ).consume()
+
+    rows = [
+        {"id": q["id"], "question": q["question"], "tags": question_tags(q["tags"])}
+        for q in questions
+    ]
+    for batch in _batches(rows):
+        session.run("""
+            UNWIND $rows AS row
+            CREATE (q:BenchQuestion {id: row.id, question: row.question, tags: row.tags})
+            WITH q, row
+            UNWIND row.tags AS tag
+            MERGE (t:BenchTag {name: tag})
+            CREATE (q)-[:HAS_TAG]->(t)
+        """, rows=batch).consume()
+
+    for batch in _batches(relationships):
+        session.run("""
+            UNWIND $rows AS row
+            MATCH (q1:BenchQuestion {id: row.from_id}), (q2:BenchQuestion {id: row.to_id})
+            CREATE (q1)-[:RELATED_TO {score: row.score}]->(q2)
+        """, rows=batch).consume()
+
+
+def drop_bench_graph(session):
+    session.run("MATCH (n) WHERE n:BenchQuestion OR n:BenchTag DETACH DELETE n").consume()
+    session.run("DROP CONSTRAINT bench_question_id IF EXISTS").consume()
+    session.run("DROP CONSTRAINT bench_tag_name IF EXISTS").consume()
+
+
+def time_query(session, query, tags, repeat, threshold):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for tag in tags:
+            session.run(query, tag=tag, threshold=threshold).consume()
+        timings.append((time.perf_counter() - started) / len(tags) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=70)
+    parser.add_argument("--keep", action="store_true", help="leave the scratch graph in place")
+    args = parser.parse_args()
+
+    with open(question_bank, "r", encoding="utf-8") as file:
+        questions = json.load(file)
+    with open(question_relations, "r", encoding="utf-8") as file:
+        relationships = json.load(file)
+    tags = sorted({tag for q in questions for tag in question_tags(q["tags"])})
+
+    graph = Neo4j(settings.NEO4J_URI, settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+    try:
+        with graph.driver.session() as session:
+            started = time.perf_counter()
+            load_bench_graph(session, questions, relationships)
+            print(f"Loaded {len(questions)} questions, {len(tags)} tags and "
+                  f"{len(relationships)} relationships in {time.perf_counter() - started:.2f}s")
+
+            for name, query in QUERIES.items():
+                # One untimed pass so plans are cached for both models alike
+                time_query(session, query, tags, 1, args.threshold)
+                median_ms = time_query(session, query, tags, args.repeat, args.threshold)
+                print(f"{name:>18}: {median_ms:.3f} ms per tag lookup")
+
+            if not args.keep:
+                drop_bench_graph(session)
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
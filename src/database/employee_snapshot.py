@@ -0,0 +1,288 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import pytz
+
+from utils.analysis import (
+    convert_to_ist,
+    get_vibe,
+    process_activity_data,
+    process_leave_data,
+)
+from utils.app_logger import setup_logger
+from utils.config import get_async_database
+
+async_db = get_async_database()
+logger = setup_logger("src/database/employee_snapshot.py")
+
+# Bump when the snapshot layout changes so stored documents get rebuilt
+SNAPSHOT_VERSION = 1
+
+
+def _vibe_trend(vibe_data: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "date": convert_to_ist(vibe.get("Response_Date")).isoformat(),
+            "vibe_score": vibe.get("Vibe_Score", 0),
+            "vibe": get_vibe(vibe.get("Vibe_Score", 0))
+        } for vibe in vibe_data
+    ]
+
+
+def _dashboard_section(vibe_data, performance_data, activity_data, rewards_data, leave_data) -> Dict:
+    """The per-employee parts of GET /employee/dashboard"""
+    dashboard = {
+        "latest_vibe": {},
+        "vibe_trend": [],
+        "meetings_attended": 0,
+        "performance_rating": [],
+        "total_work_hours": 0,
+        "average_work_hours": 0,
+        "awards": [],
+        "activity_level": [],
+        "overall_activity_level": {
+            "teams_messages_sent": 0,
+            "emails_sent": 0,
+            "meetings_attended": 0
+        },
+        "all_leaves": [],
+        "total_leave": 0,
+    }
+
+    if vibe_data:
+        dashboard["latest_vibe"] = {
+            "vibe_score": vibe_data[0].get("Vibe_Score", 0),
+            "date": convert_to_ist(vibe_data[0].get("Response_Date")).isoformat(),
+            "message": vibe_data[0].get("Message", "")
+        }
+        dashboard["vibe_trend"] = _vibe_trend(vibe_data)
+
+    if activity_data:
+        dashboard["activity_level"] = [
+            {
+                "date": convert_to_ist(activity.get("Date")).isoformat(),
+                "teamsMessages": activity.get("Teams_Messages_Sent", 0),
+                "emails": activity.get("Emails_Sent", 0),
+                "meetings": activity.get("Meetings_Attended", 0),
+                "work_hours": activity.get("Work_Hours", 0)
+            } for activity in activity_data
+        ]
+        total_work_hours = sum(a.get('Work_Hours', 0) for a in activity_data)
+        dashboard["total_work_hours"] = round(total_work_hours, 2)
+        dashboard["average_work_hours"] = round(total_work_hours / len(activity_data), 2)
+        dashboard["overall_activity_level"] = {
+            "teams_messages_sent": int(sum(a.get('Teams_Messages_Sent', 0) for a in activity_data)),
+            "emails_sent": int(sum(a.get('Emails_Sent', 0) for a in activity_data)),
+            "meetings_attended": int(sum(a.get('Meetings_Attended', 0) for a in activity_data))
+        }
+        dashboard["meetings_attended"] = dashboard["overall_activity_level"]["meetings_attended"]
+
+    # The dashboard only shows the two latest reviews
+    dashboard["performance_rating"] = [
+        {key: value for key, value in performance.items() if key != "_id"}
+        for performance in performance_data[:2]
+    ]
+
+    dashboard["awards"] = [
+        {
+            "type": reward.get('Award_Type', 'Unknown'),
+            "date": convert_to_ist(reward.get('Award_Date')).isoformat(),
+            "reward_points": reward.get('Reward_Points', 0)
+        } for reward in rewards_data
+    ]
+
+    dashboard["all_leaves"] = [
+        {
+            'leave_start_date': convert_to_ist(leave.get('Leave_Start_Date')).isoformat(),
+            'leave_end_date': convert_to_ist(leave.get('Leave_End_Date')).isoformat(),
+            'leave_days': leave.get('Leave_Days', 0),
+            'leave_type': leave.get('Leave_Type', 'other')
+        } for leave in leave_data
+    ]
+    dashboard["total_leave"] = len(dashboard["all_leaves"])
+    return dashboard
+
+
+def _summary_section(employee_id, employee_data, user_data, vibe_data, latest_intent, activity_data,
+                     leave_data, rewards_data, latest_vibe, performance_data, current_ist) -> Dict:
+    """The full GET /admin/{employee_id}/summary payload"""
+    performance_info = {}
+    if performance_data:
+        all_perfs = [
+            {
+                "rating": perf.get("Performance_Rating"),
+                "feedback": perf.get("Manager_Feedback"),
+                "period": perf.get("Review_Period")
+            } for perf in performance_data
+        ]
+        performance_info = {
+            "current": all_perfs[0],
+            "history": all_perfs,
+            "trend": {
+                "ratings": [perf["rating"] or 0 for perf in all_perfs],
+                "periods": [perf["period"] for perf in all_perfs]
+            }
+        }
+
+    current_state = {
+        "vibe_score": latest_vibe.get("Vibe_Score", 0) if latest_vibe else 0,
+        "last_check_in": convert_to_ist(latest_vibe.get("Response_Date")).isoformat() if latest_vibe else None,
+        "risk_assessment": latest_intent.get("intent_data", {}).get("chat_analysis", {}).get("risk_assessment", {}).get("risk_level", 1) if latest_intent else 1
+    }
+
+    intent_analysis = {}
+    chat_analysis = {}
+    if latest_intent and "intent_data" in latest_intent:
+        intent_data = latest_intent["intent_data"]
+        intent_analysis = {
+            "primary_issues": intent_data.get("primary_issues", {}),
+            "tags": intent_data.get("tags", []),
+            "updated_at": convert_to_ist(latest_intent.get("updated_at")).isoformat()
+        }
+        if "chat_analysis" in intent_data:
+            chat_analysis = intent_data["chat_analysis"]
+
+    awards_data = {
+        "total_points": sum(r.get("Reward_Points", 0) for r in rewards_data),
+        "award_types": list(set(r.get("Award_Type") for r in rewards_data if r.get("Award_Type"))),
+        "recent_awards": [
+            {
+                "type": r.get("Award_Type"),
+                "date": convert_to_ist(r.get("Award_Date")).isoformat(),
+                "points": r.get("Reward_Points", 0)
+            } for r in rewards_data[:5]  # Last 5 awards
+        ]
+    }
+
+    return {
+        "employee_info": {
+            "name": user_data.get("name"),
+            "email": user_data.get("email"),
+            "employee_id": employee_id,
+            "joining_date": convert_to_ist(employee_data.get("Joining_Date")).isoformat() if employee_data and employee_data.get("Joining_Date") else None
+        },
+        "current_state": current_state,
+        "vibe_trend": _vibe_trend(vibe_data),
+        "intent_analysis": intent_analysis,
+        "chat_analysis": chat_analysis,
+        "performance": performance_info,
+        "onboarding_experience": {
+            "feedback": employee_data.get("Onboarding_Feedback") if employee_data else None,
+            "mentor_assigned": employee_data.get("Mentor_Assigned", False) if employee_data else None,
+            "training_completed": employee_data.get("Initial_Training_Completed", False) if employee_data else None,
+        },
+        "communication_activity": process_activity_data(activity_data),
+        "leave_analysis": process_leave_data(leave_data, current_ist),
+        "awards_and_recognition": awards_data
+    }
+
+
+async def build_employee_snapshot(employee_id: str) -> Optional[Dict]:
+    """
+    Read everything the dashboard and summary endpoints show for one employee
+    and fold it into a single document. Returns None for unknown employees.
+    """
+    ist_tz = pytz.timezone('Asia/Kolkata')
+    current_ist = datetime.now(ist_tz)
+
+    # Same windows the endpoints always used, anchored to today's IST date
+    vibe_start_date_utc = (current_ist - timedelta(days=14)).astimezone(timezone.utc)
+    activity_start_date_utc = (current_ist - timedelta(days=30)).astimezone(timezone.utc)
+    one_year_ago_utc = (current_ist - timedelta(days=365)).astimezone(timezone.utc)
+
+    employee_data, user_data, vibe_data, latest_intent, activity_data, leave_data, rewards_data, latest_vibe, performance_data = await asyncio.gather(
+        async_db["onboarding"].find_one({"Employee_ID": employee_id}),
+        async_db["users"].find_one({"employee_id": employee_id}),
+        async_db["vibemeter"].find({
+            "Employee_ID": employee_id,
+            "Response_Date": {"$gte": vibe_start_date_utc}
+        }).sort("Response_Date", -1).to_list(length=None),
+        async_db["intent_data"].find_one(
+            {"employee_id": employee_id, "intent_data.chat_completed": True},
+            sort=[("updated_at", -1)]
+        ),
+        async_db["activity"].find({
+            "Employee_ID": employee_id,
+            "Date": {"$gte": activity_start_date_utc}
+        }).sort("Date", -1).to_list(length=None),
+        async_db["leave"].find({
+            "Employee_ID": employee_id,
+            "Leave_Start_Date": {"$gte": one_year_ago_utc}
+        }).sort("Leave_Start_Date", -1).to_list(length=None),
+        async_db["rewards"].find({
+            "Employee_ID": employee_id,
+            "Award_Date": {"$gte": one_year_ago_utc}
+        }).sort("Award_Date", -1).to_list(length=None),
+        async_db["vibemeter"].find_one(
+            {"Employee_ID": employee_id},
+            sort=[("Response_Date", -1)]
+        ),
+        async_db["performance"].find(
+            {"Employee_ID": employee_id}
+        ).sort("Review_Period", -1).to_list(length=None)
+    )
+
+    if not user_data:
+        return None
+
+    return {
+        "_id": employee_id,
+        "version": SNAPSHOT_VERSION,
+        "anchor_date": current_ist.date().isoformat(),
+        "updated_at": datetime.now(timezone.utc),
+        # Kept raw so "already submitted today" can be judged at read time
+        "latest_vibe_at": vibe_data[0].get("Response_Date") if vibe_data else None,
+        "dashboard": _dashboard_section(vibe_data, performance_data, activity_data, rewards_data, leave_data),
+        "summary": _summary_section(
+            employee_id, employee_data, user_data, vibe_data, latest_intent, activity_data,
+            leave_data, rewards_data, latest_vibe, performance_data, current_ist
+        ),
+    }
+
+
+async def _store_employee_snapshot(employee_id: str) -> Optional[Dict]:
+    snapshot = await build_employee_snapshot(employee_id)
+    if snapshot is None:
+        await async_db["employee_snapshot"].delete_one({"_id": employee_id})
+        return None
+    await async_db["employee_snapshot"].replace_one(
+        {"_id": employee_id}, snapshot, upsert=True
+    )
+    return snapshot
+
+
+async def refresh_employee_snapshot(employee_id: str) -> Optional[Dict]:
+    """
+    Rebuild and store one employee's snapshot; called after their data is written.
+    Failures are logged rather than raised so they never fail the write itself.
+    """
+    try:
+        snapshot = await _store_employee_snapshot(employee_id)
+        logger.info(f"Refreshed snapshot for employee {employee_id}")
+        return snapshot
+    except Exception as e:
+        logger.error(f"Error refreshing snapshot for employee {employee_id}: {str(e)}")
+        return None
+
+
+async def invalidate_employee_snapshots(employee_ids: Optional[List[str]] = None):
+    """Drop stored snapshots so they are rebuilt on the next read; all of them by default"""
+    query = {"_id": {"$in": employee_ids}} if employee_ids is not None else {}
+    await async_db["employee_snapshot"].delete_many(query)
+
+
+async def get_employee_snapshot(employee_id: str) -> Optional[Dict]:
+    """
+    Return the stored snapshot, rebuilding it when missing or when it was built
+    on an earlier IST day and its date windows have moved on.
+    """
+    snapshot = await async_db["employee_snapshot"].find_one({"_id": employee_id})
+    today = datetime.now(pytz.timezone('Asia/Kolkata')).date().isoformat()
+    if (
+        snapshot
+        and snapshot.get("version") == SNAPSHOT_VERSION
+        and snapshot.get("anchor_date") == today
+    ):
+        return snapshot
+    return await _store_employee_snapshot(employee_id)
@@ -1,10 +1,64 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase
 from pathlib import Path
+import argparse
+import hashlib
 import json
+import os
+import time
 from utils.config import settings
 
 question_bank = Path(__file__).resolve().parent.parent / "analysis" / "data" / "tagged_questions.json"
 question_relations = Path(__file__).resolve().parent.parent / "analysis" / "data" / "question_relationships.json"
+upload_checkpoint = Path(__file__).resolve().parent.parent / "analysis" / "data" / ".graph_upload_checkpoint.json"
+
+# Rows sent per UNWIND transaction by bulk_upload
+UPLOAD_BATCH_SIZE = 1000
+# Deepest RELATED_TO neighbourhood get_question_tree will expand
+MAX_TREE_DEPTH = 4
+
+TAG_CONSTRAINTS = [
+    "CREATE CONSTRAINT question_id IF NOT EXISTS FOR (q:Question) REQUIRE q.id IS UNIQUE",
+    "CREATE CONSTRAINT tag_name IF NOT EXISTS FOR (t:Tag) REQUIRE t.name IS UNIQUE",
+]
+
+def question_tags(tags):
+    # The bank stores either a single tag string or a list of tags
+    if not tags:
+        return []
+    return [tags] if isinstance(tags, str) else list(tags)
+
+def _expand_question(children, node_id, level, depth, ancestors):
+    """Related questions of node_id, best score first, skipping any already on the path"""
+    if level >= depth:
+        return []
+    related = sorted(children.get(node_id, {}).items(), key=lambda item: -item[1][1])
+    return [
+        {
+            "id": child_id,
+            "question": question,
+            "score": score,
+            "related_questions": _expand_question(children, child_id, level + 1, depth, ancestors | {child_id}),
+        }
+        for child_id, (question, score) in related
+        if child_id not in ancestors
+    ]
+
+def build_question_tree(records, depth):
+    """Nest the (root, edges) rows of _query_question_edges into the get_question_tree shape"""
+    tree = []
+    for record in records:
+        children = {}
+        for from_id, to_id, question, score in filter(None, record["edges"]):
+            children.setdefault(from_id, {})[to_id] = (question, score)
+
+        root_id = record["root_id"]
+        tree.append({
+            "id": root_id,
+            "question": record["root_question"],
+            "score": None,
+            "related_questions": _expand_question(children, root_id, 0, depth, {root_id}),
+        })
+    return tree
 
 class Neo4j:
     def __init__(self, uri, user, password):
@@ -15,21 +69,81 @@ class Neo4j:
     
     # To be run once: Uploads the entire data to neo4j
     def upload_data(self, data, relationships=None):
+        self.bulk_upload(data, relationships or [])
+
+    def bulk_upload(self, questions, relationships, batch_size=UPLOAD_BATCH_SIZE, checkpoint_path=upload_checkpoint):
+        """
+        Load questions, their (:Tag) links and RELATED_TO relationships in
+        UNWIND batches, one transaction per batch. Everything is MERGEd on the
+        id constraints, so re-running is safe. Progress is checkpointed after
+        every batch and a rerun over the same data resumes where it stopped.
+        """
+        question_rows = [
+            {"id": q["id"], "question": q["question"], "tags": question_tags(q["tags"])}
+            for q in questions
+        ]
+        relationship_rows = [
+            {"from_id": r["from_id"], "to_id": r["to_id"], "score": r["score"]}
+            for r in relationships
+        ]
+        source = hashlib.sha256(
+            json.dumps([question_rows, relationship_rows], sort_keys=True).encode()
+        ).hexdigest()
+
+        checkpoint = {"source": source, "questions": 0, "relationships": 0}
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                saved = json.load(f)
+            if saved.get("source") == source:
+                checkpoint = saved
+                print(f"Resuming upload from {checkpoint['questions']} questions, {checkpoint['relationships']} relationships")
+
+        with self.driver.session() as session:
+            for constraint in TAG_CONSTRAINTS:
+                session.run(constraint).consume()
+
+            for phase, rows, write in (
+                ("questions", question_rows, self._merge_questions),
+                ("relationships", relationship_rows, self._merge_relationships),
+            ):
+                started = time.perf_counter()
+                done_before = checkpoint[phase]
+                for start in range(done_before, len(rows), batch_size):
+                    session.execute_write(write, rows[start:start + batch_size])
+                    checkpoint[phase] = min(start + batch_size, len(rows))
+                    with open(checkpoint_path, "w") as f:
+                        json.dump(checkpoint, f)
+                elapsed = time.perf_counter() - started
+                uploaded = len(rows) - done_before
+                print(f"Uploaded {uploaded} {phase} in {elapsed:.2f}s ({uploaded / max(elapsed, 1e-9):.0f} rows/s)")
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    # To be run once after upload_data: models tags as (:Tag) nodes so lookups are index seeks
+    def migrate_tags(self):
         with self.driver.session() as session:
-            print('Uploading questions...')
-            for record in data:
-                session.execute_write(self._create_node, record)
-            print('Questions uploaded')
-            # print('Creating relations...')
-            # for relationship in relationships:
-            #     session.execute_write(self._create_relationship, relationship)
-            # print('Relations created')
+            for constraint in TAG_CONSTRAINTS:
+                session.run(constraint)
+            questions = session.execute_read(self._query_all_questions)
+            rows = [
+                {"id": record.get("q.id"), "tag": tag}
+                for record in questions
+                for tag in question_tags(record.get("q.tags"))
+            ]
+            session.execute_write(self._link_tags, rows)
+            return len(rows)
 
     def get_questions_by_tag(self, tag):
         with self.driver.session() as session:
             result = session.execute_read(self._query_questions_by_tag, tag)
             return result
     
+    def get_all_questions(self):
+        with self.driver.session() as session:
+            result = session.execute_read(self._query_all_questions)
+            return result
+
     def get_related_questions(self, node_id, threshold):
         with self.driver.session() as session:
             result = session.execute_read(self._query_related_questions, node_id, threshold)
@@ -46,21 +160,14 @@ class Neo4j:
         result = tx.run(query, node_id=node_id, threshold=threshold)
         return [record for record in result]
 
-    #function to get questions based on tag , threshold_score , node_depth
-    '''
-        [
-            {
-                question :
-                related_questions: [
-                    {
-                        question: [
-                            related_questions : 
-                        ]
-                    }
-                ]
-            }
-        ]
-    '''
+    @staticmethod
+    def _query_all_questions(tx):
+        query = """
+        MATCH (q:Question)
+        RETURN q.id, q.question, q.tags
+        """
+        result = tx.run(query)
+        return [record for record in result]
 
     @staticmethod
     def _query_questions_by_tag(tx, tag):
@@ -73,22 +180,141 @@ class Neo4j:
         return [record for record in result]        
     
     @staticmethod
-    def _create_node(tx , record):
-        query = (
-            "CREATE (n:Question {id: $id, question: $question, tags: $tags})"
-        )
-        tx.run(query, id=record["id"], question=record["question"], tags=record["tags"])
+    def _link_tags(tx, rows):
+        query = """
+        UNWIND $rows AS row
+        MATCH (q:Question {id: row.id})
+        MERGE (t:Tag {name: row.tag})
+        MERGE (q)-[:HAS_TAG]->(t)
+        """
+        tx.run(query, rows=rows)
+
+    @staticmethod
+    def _merge_questions(tx, rows):
+        query = """
+        UNWIND $rows AS row
+        MERGE (q:Question {id: row.id})
+        SET q.question = row.question, q.tags = row.tags
+        WITH q, row
+        UNWIND row.tags AS tag
+        MERGE (t:Tag {name: tag})
+        MERGE (q)-[:HAS_TAG]->(t)
+        """
+        tx.run(query, rows=rows).consume()
 
     @staticmethod
-    def _create_relationship(tx , relationship):
-        query = (
-            "MATCH (q1:Question {id: $from_id}), (q2:Question {id: $to_id})"
-            "MERGE (q1)-[r:RELATED_TO {score: $score}]->(q2)"
+    def _merge_relationships(tx, rows):
+        query = """
+        UNWIND $rows AS row
+        MATCH (q1:Question {id: row.from_id})
+        MATCH (q2:Question {id: row.to_id})
+        MERGE (q1)-[r:RELATED_TO]->(q2)
+        SET r.score = row.score
+        """
+        tx.run(query, rows=rows).consume()
+
+
+class AsyncNeo4j:
+    """
+    Async access layer used by the app. One driver, and so one connection pool
+    of NEO4J_MAX_POOL_SIZE, is shared by every request; sessions borrow from it.
+    Tag lookups go through the (:Tag) nodes created by Neo4j.migrate_tags.
+    """
+    def __init__(self, uri, user, password, max_pool_size=None):
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_pool_size or settings.NEO4J_MAX_POOL_SIZE,
         )
-        tx.run(query, from_id=relationship["from_id"], to_id=relationship["to_id"], score=relationship["score"])
+
+    async def close(self):
+        await self.driver.close()
+
+    async def get_all_questions(self):
+        async with self.driver.session() as session:
+            return await session.execute_read(self._query_all_questions)
+
+    async def get_questions_by_tag(self, tag):
+        async with self.driver.session() as session:
+            return await session.execute_read(self._query_questions_by_tag, tag)
+
+    async def get_related_questions(self, node_id, threshold):
+        async with self.driver.session() as session:
+            return await session.execute_read(self._query_related_questions, node_id, threshold)
+
+    async def get_question_tree(self, tag, threshold, depth):
+        """
+        Questions for a tag with their RELATED_TO neighbourhood up to depth
+        hops, keeping only edges scoring above threshold:
+            [
+                {
+                    id, question, score: None,
+                    related_questions: [
+                        {id, question, score, related_questions: [...]}
+                    ]
+                }
+            ]
+        Children are ordered by score and a question never reappears below itself.
+        """
+        depth = max(1, min(int(depth), MAX_TREE_DEPTH))
+        async with self.driver.session() as session:
+            records = await session.execute_read(self._query_question_edges, tag, threshold, depth)
+        return build_question_tree(records, depth)
+
+    @staticmethod
+    async def _query_all_questions(tx):
+        query = """
+        MATCH (q:Question)
+        RETURN q.id, q.question, q.tags
+        """
+        result = await tx.run(query)
+        return [record async for record in result]
+
+    @staticmethod
+    async def _query_questions_by_tag(tx, tag):
+        query = """
+        MATCH (:Tag {name: $tag})<-[:HAS_TAG]-(q:Question)
+        RETURN q.id, q.question, q.tags
+        ORDER BY q.id
+        """
+        result = await tx.run(query, tag=tag)
+        return [record async for record in result]
+
+    @staticmethod
+    async def _query_question_edges(tx, tag, threshold, depth):
+        # Variable-length bounds cannot be parameters; depth is clamped to an int by the caller
+        query = f"""
+        MATCH (:Tag {{name: $tag}})<-[:HAS_TAG]-(root:Question)
+        OPTIONAL MATCH (root)-[rels:RELATED_TO*1..{depth}]->(:Question)
+        WHERE all(r IN rels WHERE r.score > $threshold)
+        UNWIND coalesce(rels, [null]) AS r
+        WITH root, r, startNode(r) AS q1, endNode(r) AS q2
+        RETURN root.id AS root_id, root.question AS root_question,
+               collect(DISTINCT CASE WHEN r IS NULL THEN null
+                       ELSE [q1.id, q2.id, q2.question, r.score] END) AS edges
+        ORDER BY root_id
+        """
+        result = await tx.run(query, tag=tag, threshold=threshold)
+        return [record async for record in result]
+
+    @staticmethod
+    async def _query_related_questions(tx, node_id, threshold):
+        query = """
+        MATCH (q1:Question {id: $node_id})-[r:RELATED_TO]->(q2:Question)
+        WHERE r.score > $threshold
+        RETURN q2.id, q2.question, r.score
+        """
+        result = await tx.run(query, node_id=node_id, threshold=threshold)
+        return [record async for record in result]
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--upload", action="store_true", help="bulk load the question bank and relationships")
+    parser.add_argument("--batch-size", type=int, default=UPLOAD_BATCH_SIZE)
+    parser.add_argument("--migrate-tags", action="store_true", help="link questions to (:Tag) nodes")
+    args = parser.parse_args()
+
     with open(question_bank, "r", encoding="utf-8") as file:
         tagged_questions = json.load(file)
     
@@ -97,7 +323,10 @@ if __name__ == "__main__":
 
     # Uploader
     uploader = Neo4j(settings.NEO4J_URI, settings.NEO4J_USER, settings.NEO4J_PASSWORD)
-    # uploader.upload_data(tagged_questions)  # TO BE RUN ONCE
+    if args.upload:
+        uploader.bulk_upload(tagged_questions, question_relationships, batch_size=args.batch_size)
+    if args.migrate_tags:
+        print(f"Linked {uploader.migrate_tags()} question tags")
 
     questions = uploader.get_questions_by_tag('Lack_of_Engagement')
     print(questions)
@@ -0,0 +1,219 @@
+"""
+Declarative registry of the MongoDB indexes the routers and pipelines rely on.
+
+Applied idempotently at startup, or from the command line:
+
+    python -m src.database.indexes            # create anything missing
+    python -m src.database.indexes --check    # only report drift
+    python -m src.database.indexes --explain  # fail if a known query still scans a collection
+"""
+import argparse
+import asyncio
+import sys
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from utils.app_logger import setup_logger
+from utils.config import get_async_database
+
+async_db = get_async_database()
+logger = setup_logger("src/database/indexes.py")
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("employee_id", ASCENDING)], name="employee_id_unique", unique=True),
+    ],
+    "vibemeter": [
+        IndexModel([("Employee_ID", ASCENDING), ("Response_Date", DESCENDING)], name="employee_response_date"),
+        # Org-wide 7-day mood window in the dashboard reconcile
+        IndexModel([("Response_Date", DESCENDING)], name="response_date"),
+    ],
+    "activity": [
+        IndexModel([("Employee_ID", ASCENDING), ("Date", DESCENDING)], name="employee_date"),
+    ],
+    "leave": [
+        IndexModel([("Employee_ID", ASCENDING), ("Leave_Start_Date", DESCENDING)], name="employee_leave_start_date"),
+    ],
+    "rewards": [
+        IndexModel([("Employee_ID", ASCENDING), ("Award_Date", DESCENDING)], name="employee_award_date"),
+    ],
+    "performance": [
+        IndexModel([("Employee_ID", ASCENDING), ("Review_Period", DESCENDING)], name="employee_review_period"),
+    ],
+    "onboarding": [
+        IndexModel([("Employee_ID", ASCENDING)], name="employee"),
+    ],
+    "chat_history": [
+        IndexModel([("session_id", ASCENDING), ("timestamp", ASCENDING)], name="session_timestamp"),
+        IndexModel([("employee_id", ASCENDING), ("timestamp", DESCENDING)], name="employee_timestamp"),
+    ],
+    "intent_data": [
+        IndexModel([("session_id", ASCENDING), ("employee_id", ASCENDING)], name="session_employee"),
+        IndexModel([("employee_id", ASCENDING), ("updated_at", DESCENDING)], name="employee_updated_at"),
+        IndexModel([("employee_id", ASCENDING), ("ist_date", ASCENDING)], name="employee_ist_date"),
+    ],
+    "analyzed_profile": [
+        IndexModel([("Employee_ID", ASCENDING), ("ist_date", ASCENDING)], name="employee_ist_date"),
+        IndexModel([("Employee_ID", ASCENDING), ("timestamp", DESCENDING)], name="employee_timestamp"),
+    ],
+    "analysis_features": [
+        IndexModel([("Employee_ID", ASCENDING)], name="employee"),
+    ],
+    "tickets": [
+        IndexModel([("employee_id", ASCENDING)], name="employee"),
+        IndexModel([("ticket_id", ASCENDING)], name="ticket_id"),
+    ],
+    "schedules": [
+        IndexModel([("employee_id", ASCENDING), ("date", ASCENDING)], name="employee_date"),
+    ],
+}
+
+# Representative filter/sort pairs issued by the routers and pipelines; --explain
+# checks that each of them is answered from an index
+EXPLAIN_QUERIES = [
+    ("users", {"email": "EMP0001@deloitte.com"}, None),
+    ("users", {"employee_id": "EMP0001"}, None),
+    ("vibemeter", {"Employee_ID": "EMP0001", "Response_Date": {"$exists": True}}, [("Response_Date", -1)]),
+    ("activity", {"Employee_ID": "EMP0001", "Date": {"$exists": True}}, [("Date", -1)]),
+    ("leave", {"Employee_ID": "EMP0001", "Leave_Start_Date": {"$exists": True}}, [("Leave_Start_Date", -1)]),
+    ("rewards", {"Employee_ID": "EMP0001", "Award_Date": {"$exists": True}}, [("Award_Date", -1)]),
+    ("performance", {"Employee_ID": "EMP0001"}, [("Review_Period", -1)]),
+    ("onboarding", {"Employee_ID": "EMP0001"}, None),
+    ("chat_history", {"session_id": "session"}, [("timestamp", 1)]),
+    ("chat_history", {"employee_id": "EMP0001"}, [("timestamp", -1)]),
+    ("intent_data", {"session_id": "session", "employee_id": "EMP0001"}, None),
+    ("intent_data", {"employee_id": "EMP0001", "intent_data.chat_completed": True}, [("updated_at", -1)]),
+    ("intent_data", {"employee_id": "EMP0001", "ist_date": "2025-01-01"}, None),
+    ("analyzed_profile", {"Employee_ID": "EMP0001", "ist_date": "2025-01-01"}, None),
+    ("analyzed_profile", {"Employee_ID": "EMP0001"}, [("timestamp", -1)]),
+    ("tickets", {"employee_id": "EMP0001"}, None),
+    ("tickets", {"ticket_id": "ticket"}, None),
+    ("schedules", {"employee_id": "EMP0001", "date": {"$gte": "2025-01-01", "$lt": "2025-02-01"}}, None),
+]
+
+
+def _key_spec(index: Dict) -> List:
+    # The server may hand directions back as floats
+    return [(field, int(direction)) for field, direction in index["key"].items()]
+
+
+def _options(index: Dict) -> Dict:
+    return {"unique": bool(index.get("unique", False))}
+
+
+async def index_drift(db=None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Compare the declared indexes with the live ones.
+    Returns, per collection with drift, the declared indexes that are missing,
+    those that exist under the same name with different keys or options, and
+    live indexes nobody declared.
+    """
+    db = db if db is not None else async_db
+    drift = {}
+    for collection, models in INDEXES.items():
+        live = {index["name"]: index async for index in db[collection].list_indexes()}
+        report = {"missing": [], "changed": [], "extra": []}
+        for model in models:
+            declared = model.document
+            current = live.get(declared["name"])
+            if current is None:
+                report["missing"].append(declared["name"])
+            elif _key_spec(current) != _key_spec(declared) or _options(current) != _options(declared):
+                report["changed"].append(declared["name"])
+
+        declared_names = {model.document["name"] for model in models}
+        report["extra"] = sorted(name for name in live if name != "_id_" and name not in declared_names)
+        if any(report.values()):
+            drift[collection] = report
+    return drift
+
+
+async def ensure_indexes(db=None) -> Dict[str, List[str]]:
+    """
+    Create every declared index that does not exist yet.
+    Safe to run repeatedly; an index that cannot be built (say, duplicate data
+    under a unique index) is logged and skipped so the rest still apply.
+    Returns the created index names per collection.
+    """
+    db = db if db is not None else async_db
+    created = {}
+    for collection, models in INDEXES.items():
+        existing = {index["name"] async for index in db[collection].list_indexes()}
+        for model in models:
+            name = model.document["name"]
+            if name in existing:
+                continue
+            try:
+                await db[collection].create_indexes([model])
+                created.setdefault(collection, []).append(name)
+            except OperationFailure as e:
+                logger.error(f"Could not create index {collection}.{name}: {str(e)}")
+
+    if created:
+        logger.info(f"Created indexes: {created}")
+    return created
+
+
+def _plan_stages(plan: Dict):
+    """Yield every stage name in an explain() plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def collection_scans(db=None) -> List[str]:
+    """EXPLAIN_QUERIES whose winning plan still contains a COLLSCAN"""
+    db = db if db is not None else async_db
+    scans = []
+    for collection, query, sort in EXPLAIN_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            scans.append(f"{collection} {query} sort={sort}")
+    return scans
+
+
+async def main(args) -> int:
+    if not args.check:
+        await ensure_indexes()
+
+    drift = await index_drift()
+    for collection, report in drift.items():
+        for kind, names in report.items():
+            if names:
+                print(f"{collection}: {kind} {', '.join(names)}")
+    if not drift:
+        print("Indexes match the registry")
+
+    status = 1 if any(
+        report["missing"] or report["changed"] for report in drift.values()
+    ) else 0
+
+    if args.explain:
+        scans = await collection_scans()
+        for scan in scans:
+            print(f"COLLSCAN: {scan}")
+        if scans:
+            status = 1
+        else:
+            print(f"No collection scans across {len(EXPLAIN_QUERIES)} queries")
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply and verify the MongoDB index registry")
+    parser.add_argument("--check", action="store_true", help="report drift without creating indexes")
+    parser.add_argument("--explain", action="store_true", help="explain the known queries and fail on a collection scan")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.app_logger import setup_logger
+from utils.config import get_async_database, settings
+
+async_db = get_async_database()
+logger = setup_logger("src/database/profile_context.py")
+
+# Recent rows of each collection the intent analysis sees
+PROFILE_RECENT_ENTRIES = 3
+# Employee_ID is already the profile's key; repeating it in every row only costs tokens
+ROW_PROJECTION = {"_id": 0, "Employee_ID": 0}
+
+# Review_Period is "H1 2023" / "H2 2023" / "Annual 2023": newest year first,
+# and within a year H2 and Annual ahead of H1
+PERFORMANCE_PIPELINE = [
+    {"$addFields": {"_period": {"$split": ["$Review_Period", " "]}}},
+    {"$addFields": {
+        "_year": {"$toInt": {"$arrayElemAt": ["$_period", -1]}},
+        "_half": {"$cond": [{"$eq": [{"$arrayElemAt": ["$_period", 0]}, "H1"]}, 1, 2]},
+    }},
+    {"$sort": {"_year": -1, "_half": -1}},
+    {"$limit": PROFILE_RECENT_ENTRIES},
+    {"$project": {**ROW_PROJECTION, "_period": 0, "_year": 0, "_half": 0}},
+]
+
+
+def _recent(collection: str, employee_id: str, date_field: str):
+    return async_db[collection].find(
+        {"Employee_ID": employee_id}, ROW_PROJECTION
+    ).sort([(date_field, -1)]).limit(PROFILE_RECENT_ENTRIES).to_list(length=None)
+
+
+async def build_profile_context(employee_id: str) -> Dict:
+    """The employee's onboarding, latest analysis and three most recent rows of everything else"""
+    performance, onboarding, vibemeter, rewards, leave, activity, analyzed_profile = await asyncio.gather(
+        async_db.performance.aggregate(
+            [{"$match": {"Employee_ID": employee_id}}, *PERFORMANCE_PIPELINE]
+        ).to_list(length=None),
+        async_db.onboarding.find_one({"Employee_ID": employee_id}, ROW_PROJECTION),
+        _recent("vibemeter", employee_id, "Response_Date"),
+        _recent("rewards", employee_id, "Award_Date"),
+        _recent("leave", employee_id, "Leave_Start_Date"),
+        _recent("activity", employee_id, "Date"),
+        async_db.analyzed_profile.find_one(
+            {"Employee_ID": employee_id}, ROW_PROJECTION, sort=[("timestamp", -1)]
+        ),
+    )
+    return {
+        "employee_id": employee_id,
+        "onboarding": onboarding,
+        "vibemeter": vibemeter,
+        "performance": performance,
+        "rewards": rewards,
+        "leave": leave,
+        "activity": activity,
+        "analyzed_profile": analyzed_profile,
+    }
+
+
+class ProfileContextCache:
+    """
+    Per-employee profile for the intent analysis prompt, kept already
+    serialised to JSON. Entries are dropped by invalidate() when the
+    employee's data is written, and expire after PROFILE_CONTEXT_TTL_MINUTES
+    so writes made by another worker process are picked up too. At most
+    PROFILE_CONTEXT_MAX_EMPLOYEES are kept, least recently used first out.
+    """
+    def __init__(self, ttl_minutes: Optional[int] = None, max_employees: Optional[int] = None):
+        self.ttl_seconds = (ttl_minutes if ttl_minutes is not None else settings.PROFILE_CONTEXT_TTL_MINUTES) * 60
+        self.max_employees = max_employees if max_employees is not None else settings.PROFILE_CONTEXT_MAX_EMPLOYEES
+        self.profiles: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_json(self, employee_id: str) -> str:
+        """The serialised profile; "{}" (not cached) if it cannot be read, as before"""
+        cached = self.profiles.get(employee_id)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            self.profiles.move_to_end(employee_id)
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        try:
+            profile_json = json.dumps(await build_profile_context(employee_id), default=str)
+        except Exception as e:
+            logger.error(f"Error creating JSON profile for {employee_id}: {str(e)}", exc_info=True)
+            return "{}"
+
+        self.profiles[employee_id] = (time.monotonic(), profile_json)
+        self.profiles.move_to_end(employee_id)
+        while len(self.profiles) > self.max_employees:
+            self.profiles.popitem(last=False)
+        return profile_json
+
+    def invalidate(self, employee_ids: Optional[List[str]] = None) -> None:
+        """Forget the listed employees' profiles; all of them by default"""
+        if employee_ids is None:
+            self.profiles.clear()
+            return
+        for employee_id in employee_ids:
+            self.profiles.pop(employee_id, None)
+
+
+profile_context = ProfileContextCache()
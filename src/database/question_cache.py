@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.database.graph_db import question_tags
+from src.database.question_similarity import LocalQuestionBank
+from utils.app_logger import setup_logger
+from utils.config import settings
+
+logger = setup_logger("src/database/question_cache.py")
+
+
+class QuestionBankCache:
+    """
+    In-process tag -> questions index over the Neo4j question bank, plus the
+    related-question trees fetched per (tag, threshold, depth).
+
+    The whole bank is read once by refresh() and served from memory until it
+    is older than QUESTION_CACHE_TTL_MINUTES. A tag that is not in the index
+    falls back to a Neo4j lookup whose result is cached alongside the rest.
+
+    When Neo4j fails, or QUESTION_BANK_BACKEND is "local", reads are answered
+    by LocalQuestionBank from the bundled files instead. After a failure Neo4j
+    is left alone for QUESTION_BANK_NEO4J_RETRY_SECONDS, so reads do not each
+    wait out a driver timeout while it is down.
+    """
+    def __init__(self, graph_db, ttl_minutes: Optional[int] = None, fallback_factory=LocalQuestionBank,
+                 retry_seconds: Optional[int] = None):
+        self.graph_db = graph_db
+        self.fallback_factory = fallback_factory
+        self._fallback = None
+        self.retry_seconds = retry_seconds if retry_seconds is not None else settings.QUESTION_BANK_NEO4J_RETRY_SECONDS
+        self.graph_failed_at: Optional[float] = None
+        self.ttl_seconds = (ttl_minutes if ttl_minutes is not None else settings.QUESTION_CACHE_TTL_MINUTES) * 60
+        self.questions_by_tag: Dict[str, List[str]] = {}
+        self.trees: Dict[Tuple[str, float, int], List[Dict]] = {}
+        self.loaded_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self._refresh_lock = asyncio.Lock()
+
+    def _use_graph(self) -> bool:
+        if settings.QUESTION_BANK_BACKEND == "local":
+            return False
+        return self.graph_failed_at is None or time.monotonic() - self.graph_failed_at >= self.retry_seconds
+
+    async def _read(self, method: str, *args):
+        if self._use_graph():
+            try:
+                result = await getattr(self.graph_db, method)(*args)
+                self.graph_failed_at = None
+                return result
+            except Exception as e:
+                self.graph_failed_at = time.monotonic()
+                logger.error(
+                    f"Neo4j {method} failed, using the local question bank for {self.retry_seconds}s: {str(e)}"
+                )
+        if self._fallback is None:
+            self._fallback = await asyncio.to_thread(self.fallback_factory)
+        return await getattr(self._fallback, method)(*args)
+
+    def _expired(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.ttl_seconds
+
+    async def refresh(self) -> int:
+        """Reload the whole bank from Neo4j; returns the number of tags indexed"""
+        async with self._refresh_lock:
+            records = await self._read("get_all_questions")
+            index: Dict[str, List[str]] = {}
+            for record in sorted(records, key=lambda r: r.get("q.id") or 0):
+                for tag in question_tags(record.get("q.tags")):
+                    index.setdefault(tag, []).append(record.get("q.question"))
+            self.questions_by_tag = index
+            self.trees = {}
+            self.loaded_at = time.monotonic()
+            logger.info(f"Loaded {len(records)} questions across {len(index)} tags")
+            return len(index)
+
+    async def _ensure_fresh(self) -> None:
+        if self._expired():
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving the stale index rather than failing the chat turn
+                logger.error(f"Error refreshing question cache: {str(e)}")
+
+    async def get_questions(self, tag: str) -> List[str]:
+        await self._ensure_fresh()
+
+        questions = self.questions_by_tag.get(tag)
+        if questions is not None:
+            self.hits += 1
+            return questions
+
+        self.misses += 1
+        records = await self._read("get_questions_by_tag", tag)
+        questions = [record.get("q.question") for record in records]
+        self.questions_by_tag[tag] = questions
+        return questions
+
+    async def get_question_tree(self, tag: str, threshold: float, depth: int) -> List[Dict]:
+        """Related-question tree for a tag, fetched once per (tag, threshold, depth) and then served locally"""
+        await self._ensure_fresh()
+        key = (tag, threshold, depth)
+        tree = self.trees.get(key)
+        if tree is None:
+            tree = await self._read("get_question_tree", tag, threshold, depth)
+            self.trees[key] = tree
+        return tree
+
+    def invalidate(self) -> None:
+        """Force the next lookup to reload the bank"""
+        self.loaded_at = None
@@ -0,0 +1,162 @@
+"""
+Neo4j-free view of the question bank: question_relationships.json compiled
+into a CSR matrix (int32 ids and offsets, float16 scores) stored as .npy files
+and memory-mapped on load. Every row is sorted by score, so top-k is a slice.
+
+    python -m src.database.question_similarity --rebuild --benchmark
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.database.graph_db import (
+    MAX_TREE_DEPTH,
+    build_question_tree,
+    question_bank,
+    question_relations,
+    question_tags,
+)
+from utils.app_logger import setup_logger
+from utils.config import settings
+
+logger = setup_logger("src/database/question_similarity.py")
+
+ARRAYS = ("ids", "indptr", "indices", "scores")
+META_FILE = "meta.json"
+
+
+def _source_hash(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def compile_similarity(relationships: List[Dict], out_dir: str, source: str = "") -> None:
+    """Write the relationships as a row-sorted CSR matrix under out_dir"""
+    from_ids = np.array([r["from_id"] for r in relationships], dtype=np.int32)
+    to_ids = np.array([r["to_id"] for r in relationships], dtype=np.int32)
+    scores = np.array([r["score"] for r in relationships], dtype=np.float32)
+
+    ids = np.unique(np.concatenate([from_ids, to_ids]))
+    rows = np.searchsorted(ids, from_ids)
+    cols = np.searchsorted(ids, to_ids)
+
+    # Group by row, highest score first within each row
+    order = np.lexsort((-scores, rows))
+    indptr = np.zeros(len(ids) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=len(ids)), out=indptr[1:])
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "ids.npy"), ids)
+    np.save(os.path.join(out_dir, "indptr.npy"), indptr)
+    np.save(os.path.join(out_dir, "indices.npy"), cols[order].astype(np.int32))
+    np.save(os.path.join(out_dir, "scores.npy"), scores[order].astype(np.float16))
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump({"source": source, "questions": int(len(ids)), "relationships": len(relationships)}, f)
+
+
+class QuestionSimilarity:
+    def __init__(self, matrix_dir: str):
+        self.ids, self.indptr, self.indices, self.scores = (
+            np.load(os.path.join(matrix_dir, f"{name}.npy"), mmap_mode="r") for name in ARRAYS
+        )
+        # Question ids are few; resolving them through a dict keeps lookups off the numpy call path
+        self.rows = {question_id: row for row, question_id in enumerate(self.ids.tolist())}
+        self.offsets = self.indptr.tolist()
+
+    @classmethod
+    def load(cls, matrix_dir: Optional[str] = None, relationships_path=question_relations):
+        """Open the compiled matrix, compiling it first when missing or built from other data"""
+        matrix_dir = matrix_dir or settings.QUESTION_SIMILARITY_DIR
+        source = _source_hash(relationships_path)
+        meta_path = os.path.join(matrix_dir, META_FILE)
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        if not meta or meta.get("source") != source:
+            with open(relationships_path, "r", encoding="utf-8") as f:
+                relationships = json.load(f)
+            compile_similarity(relationships, matrix_dir, source)
+            logger.info(f"Compiled {len(relationships)} question relationships into {matrix_dir}")
+        return cls(matrix_dir)
+
+    def top_k(self, question_id: int, k: int = 10, threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Up to k (related id, score) pairs for a question, best first"""
+        row = self.rows.get(question_id)
+        if row is None:
+            return []
+        start = self.offsets[row]
+        end = min(self.offsets[row + 1], start + k)
+        scores = self.scores[start:end].tolist()
+        if threshold is not None:
+            # Rows are sorted, so everything past the first miss is below threshold too
+            scores = [score for score in scores if score > threshold]
+        related = self.ids[self.indices[start:start + len(scores)]].tolist()
+        return list(zip(related, scores))
+
+
+class LocalQuestionBank:
+    """
+    The subset of the AsyncNeo4j read API the chatbot uses, answered from the
+    bundled tagged_questions.json and the compiled similarity matrix.
+    """
+    def __init__(self, similarity: QuestionSimilarity = None, questions_path=question_bank):
+        with open(questions_path, "r", encoding="utf-8") as f:
+            self.questions = sorted(json.load(f), key=lambda q: q["id"])
+        self.text = {q["id"]: q["question"] for q in self.questions}
+        self.similarity = similarity or QuestionSimilarity.load()
+
+    def _record(self, question):
+        return {"q.id": question["id"], "q.question": question["question"], "q.tags": question["tags"]}
+
+    async def get_all_questions(self):
+        return [self._record(q) for q in self.questions]
+
+    async def get_questions_by_tag(self, tag):
+        return [self._record(q) for q in self.questions if tag in question_tags(q["tags"])]
+
+    async def get_question_tree(self, tag, threshold, depth, k: int = 10):
+        depth = max(1, min(int(depth), MAX_TREE_DEPTH))
+        records = []
+        for question in self.questions:
+            if tag not in question_tags(question["tags"]):
+                continue
+            edges, frontier, seen = [], [question["id"]], {question["id"]}
+            for _ in range(depth):
+                next_frontier = []
+                for node_id in frontier:
+                    for related_id, score in self.similarity.top_k(node_id, k, threshold):
+                        edges.append([node_id, related_id, self.text.get(related_id), score])
+                        if related_id not in seen:
+                            seen.add(related_id)
+                            next_frontier.append(related_id)
+                frontier = next_frontier
+            records.append({"root_id": question["id"], "root_question": question["question"], "edges": edges})
+        return build_question_tree(records, depth)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile and query the question similarity matrix")
+    parser.add_argument("--rebuild", action="store_true", help="recompile even if the matrix is current")
+    parser.add_argument("--benchmark", action="store_true", help="time top-k lookups over every question")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(os.path.join(settings.QUESTION_SIMILARITY_DIR, META_FILE)):
+        os.remove(os.path.join(settings.QUESTION_SIMILARITY_DIR, META_FILE))
+    similarity = QuestionSimilarity.load()
+    print(f"{len(similarity.ids)} questions, {len(similarity.indices)} relationships, "
+          f"{sum(a.nbytes for a in (similarity.ids, similarity.indptr, similarity.indices, similarity.scores))} bytes")
+
+    if args.benchmark:
+        ids = similarity.ids.tolist()
+        started = time.perf_counter()
+        for question_id in ids:
+            similarity.top_k(question_id, args.k)
+        elapsed = time.perf_counter() - started
+        print(f"top-{args.k}: {elapsed / len(ids) * 1e6:.1f} us per lookup")
@@ -1,6 +1,9 @@
 import pandas as pd
 from datetime import UTC, datetime
 from src.analysis.generate_data import generate_data
+from src.database.admin_dashboard import reconcile_dashboard, refresh_dashboard_contribution
+from src.database.employee_snapshot import invalidate_employee_snapshots, refresh_employee_snapshot
+from src.database.profile_context import profile_context
 from utils.auth import get_password_hash
 from utils.config import get_async_database
 import asyncio
@@ -100,6 +103,10 @@ async def preprocess_and_upload_data():
         if activity_data:
             await async_db.activity.insert_many(activity_data)
 
+        # Every employee's data was replaced, so rebuild snapshots lazily on read
+        await invalidate_employee_snapshots()
+        profile_context.invalidate()
+        await reconcile_dashboard()
         print("Data upload completed successfully!")
 
     except Exception as e:
@@ -283,6 +290,9 @@ async def save_to_mongodb(dataset, hr_user):
             except Exception as e:
                 print(f"Error processing vibe scores data for Employee {emp_id}: {e}")
 
+            await refresh_employee_snapshot(emp_id)
+            await refresh_dashboard_contribution(emp_id)
+            profile_context.invalidate([emp_id])
             print(f"Completed processing for Employee ID: {emp_id}\n")
 
         except Exception as e:
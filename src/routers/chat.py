@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from typing import Dict, List, Optional
 from datetime import datetime
+import json
 
 from pydantic import BaseModel
 from src.chatbot.chat_bot import (
     chat_complete,
+    chat_complete_events,
     get_chat_history
 )
 from utils.analysis import convert_to_ist
@@ -62,6 +66,50 @@ async def start_chat(
             detail="Error processing chat message"
         )
 
+@router.post("/message/stream")
+async def stream_chat(
+    message: ChatMessage,
+    current_user: dict = Depends(get_current_user),
+    session_id: str = None
+):
+    """
+    Server-Sent Events variant of /message: a "token" event for each piece of
+    the question or mentor reply as it is generated, then one "done" event
+    with the same body /message returns.
+    """
+    if session_id and not message.message:
+        raise HTTPException(
+            status_code=400,
+            detail="Message is required for existing session"
+        )
+
+    if not session_id:
+        # Generate a new session ID
+        session_id = str(datetime.now().timestamp())
+        message.message = None
+
+    async def event_stream():
+        try:
+            async for event in chat_complete_events(
+                employee_id=current_user["employee_id"],
+                session_id=session_id,
+                message=message.message
+            ):
+                if event["type"] == "done":
+                    event = {**event, "session_id": session_id}
+                yield f"event: {event['type']}\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
+        except Exception as e:
+            logger.error(f"Error in stream_chat: {str(e)}")
+            error = {"type": "done", "session_id": session_id, "error": "Error processing chat message", "conversation_status": "error"}
+            yield f"event: done\ndata: {json.dumps(error)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream into one response
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/history/{session_id}")
 async def get_session_history(
     session_id: str,
@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+from utils.api_key_rotate import APIKeyManager, FakeClock
+
+
+def manager(keys=("a", "b", "c"), **kwargs):
+    kwargs.setdefault("rate_limit", 2)
+    kwargs.setdefault("cooldown_period", 60)
+    kwargs.setdefault("day_limit", 100)
+    return APIKeyManager(list(keys), clock=FakeClock(), **kwargs)
+
+
+class APIKeyManagerTest(unittest.TestCase):
+    def test_per_key_rate(self):
+        keys = manager(keys=["a"])
+        self.assertEqual([keys.use_and_get_key() for _ in range(2)], ["a", "a"])
+        self.assertEqual(keys.clock.now(), 0)
+        # The third request waits for one token: 60s / 2 requests
+        keys.use_and_get_key()
+        self.assertAlmostEqual(keys.clock.now(), 30)
+
+    def test_requests_spread_by_weight(self):
+        keys = manager(rate_limit=6, weights=[2, 1, 1])
+        for _ in range(6):
+            keys.use_and_get_key()
+        # Key a is picked while it has more than twice the tokens of the others
+        self.assertEqual([usage["requests"] for usage in keys.usage()], [4, 1, 1])
+
+    def test_day_limit(self):
+        keys = manager(keys=["a"], rate_limit=100, day_limit=3)
+        for _ in range(3):
+            keys.use_and_get_key()
+        self.assertEqual(keys.clock.now(), 0)
+        keys.use_and_get_key()
+        # One of three daily requests comes back every 8 hours
+        self.assertAlmostEqual(keys.clock.now(), 8 * 60 * 60)
+
+    def test_rate_limited_key_is_parked(self):
+        keys = manager(keys=["a", "b"], rate_limit=10)
+        keys.report_rate_limited("a", retry_after=20)
+        self.assertEqual({keys.use_and_get_key() for _ in range(5)}, {"b"})
+        self.assertEqual(keys.usage()[0]["rate_limited"], 1)
+        keys.clock.advance(20)
+        self.assertIn("a", {keys.use_and_get_key() for _ in range(5)})
+
+    def test_rate_limited_without_delay_parks_for_cooldown(self):
+        keys = manager(keys=["a"], rate_limit=10)
+        keys.report_rate_limited("a")
+        keys.use_and_get_key()
+        self.assertAlmostEqual(keys.clock.now(), 60)
+
+    def test_concurrent_acquire_is_fair(self):
+        keys = manager()
+
+        async def run():
+            return await asyncio.gather(*(keys.acquire() for _ in range(12)))
+
+        acquired = asyncio.run(run())
+        # Every waiter is served, the keys share the load evenly, and the
+        # six waiting requests are all served by the first refill
+        self.assertEqual(sorted(acquired), ["a"] * 4 + ["b"] * 4 + ["c"] * 4)
+        self.assertLessEqual(keys.clock.now(), 60)
+
+    def test_empty_key_list(self):
+        with self.assertRaises(ValueError):
+            APIKeyManager([])
+
+    def test_weights_must_match_keys(self):
+        with self.assertRaises(ValueError):
+            manager(weights=[1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import unittest
+
+os.environ.setdefault("MONGODB_NAME", "test")
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.benchmark_decay import rowwise_decay_score, wide_frame
+from src.analysis.data_analyze_pipeline import calculate_decay_score
+
+
+class DecayScoreTest(unittest.TestCase):
+    """The vectorised calculate_decay_score against the original per-row formula"""
+
+    def assertSameScores(self, frame, date_format, baseline=2.5):
+        expected = rowwise_decay_score(frame, "Score", "Date", date_format, "Decay", baseline)["Decay"]
+        actual = calculate_decay_score(frame, "Score", "Date", date_format, "Decay", baseline)["Decay"]
+        np.testing.assert_allclose(actual.to_numpy(float), expected.to_numpy(float), rtol=1e-12, equal_nan=True)
+
+    def test_generated_frames(self):
+        # The three date formats the pipeline uses, wide and narrow
+        for date_format in ["%Y-%m-%d", "%Y-%m", "%Y"]:
+            for entries in [1, 6, 24]:
+                with self.subTest(date_format=date_format, entries=entries):
+                    frame = wide_frame(400, entries, date_format, seed=entries)
+                    self.assertTrue(frame.filter(like="Date_").isna().to_numpy().any())
+                    self.assertSameScores(frame, date_format)
+
+    def test_rows_without_entries(self):
+        frame = pd.DataFrame({
+            "Score_1": [np.nan, 3.0, 4.0],
+            "Date_1": [None, None, "2024-01"],
+            "Score_2": [np.nan, np.nan, np.nan],
+            "Date_2": [None, "2024-02", "2024-03"],
+        })
+        result = calculate_decay_score(frame, "Score", "Date", "%Y-%m", "Decay", 2.5)["Decay"]
+        self.assertTrue(result[:2].isna().all())
+        self.assertSameScores(frame, "%Y-%m")
+
+    def test_single_entries(self):
+        frame = pd.DataFrame({
+            "Score_1": [1.0, np.nan, 5.0],
+            "Date_1": ["2020", None, "2024"],
+            "Score_2": [np.nan, 2.0, np.nan],
+            "Date_2": [None, "2023", None],
+        })
+        self.assertSameScores(frame, "%Y")
+
+    def test_unparseable_entries_are_skipped(self):
+        frame = pd.DataFrame({
+            "Score_1": [1.0, "x", 3.0],
+            "Date_1": ["2024-01-05", "2024-01-05", "05/01/2024"],
+            "Score_2": [2.0, 4.0, 1.0],
+            "Date_2": ["2023-06-01", "2023-06-01", "2023-06-01"],
+        })
+        self.assertSameScores(frame, "%Y-%m-%d")
+
+    def test_empty_frame_and_missing_columns(self):
+        empty = wide_frame(0, 3)
+        self.assertEqual(len(calculate_decay_score(empty, "Score", "Date", "%Y-%m-%d", "Decay", 2.5)), 0)
+
+        unrelated = pd.DataFrame({"Score_1": [1.0], "Other_1": ["2024-01-01"]})
+        result = calculate_decay_score(unrelated, "Score", "Date", "%Y-%m-%d", "Decay", 2.5)
+        self.assertTrue(result["Decay"].isna().all())
+
+
+if __name__ == "__main__":
+    unittest.main()
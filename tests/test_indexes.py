@@ -0,0 +1,62 @@
+import asyncio
+import os
+import unittest
+
+os.environ.setdefault("MONGODB_NAME", "test")
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from src.database.indexes import EXPLAIN_QUERIES, INDEXES, collection_scans, ensure_indexes, index_drift
+from utils.config import get_async_database, settings
+
+
+def mongo_reachable():
+    client = MongoClient(settings.MONGODB_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+class IndexRegistryTest(unittest.TestCase):
+    def test_ensure_indexes_leaves_no_drift(self):
+        db = AsyncMongoMockClient()["test"]
+
+        async def run():
+            await ensure_indexes(db)
+            return await index_drift(db)
+
+        self.assertEqual(asyncio.run(run()), {})
+
+    def test_explain_queries_have_a_declared_index(self):
+        # The leading key of some declared index must be filtered on, or the query scans
+        for collection, query, sort in EXPLAIN_QUERIES:
+            leading_keys = {next(iter(model.document["key"])) for model in INDEXES[collection]}
+            self.assertTrue(
+                leading_keys & set(query),
+                f"{collection} {query} sort={sort} has no index on its filter"
+            )
+
+
+@unittest.skipUnless(mongo_reachable(), "no MongoDB reachable at MONGODB_URI")
+class LiveIndexTest(unittest.TestCase):
+    """Checks the configured database; read-only, run after deploying indexes"""
+    def test_no_missing_or_changed_indexes(self):
+        drift = asyncio.run(index_drift(get_async_database()))
+        problems = {
+            collection: report for collection, report in drift.items()
+            if report["missing"] or report["changed"]
+        }
+        self.assertEqual(problems, {})
+
+    def test_explain_queries_use_an_index(self):
+        self.assertEqual(asyncio.run(collection_scans(get_async_database())), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
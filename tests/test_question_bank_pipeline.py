@@ -0,0 +1,112 @@
+import asyncio
+import contextlib
+import io
+import itertools
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+os.environ.setdefault("MONGODB_NAME", "test")
+
+import uvicorn
+
+from src.analysis import fake_llm_server
+from src.analysis.data.question_bank import question_bank
+from src.analysis.question_bank_pipeline import (
+    load_relationship_checkpoint,
+    plan_relationship_batches,
+    process_question_bank,
+    process_question_relationships,
+    question_tag_set,
+)
+from utils.api_key_rotate import APIKeyManager
+
+QUESTIONS = question_bank[:12]
+
+
+def permissive_manager():
+    return APIKeyManager(["a", "b", "c"], rate_limit=1000, cooldown_period=60, day_limit=100000)
+
+
+class QuestionBankPipelineTest(unittest.TestCase):
+    """Tagging and relationship scoring end to end against fake_llm_server, with a 429 every 4th request"""
+
+    @classmethod
+    def setUpClass(cls):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        cls.base_url = f"http://127.0.0.1:{sock.getsockname()[1]}/v1/"
+        fake_llm_server.app.state.rate_limit_every = 4
+        cls.server = uvicorn.Server(uvicorn.Config(fake_llm_server.app, log_level="error"))
+        cls.thread = threading.Thread(target=cls.server.run, kwargs={"sockets": [sock]}, daemon=True)
+        cls.thread.start()
+        while not cls.server.started:
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.should_exit = True
+        cls.thread.join()
+        fake_llm_server.app.state.rate_limit_every = 0
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tagged_path = os.path.join(directory.name, "tagged.json")
+        self.relationships_path = os.path.join(directory.name, "relationships.json")
+
+    def run_pipeline(self, coroutine):
+        # The pipelines report progress with print
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(coroutine)
+
+    def tag(self):
+        return self.run_pipeline(process_question_bank(
+            QUESTIONS, ["a"], output_path=self.tagged_path, base_url=self.base_url,
+            max_batch_size=4, api_manager=permissive_manager()
+        ))
+
+    def score(self):
+        return self.run_pipeline(process_question_relationships(
+            ["a"], batch_size=2, questions_path=self.tagged_path, output_path=self.relationships_path,
+            base_url=self.base_url, api_manager=permissive_manager()
+        ))
+
+    def test_tags_and_scores_every_shared_tag_pair(self):
+        requests_before = fake_llm_server.app.state.requests
+        tagged = self.tag()
+        self.assertEqual([q["id"] for q in tagged], list(range(1, len(QUESTIONS) + 1)))
+        self.assertTrue(all(set(q["tags"]) <= set(fake_llm_server.FAKE_TAGS) for q in tagged))
+
+        relationships = self.score()
+        shared = {
+            (a["id"], b["id"])
+            for a, b in itertools.combinations(tagged, 2)
+            if question_tag_set(a) & question_tag_set(b)
+        }
+        self.assertTrue(0 < len(shared) < len(QUESTIONS) * (len(QUESTIONS) - 1) // 2)
+        self.assertEqual(len(relationships), len(shared))
+        self.assertEqual({(r["from_id"], r["to_id"]) for r in relationships}, shared)
+        self.assertTrue(all(0 <= r["score"] <= 100 for r in relationships))
+
+        # Every 4th request was answered with a 429 and retried
+        batches = 3 + len(plan_relationship_batches(tagged, batch_size=2))
+        self.assertGreater(fake_llm_server.app.state.requests - requests_before, batches)
+
+    def test_rerun_resumes_from_checkpoints(self):
+        tagged = self.tag()
+        relationships = self.score()
+        checkpoint = load_relationship_checkpoint(self.relationships_path + ".checkpoint.jsonl")
+        self.assertEqual(plan_relationship_batches(tagged, batch_size=2, scored=checkpoint), [])
+
+        requests_before = fake_llm_server.app.state.requests
+        self.assertEqual(self.tag(), tagged)
+        self.assertEqual(self.score(), relationships)
+        self.assertEqual(fake_llm_server.app.state.requests, requests_before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
+from collections import defaultdict
 from datetime import datetime, timezone
 import random
 
 import pytz
 
+from utils.app_logger import setup_logger
+
+logger = setup_logger("utils/analysis.py")
+
 
 def get_vibe(score):
     if not isinstance(score, (int, float)):
@@ -53,6 +58,150 @@ def convert_to_ist(utc_dt):
         print(f"Error converting to IST: {e}")
         return None
     
+def process_activity_data(activity_data):
+    """Process and analyze communication activity data"""
+    
+    if not activity_data:
+        return {}
+
+    # Group data by weeks (using 7-day periods)
+    weeks_data = defaultdict(lambda: {
+        "teams_messages": 0,
+        "emails": 0,
+        "meetings": 0,
+        "work_hours": 0
+    })
+    
+    activity_level = []
+    
+    # Process data week by week
+    for activity in activity_data:
+        if "Date" in activity:
+            activity_level.append({
+                    "date": convert_to_ist(activity.get("Date")).isoformat(),
+                    "teamsMessages": activity.get("Teams_Messages_Sent", 0),
+                    "emails": activity.get("Emails_Sent", 0),
+                    "meetings": activity.get("Meetings_Attended", 0),
+                    "work_hours": activity.get("Work_Hours", 0)
+                })
+            
+            # Get week number from the date
+            week_number = activity["Date"].isocalendar()[1]
+            
+            weeks_data[week_number].update({
+                "teams_messages": weeks_data[week_number]["teams_messages"] + activity.get("Teams_Messages_Sent", 0),
+                "emails": weeks_data[week_number]["emails"] + activity.get("Emails_Sent", 0),
+                "meetings": weeks_data[week_number]["meetings"] + activity.get("Meetings_Attended", 0),
+                "work_hours": weeks_data[week_number]["work_hours"] + activity.get("Work_Hours", 0)
+            })
+
+    # Calculate averages per week
+    num_weeks = len(weeks_data)
+    if num_weeks == 0:
+        return {
+            "weekly_averages": {
+                "teams_messages": 0,
+                "emails": 0,
+                "meetings": 0,
+                "work_hours": 0
+            },
+            "communication_scores": {
+                "messages_score": 0,
+                "emails_score": 0,
+                "meetings_score": 0
+            }
+        }
+
+    weekly_averages = {
+        "teams_messages": round(sum(week["teams_messages"] for week in weeks_data.values()) / num_weeks, 2),
+        "emails": round(sum(week["emails"] for week in weeks_data.values()) / num_weeks, 2),
+        "meetings": round(sum(week["meetings"] for week in weeks_data.values()) / num_weeks, 2),
+        "work_hours": round(sum(week["work_hours"] for week in weeks_data.values()) / num_weeks, 2)
+    }
+
+    # Calculate communication scores
+    total_communications = weekly_averages["teams_messages"] + weekly_averages["emails"] + weekly_averages["meetings"]
+    
+    communication_scores = {
+        "messages_score": round((weekly_averages["teams_messages"] / total_communications * 100), 2) if total_communications > 0 else 0,
+        "emails_score": round((weekly_averages["emails"] / total_communications * 100), 2) if total_communications > 0 else 0,
+        "meetings_score": round((weekly_averages["meetings"] / total_communications * 100), 2) if total_communications > 0 else 0
+    }
+
+    return {
+        "weekly_averages": weekly_averages,
+        "communication_scores": communication_scores,
+        "activity_level": activity_level
+    }
+
+def process_leave_data(leave_data, current_ist):
+    """Process leave data for last 12 months"""
+    months_order = [
+        "January", "February", "March", "April", "May", "June",
+        "July", "August", "September", "October", "November", "December"
+    ]
+
+    # Initialize monthly leave structure with defaultdict
+    leave_per_month = defaultdict(
+        lambda: {
+            "sick": 0,
+            "casual": 0,
+            "annual": 0,
+            "unpaid": 0,
+            "other": 0
+        }
+    )
+
+    # Pre-initialize last 12 months to ensure order
+    ordered_months = []
+    for i in range(12):
+        month_num = (current_ist.month - 1 - i) % 12 + 1
+        year = current_ist.year - (1 if (current_ist.month - 1 - i) < 0 else 0)
+        month_name = f"{months_order[month_num - 1]} {year}"
+        ordered_months.append(month_name)
+        leave_per_month[month_name]  # Initialize the month
+
+    # Process leave data
+    total_leaves = defaultdict(int)
+    for leave in leave_data:
+        try:
+            if "Leave_Start_Date" in leave:
+                leave_date = convert_to_ist(leave["Leave_Start_Date"])
+                month_name = f"{months_order[leave_date.month - 1]} {leave_date.year}"
+                
+                leave_type = leave.get("Leave_Type", "").lower()
+                leave_days = leave.get("Leave_Days", 0)
+                
+                if "sick" in leave_type:
+                    leave_per_month[month_name]["sick"] += leave_days
+                    total_leaves["sick"] += leave_days
+                elif "casual" in leave_type:
+                    leave_per_month[month_name]["casual"] += leave_days
+                    total_leaves["casual"] += leave_days
+                elif "annual" in leave_type:
+                    leave_per_month[month_name]["annual"] += leave_days
+                    total_leaves["annual"] += leave_days
+                elif "unpaid" in leave_type:
+                    leave_per_month[month_name]["unpaid"] += leave_days
+                    total_leaves["unpaid"] += leave_days
+                else:
+                    leave_per_month[month_name]["other"] += leave_days
+                    total_leaves["other"] += leave_days
+        except Exception as e:
+            logger.error(f"Error processing leave: {str(e)}")
+            continue
+
+    # Create ordered dictionary with only last 12 months
+    ordered_leave_data = {
+        month: leave_per_month[month]
+        for month in ordered_months
+    }
+
+    return {
+        "monthly_breakdown": ordered_leave_data,
+        "total_leaves": dict(total_leaves)
+    }
+
 def get_project_details():
     projects = [
         {
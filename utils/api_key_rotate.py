@@ -1,68 +1,192 @@
-from time import sleep
-from datetime import datetime, timedelta
-import random
-from typing import List
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from utils.app_logger import setup_logger
 
 logger = setup_logger("utils/api_key_rotate.py")
 
+DAY_SECONDS = 24 * 60 * 60
+
+
+class MonotonicClock:
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    def sleep_sync(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+class FakeClock:
+    """
+    Deterministic clock for exercising the scheduler: time only moves when
+    something sleeps on it or advance() is called.
+    """
+    def __init__(self, start: float = 0.0):
+        self.current = start
+
+    def now(self) -> float:
+        return self.current
+
+    def advance(self, seconds: float) -> None:
+        self.current += seconds
+
+    async def sleep(self, seconds: float) -> None:
+        # Concurrent sleepers share one timeline instead of each adding their wait
+        target = self.current + seconds
+        await asyncio.sleep(0)
+        self.current = max(self.current, target)
+
+    def sleep_sync(self, seconds: float) -> None:
+        self.advance(seconds)
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, period: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available, assuming refill() was just called"""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+def parse_retry_delay(error) -> Optional[float]:
+    """
+    Seconds a provider asked us to back off for in a 429, read from the
+    Retry-After header or the Gemini style "retryDelay": "23s" error detail.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    body = getattr(error, "body", None)
+    text = json.dumps(body) if body is not None else str(error)
+    match = re.search(r'"?retryDelay"?\s*[:=]\s*"?(\d+(?:\.\d+)?)s', text)
+    return float(match.group(1)) if match else None
+
+
 class APIKeyManager:
-    def __init__(self, api_keys: List[str], model_name: str = None, rate_limit: int = 10, cooldown_period: int = 60, day_limit: int = 1500):
+    """
+    Hands out API keys within each key's per-minute and per-day limits.
+
+    Every key has two token buckets: rate_limit requests refilled over
+    cooldown_period seconds and day_limit requests refilled over a day. Among
+    keys with capacity, the one with the most weighted per-minute tokens left
+    is used. When none has capacity, acquire() waits for the earliest one to
+    free up instead of spinning.
+    """
+    def __init__(self, api_keys: List[str], model_name: str = None, rate_limit: int = 10, cooldown_period: int = 60,
+                 day_limit: int = 1500, weights: Optional[List[float]] = None, clock=None):
+        if not api_keys:
+            raise ValueError("APIKeyManager needs at least one API key")
         self.api_keys = api_keys
-        self.current_key_index = 0
-        self.request_counts = {key: 0 for key in api_keys}
-        self.daily_counts = {key: 0 for key in api_keys}
-        self.last_request_time = {key: datetime.now() for key in api_keys}
-        self.last_day_reset = {key: datetime.now() for key in api_keys}
+        self.model_name = model_name
         self.rate_limit = rate_limit
         self.cooldown_period = cooldown_period
         self.day_limit = day_limit
+        self.weights = weights or [1.0] * len(api_keys)
+        if len(self.weights) != len(api_keys):
+            raise ValueError("weights must have one entry per API key")
+        self.clock = clock or MonotonicClock()
+
+        now = self.clock.now()
+        self.minute_buckets = [TokenBucket(rate_limit, cooldown_period, now) for _ in api_keys]
+        self.day_buckets = [TokenBucket(day_limit, DAY_SECONDS, now) for _ in api_keys]
+        self.blocked_until = [0.0] * len(api_keys)
+        self.request_counts = [0] * len(api_keys)
+        self.rate_limited_counts = [0] * len(api_keys)
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
 
-    def _check_and_reset_daily_count(self, key: str) -> None:
-        current_time = datetime.now()
-        time_since_reset = current_time - self.last_day_reset[key]
-        
-        # Reset daily count if 24 hours have passed
-        if time_since_reset >= timedelta(days=1):
-            self.daily_counts[key] = 0
-            self.last_day_reset[key] = current_time
-            logger.info(f"Daily count reset for key {self.api_keys.index(key)}")
-
-    def get_next_available_key(self) -> str:
-        start_index = self.current_key_index
-        
+    def _try_take(self) -> Tuple[Optional[int], float]:
+        """Take a token from the best available key; otherwise report how long to wait"""
+        with self._lock:
+            now = self.clock.now()
+            best_index, best_score = None, None
+            shortest_wait = None
+            for index in range(len(self.api_keys)):
+                minute, day = self.minute_buckets[index], self.day_buckets[index]
+                minute.refill(now)
+                day.refill(now)
+                wait = max(minute.wait_time(), day.wait_time(), self.blocked_until[index] - now)
+                if wait > 0:
+                    shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+                    continue
+                score = minute.tokens * self.weights[index]
+                if best_score is None or score > best_score:
+                    best_index, best_score = index, score
+
+            if best_index is None:
+                return None, shortest_wait
+
+            self.minute_buckets[best_index].tokens -= 1
+            self.day_buckets[best_index].tokens -= 1
+            self.request_counts[best_index] += 1
+            return best_index, 0.0
+
+    async def acquire(self) -> str:
+        """Wait, without blocking the event loop, until a key has capacity and use it"""
         while True:
-            current_key = self.api_keys[self.current_key_index]
-            current_time = datetime.now()
-            
-            # Check and reset daily count if needed
-            self._check_and_reset_daily_count(current_key)
-            
-            # Check if current key has cooled down
-            time_diff = (current_time - self.last_request_time[current_key]).total_seconds()
-            
-            if time_diff >= self.cooldown_period:
-                # Reset rate limit counter if cooldown period has passed
-                self.request_counts[current_key] = 0
-                
-            # Check both rate limit and daily limit
-            if (self.request_counts[current_key] < self.rate_limit and 
-                self.daily_counts[current_key] < self.day_limit):
-                # Key is available
-                return current_key, self.current_key_index
-            
-            # Move to next key
-            self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-            
-            # If we've checked all keys and none are available, wait
-            if self.current_key_index == start_index:
-                logger.warning("All keys at limit, waiting...")
-                sleep(10)
-                
-    def use_and_get_key(self):
-        key, index = self.get_next_available_key()
-        self.request_counts[key] += 1
-        self.daily_counts[key] += 1
-        logger.info(f"Using key {index} (Daily count: {self.daily_counts[key]}/{self.day_limit})")
-        self.last_request_time[key] = datetime.now()
-        return key
+            index, wait = self._try_take()
+            if index is not None:
+                logger.info(f"Using key {index} (Requests: {self.request_counts[index]})")
+                return self.api_keys[index]
+            logger.warning(f"All keys at limit, waiting {wait:.1f}s")
+            self.wait_seconds += wait
+            await self.clock.sleep(wait)
+
+    def use_and_get_key(self) -> str:
+        """Blocking acquire for synchronous scripts; request handlers should await acquire()"""
+        while True:
+            index, wait = self._try_take()
+            if index is not None:
+                logger.info(f"Using key {index} (Requests: {self.request_counts[index]})")
+                return self.api_keys[index]
+            logger.warning(f"All keys at limit, waiting {wait:.1f}s")
+            self.wait_seconds += wait
+            self.clock.sleep_sync(wait)
+
+    def report_rate_limited(self, api_key: str, retry_after: Optional[float] = None) -> None:
+        """Park a key the provider answered with a 429, for retry_after or one cooldown period"""
+        with self._lock:
+            index = self.api_keys.index(api_key)
+            delay = retry_after if retry_after is not None else self.cooldown_period
+            self.blocked_until[index] = max(self.blocked_until[index], self.clock.now() + delay)
+            self.rate_limited_counts[index] += 1
+        logger.warning(f"Key {index} rate limited, parked for {delay:.1f}s")
+
+    def usage(self) -> List[Dict]:
+        """Per-key counters, identified by position so keys never reach logs or responses"""
+        with self._lock:
+            now = self.clock.now()
+            stats = []
+            for index in range(len(self.api_keys)):
+                self.minute_buckets[index].refill(now)
+                self.day_buckets[index].refill(now)
+                stats.append({
+                    "key": index,
+                    "weight": self.weights[index],
+                    "requests": self.request_counts[index],
+                    "rate_limited": self.rate_limited_counts[index],
+                    "minute_remaining": int(self.minute_buckets[index].tokens),
+                    "day_remaining": int(self.day_buckets[index].tokens),
+                    "blocked_for": max(0.0, self.blocked_until[index] - now),
+                })
+            return stats
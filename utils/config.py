@@ -2,7 +2,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic_settings import BaseSettings
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Dict, List, Optional
 import os
 
 # Load environment variables
@@ -16,6 +16,9 @@ class Settings(BaseSettings):
     NEO4J_USER: Optional[str] = os.getenv("NEO4J_USER")
     NEO4J_PASSWORD: Optional[str] = os.getenv("NEO4J_PASSWORD")
     
+    # Connections the app's async Neo4j driver keeps open
+    NEO4J_MAX_POOL_SIZE: int = 50
+    
     # REDIS_URI: Optional[str] = os.getenv("REDIS_URI")
     
     GROQ_API_KEY1: Optional[str] = os.getenv("GROQ_API_KEY1")
@@ -25,10 +28,56 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY1: Optional[str] = os.getenv("GOOGLE_API_KEY1")
     GOOGLE_API_KEY2: Optional[str] = os.getenv("GOOGLE_API_KEY2")
     GOOGLE_API_KEY3: Optional[str] = os.getenv("GOOGLE_API_KEY3")
+    # Relative share of requests per key, in key order (e.g. [2, 1, 1]); equal when unset
+    GROQ_KEY_WEIGHTS: Optional[List[float]] = None
+    GOOGLE_KEY_WEIGHTS: Optional[List[float]] = None
     
     ENC_SECRET_KEY: Optional[str] = os.getenv("ENC_SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60*48
     
+    # Most recent entries per employee kept by the analysis feature builders (None keeps all)
+    ANALYSIS_MAX_SEQUENCE_ENTRIES: Optional[int] = None
+    # Worker processes used for the CPU-bound stages of the analysis jobs
+    ANALYSIS_PROCESS_WORKERS: int = 1
+    # Where the fitted analysis imputer and emotion models are persisted
+    ANALYSIS_MODEL_DIR: str = os.getenv("ANALYSIS_MODEL_DIR", "models/analysis")
+    # Stored analysis models are refit once they are this old
+    ANALYSIS_MODEL_MAX_AGE_HOURS: int = 24*7
+    # Largest feature mean shift, in training standard deviations, before the models are refit
+    ANALYSIS_DRIFT_THRESHOLD: float = 0.5
+    # Threads each analysis RandomForest fits and predicts with (-1 uses every core)
+    ANALYSIS_MODEL_JOBS: int = 1
+    # How often the admin dashboard totals are fully recomputed as a backstop to the per-event updates
+    DASHBOARD_RECONCILE_INTERVAL_MINUTES: int = 60
+    # Create any missing indexes from src/database/indexes.py when the app starts
+    MONGO_ENSURE_INDEXES: bool = True
+    # Pooled connections kept per LLM provider key by the async chat clients
+    LLM_MAX_CONNECTIONS: int = 20
+    # Read timeout for a single LLM call
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    # Times an LLM call is retried on another key after a 429
+    LLM_RATE_LIMIT_RETRIES: int = 2
+    # How long the in-process question bank index is served before it is reloaded from Neo4j
+    QUESTION_CACHE_TTL_MINUTES: int = 24*60
+    # "neo4j", or "local" to serve the question bank from the bundled files and similarity matrix only
+    QUESTION_BANK_BACKEND: str = "neo4j"
+    # After a failed Neo4j read, how long the question bank is served locally before Neo4j is tried again
+    QUESTION_BANK_NEO4J_RETRY_SECONDS: int = 30
+    # Where the compiled question similarity matrix is memory-mapped from
+    QUESTION_SIMILARITY_DIR: str = os.getenv("QUESTION_SIMILARITY_DIR", "models/question_similarity")
+    # Generate the next question for the current tag while the user's answer is analysed
+    SPECULATIVE_QUESTION_GENERATION: bool = True
+    # How long a serialised employee profile is reused for new chat sessions
+    PROFILE_CONTEXT_TTL_MINUTES: int = 30
+    # Employees whose serialised profile is kept in memory at once
+    PROFILE_CONTEXT_MAX_EMPLOYEES: int = 1000
+    # Chat sessions whose history and intent data are kept in memory between turns; 0 disables
+    SESSION_CACHE_MAX_SESSIONS: int = 1000
+    # Approximate tokens of verbatim chat history sent with each prompt type; older turns are summarised
+    CHAT_HISTORY_TOKEN_BUDGETS: Dict[str, int] = {"question": 1500, "analysis": 1500, "final_analysis": 6000, "mentor": 3000}
+    # Messages that must fall outside the smallest history budget before the rolling summary is refreshed
+    CHAT_SUMMARY_REFRESH_MESSAGES: int = 6
+    
     
 settings = Settings()
 